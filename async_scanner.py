@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 异步扫描引擎模块
+基于asyncio的协程扫描器，单线程内并发执行TCP连接与HTTP探测
+"""
+
+import asyncio
+import socket
+import time
+from contextlib import asynccontextmanager
+from itertools import islice
+from typing import List, Dict, Tuple, Set, Optional, Callable
+from urllib.parse import urlsplit
+
+from llm_scanner import (
+    LLMScanner, HostJob, SIGNATURE_DB, VLLM_PATHS, HTTP_TIMEOUT, PER_HOST_LIMIT,
+    MAX_RESULTS, group_probes, sweep_ports, probe_matched, vllm_matched,
+)
+from connect_scan import ensure_fd_budget, OPEN, REFUSED, TIMEOUT, ERROR
+from message_bus import VERBOSITY_NORMAL
+from checkpoint import PHASE_SERVICES, PHASE_SWEEP
+from discovery import DISCOVERY_BATCH
+from http_probe import AsyncProbeConnection, ProbeResponse, build_request
+from port_import import PortImport
+from targets import TargetSpace
+
+# ============ 配置 ============
+
+# 全局在途探测数上限(TCP连接 + HTTP请求)
+ASYNC_MAX_INFLIGHT = 1000
+
+# 同时扫描的主机数上限
+ASYNC_MAX_HOSTS = 64
+
+
+# ============ 异步扫描引擎 ============
+
+class AsyncLLMScanner(LLMScanner):
+    """基于asyncio的LLM服务扫描器
+
+    与 LLMScanner 使用相同的 msg_queue 消息协议(log_batch/progress/result/done)，
+    所有探测共享一个在途预算 max_inflight，多台主机并发扫描，
+    per_host_limit 可限制单台主机的在途探测数。
+    """
+
+    def __init__(self, max_inflight: int = ASYNC_MAX_INFLIGHT, max_hosts: int = ASYNC_MAX_HOSTS,
+                 per_host_limit: int = PER_HOST_LIMIT, verbosity: int = VERBOSITY_NORMAL,
+                 results_file: Optional[str] = None, max_results: Optional[int] = MAX_RESULTS,
+                 checkpoint_file: Optional[str] = None, resume: bool = False,
+                 store_file: Optional[str] = None, incremental_ttl: Optional[float] = None):
+        super().__init__(per_host_limit=per_host_limit, verbosity=verbosity,
+                         results_file=results_file, max_results=max_results,
+                         checkpoint_file=checkpoint_file, resume=resume,
+                         store_file=store_file, incremental_ttl=incremental_ttl)
+        self.max_inflight = max_inflight
+        self.max_hosts = max_hosts
+        self._slots = None
+        self._host_slots = {}
+
+    @asynccontextmanager
+    async def _slot(self, ip: str):
+        """占用一个探测名额，先取单主机名额再取全局名额"""
+        host_sem = None
+        if self.per_host_limit > 0:
+            host_sem = self._host_slots.get(ip)
+            if host_sem is None:
+                host_sem = self._host_slots[ip] = asyncio.Semaphore(self.per_host_limit)
+        if host_sem:
+            await host_sem.acquire()
+        try:
+            async with self._slots:
+                yield
+        finally:
+            if host_sem:
+                host_sem.release()
+
+    def release_host(self, ip: str):
+        super().release_host(ip)
+        if ip not in self._host_refs:
+            self._host_slots.pop(ip, None)
+
+    async def _pace_async(self, ip: str):
+        """按速率限制等待发起一次探测的令牌，全局速率变化后按新速率重新预占"""
+        generation = self.limiter.generation
+        delay = self.limiter.reserve(ip)
+        deadline = time.monotonic() + delay
+        while delay > 0 and not self.stop_flag:
+            await asyncio.sleep(min(delay, 0.2))
+            if self.limiter.generation != generation:
+                generation = self.limiter.generation
+                delay = self.limiter.reserve(ip)
+                deadline = time.monotonic() + delay
+            else:
+                delay = deadline - time.monotonic()
+
+    async def check_port_open_async(self, ip: str, port: int) -> bool:
+        """异步检查端口是否开放，超时随主机RTT自适应"""
+        timing = self.host_timing(ip)
+        await self._pace_async(ip)
+        async with self._slot(ip):
+            # 只需要完成握手：裸套接字的 sock_connect 与被拒绝的连接一样只需事件循环调度一次，
+            # open_connection 还要创建传输和流对象，事件循环繁忙时开放端口反而更容易超时
+            sock = None
+            started = time.monotonic()
+            try:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.setblocking(False)
+                await asyncio.wait_for(asyncio.get_running_loop().sock_connect(sock, (ip, port)),
+                                       timing.connect_timeout)
+            except ConnectionRefusedError:
+                timing.observe(time.monotonic() - started)
+                self.record_connect(ip, REFUSED)
+                return False
+            except asyncio.TimeoutError:
+                self.record_connect(ip, TIMEOUT)
+                return False
+            except Exception:
+                self.record_connect(ip, ERROR)
+                return False
+            finally:
+                if sock is not None:
+                    sock.close()
+            timing.observe(time.monotonic() - started)
+            self.record_connect(ip, OPEN)
+            return True
+
+    async def full_client_get_async(self, url: str, timeout: float = HTTP_TIMEOUT,
+                                    until: Callable[[str], bool] = None) -> Tuple[bool, str]:
+        """在线程池中通过完整客户端(requests)请求，与其它探测一样限速并占用探测名额"""
+        host = urlsplit(url).hostname
+        await self._pace_async(host)
+        async with self._slot(host):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.full_client_get, url, timeout, until)
+
+    async def _pipeline_async(self, ip: str, port: int, paths: List[str], timeout: float,
+                              until: List[Callable[[str], bool]] = None) -> List[Optional[ProbeResponse]]:
+        """在同一连接上流水线发送多个GET请求，按顺序返回各路径的响应(失败为 None)
+
+        服务器处理完部分请求就关闭连接时，其余请求在新连接上按服务器实际处理的个数分批重发。
+        """
+        responses = [None] * len(paths)
+        pending = list(range(len(paths)))
+        depth = len(paths)
+        netloc = f"{ip}:{port}"
+        while pending and not self.stop_flag:
+            batch, answered = pending[:depth], 0
+            for _ in batch:
+                await self._pace_async(ip)
+            async with self._slot(ip):
+                connection = None
+                try:
+                    connection = await AsyncProbeConnection.open(ip, port, timeout)
+                    await asyncio.wait_for(connection.send(b"".join(
+                        build_request(netloc, paths[i], keep_alive=i != batch[-1]) for i in batch)), timeout)
+                    for i in batch:
+                        response = await connection.read_response(self.max_body_bytes, time.monotonic() + timeout,
+                                                                   until[i] if until else None)
+                        self.metrics.inc("http_requests_total", status=str(response.status))
+                        responses[i] = response
+                        answered += 1
+                        if not connection.reusable:
+                            break
+                except (OSError, ValueError, asyncio.TimeoutError):
+                    pass
+                finally:
+                    if connection is not None:
+                        connection.close()
+                        self.metrics.inc("http_bytes_read_total", connection.bytes_read)
+            if not answered:
+                # 连接失败或第一个请求就没有响应，本批请求都视为失败
+                self.metrics.inc("http_requests_total", len(batch), status="error")
+                pending = pending[len(batch):]
+                continue
+            pending = pending[answered:]
+            depth = answered
+        return responses
+
+    async def http_get_paths_async(self, ip: str, port: int, paths: List[str], timeout: float = HTTP_TIMEOUT,
+                                   until: List[Callable[[str], bool]] = None) -> List[Tuple[bool, str]]:
+        """异步版本的 http_get_paths：同一端口的请求在一个连接上流水线发送，按顺序返回 (成功, 响应文本)
+
+        与线程引擎相同，重定向(可能跳转到HTTPS)和压缩的响应交给完整客户端在线程池中重新请求。
+        """
+        responses = await self._pipeline_async(ip, port, paths, timeout, until)
+        results = []
+        for i, response in enumerate(responses):
+            if response is not None and response.needs_full_client() and not self.stop_flag:
+                results.append(await self.full_client_get_async(f"http://{ip}:{port}{paths[i]}", timeout,
+                                                                until[i] if until else None))
+            elif response is not None and response.status == 200:
+                results.append((True, response.text))
+            else:
+                results.append((False, ""))
+        return results
+
+    async def _probe_port_async(self, ip: str, port: int, probes: List[Dict]) -> Dict[Tuple[int, str], Tuple[bool, str]]:
+        """执行同一端口上的一组探测，返回 {(端口, 路径): (成功, 响应文本)}"""
+        if self.stop_flag:
+            self.advance(len(probes))
+            return {}
+        for probe in probes:
+            self.log(f"检测 http://{ip}:{port}{probe['path']} ({', '.join(s['name'] for s in probe['services'])})",
+                     "debug")
+        with self.metrics.timer("task_seconds", task="service_probe"):
+            fetched = await self.http_get_paths_async(ip, port, [probe["path"] for probe in probes],
+                                                      self.host_timing(ip).http_timeout,
+                                                      [probe_matched(probe) for probe in probes])
+        self.advance(len(probes))
+        return {(port, probe["path"]): response for probe, response in zip(probes, fetched)}
+
+    async def _probe_services_async(self, ip: str, probes: List[Dict]) -> Dict[Tuple[int, str], Tuple[bool, str]]:
+        """各端口的探测组并发执行，同一端口的探测共用一个连接"""
+        responses = {}
+        groups = await asyncio.gather(*(self._probe_port_async(ip, port, group)
+                                        for port, group in group_probes(probes)))
+        for fetched in groups:
+            responses.update(fetched)
+        return responses
+
+    async def check_ports_open_async(self, ip: str, ports: List[int]) -> Set[int]:
+        """并发检查一组端口，返回开放的端口集合"""
+        states = await asyncio.gather(*(self.check_port_open_async(ip, port) for port in ports))
+        return {port for port, is_open in zip(ports, states) if is_open}
+
+    async def scan_ip_services_async(self, ip: str) -> List[Dict]:
+        """先并发预检已知端口，再对开放端口执行探测计划，最后统一识别"""
+        with self.metrics.timer("task_seconds", task="known_ports"):
+            open_known = await self.check_ports_open_async(ip, self.known_ports)
+        if not open_known:
+            self.log(f"[{ip}] 已知LLM端口均未开放，跳过HTTP检测", "debug")
+            self.advance(len(self.probe_plan))
+            return []
+        self._phase_ports[(ip, PHASE_SERVICES)] = sorted(open_known)
+        self.log(f"[{ip}] 已知端口开放: {sorted(open_known)} ({self.host_timing(ip).describe()})")
+
+        probes = [probe for probe in self.probe_plan if probe["port"] in open_known]
+        self.advance(len(self.probe_plan) - len(probes))
+        return self.classify_responses(ip, await self._probe_services_async(ip, probes))
+
+    async def _sweep_worker(self, ip: str, ports, open_ports: List[int], verifying: List[asyncio.Task]):
+        """端口扫描协程，从共享迭代器中领取端口，开放端口立即开始vLLM检测"""
+        for port in ports:
+            if self.stop_flag:
+                self.advance()
+                return
+            is_open = await self.check_port_open_async(ip, port)
+            self.advance()
+            if is_open:
+                open_ports.append(port)
+                self.log(f"[{ip}] 端口 {port} 开放", "debug")
+                verifying.append(asyncio.ensure_future(self._verify_vllm_port(ip, port)))
+
+    async def _verify_vllm_port(self, ip: str, port: int) -> Optional[Dict]:
+        """在开放端口上检测vLLM服务"""
+        with self.metrics.timer("task_seconds", task="vllm_verify"):
+            return await self._verify_vllm_paths_async(ip, port)
+
+    async def _verify_vllm_paths_async(self, ip: str, port: int) -> Optional[Dict]:
+        fetched = await self.http_get_paths_async(ip, port, VLLM_PATHS, self.host_timing(ip).http_timeout,
+                                                  [vllm_matched] * len(VLLM_PATHS))
+        for path, (success, response_text) in zip(VLLM_PATHS, fetched):
+            url = f"http://{ip}:{port}{path}"
+            confidence = SIGNATURE_DB.match(response_text).get("vllm") if success else None
+            if confidence is not None:
+                self.log(f"[!] 发现漏洞: vLLM @ {ip}:{port}", "error")
+                return self.make_vllm_result(ip, port, path, url, response_text, confidence)
+        return None
+
+    async def scan_ports_for_vllm_async(self, ip: str) -> List[Dict]:
+        """异步全端口扫描检测vLLM，开放端口的检测与端口扫描同时进行"""
+        # 按命中概率排列，高概率端口先扫描
+        ports_to_scan = self._sweep_order
+        self.log(f"[{ip}] 全端口扫描开始，共 {len(ports_to_scan)} 个端口待扫描")
+
+        open_ports = []
+        verifying = []
+        hot = self._sweep_hot
+        # 高概率端口单独先扫描一轮，不与长尾端口的连接洪峰混在一起
+        for tier in (ports_to_scan[:hot], ports_to_scan[hot:]) if hot else (ports_to_scan,):
+            shared = iter(tier)
+            workers = min(self.per_host_limit or self.max_inflight, len(tier))
+            with self.metrics.timer("task_seconds", task="port_sweep"):
+                await asyncio.gather(*(self._sweep_worker(ip, shared, open_ports, verifying)
+                                       for _ in range(workers)))
+            # 取消时未扫描的端口也计入进度
+            self.advance(sum(1 for _ in shared))
+        found = await asyncio.gather(*verifying)
+        if self.stop_flag:
+            return []
+
+        if not open_ports:
+            self.log(f"[{ip}] 未发现额外开放端口")
+            return []
+
+        open_ports.sort()
+        self._phase_ports[(ip, PHASE_SWEEP)] = open_ports
+        self.open_ports.extend(open_ports)
+        self.log(f"[{ip}] 发现 {len(open_ports)} 个开放端口: {open_ports[:10]}{'...' if len(open_ports) > 10 else ''}")
+        return sorted((r for r in found if r), key=lambda r: r["port"])
+
+    async def _scan_host(self, ip: str, enable_full_port_scan: bool):
+        """扫描单台主机，跳过断点中已完成的阶段，增量模式下沿用端口未变化的阶段"""
+        cached = self.cached_phases(ip)
+        reused = {}
+        if cached:
+            reused = self.reusable_phases(ip, cached, await self.check_ports_open_async(ip, self.cache_ports(cached)))
+
+        if self.phase_done(ip, PHASE_SERVICES):
+            self.advance(len(self.probe_plan))
+        elif PHASE_SERVICES in reused:
+            self.log(f"[{ip}] 已知端口未变化，沿用 {len(reused[PHASE_SERVICES])} 条缓存结果")
+            self.advance(len(self.probe_plan))
+            self.complete_phase(ip, PHASE_SERVICES, reused[PHASE_SERVICES], verified=False)
+        else:
+            self.log(f"[{ip}] 检测LLM服务...")
+            with self.metrics.timer("phase_seconds", phase=PHASE_SERVICES):
+                results = await self.scan_ip_services_async(ip)
+            self.complete_phase(ip, PHASE_SERVICES, results)
+        if enable_full_port_scan:
+            if self.stop_flag or self.phase_done(ip, PHASE_SWEEP):
+                self.advance(len(sweep_ports()))
+            elif PHASE_SWEEP in reused:
+                self.log(f"[{ip}] 端口集合未变化，跳过全端口扫描，沿用 {len(reused[PHASE_SWEEP])} 条缓存结果")
+                self.advance(len(sweep_ports()))
+                self.complete_phase(ip, PHASE_SWEEP, reused[PHASE_SWEEP], verified=False)
+            else:
+                self.log(f"[{ip}] 启动全端口扫描...")
+                with self.metrics.timer("phase_seconds", phase=PHASE_SWEEP):
+                    results = await self.scan_ports_for_vllm_async(ip)
+                self.complete_phase(ip, PHASE_SWEEP, results)
+
+    async def _feed_hosts(self, ips: TargetSpace, hosts: asyncio.Queue, workers: int, enable_full_port_scan: bool):
+        """按批做存活探测(在线程中执行)，存活的主机放入主机队列，最后为每个主机协程放入结束标记"""
+        loop = asyncio.get_running_loop()
+        batch = []
+        for item in enumerate(self.scheduled_hosts(ips)):
+            if self.stop_flag:
+                break
+            batch.append(item)
+            if len(batch) >= DISCOVERY_BATCH:
+                await self._feed_batch(loop, batch, hosts, enable_full_port_scan)
+                batch = []
+        if batch and not self.stop_flag:
+            await self._feed_batch(loop, batch, hosts, enable_full_port_scan)
+        for _ in range(workers):
+            await hosts.put(None)
+
+    async def _feed_batch(self, loop, batch: List[Tuple[int, str]], hosts: asyncio.Queue, enable_full_port_scan: bool):
+        live = await loop.run_in_executor(None, lambda: list(self.discover_live(batch, enable_full_port_scan)))
+        for item in live:
+            await hosts.put(item)
+
+    async def _host_worker(self, hosts: asyncio.Queue, total_ips: int, enable_full_port_scan: bool):
+        """主机调度协程，从主机队列中领取主机直到收到结束标记"""
+        while True:
+            item = await hosts.get()
+            if item is None:
+                return
+            i, ip = item
+            if self.stop_flag:
+                continue
+            if self.host_done(ip, enable_full_port_scan):
+                self.advance(self.host_units(enable_full_port_scan))
+                continue
+            self.log("")
+            self.log(f">>> 扫描 [{i + 1}/{total_ips}] {ip}")
+            try:
+                with self.metrics.timer("host_seconds"):
+                    await self._scan_host(ip, enable_full_port_scan)
+            finally:
+                self.release_host(ip)
+
+    async def _run(self, ips: TargetSpace, enable_full_port_scan: bool):
+        """异步扫描主流程"""
+        self._slots = asyncio.Semaphore(ensure_fd_budget(self.max_inflight))
+        total_ips = len(ips)
+        self.reset_units(self.host_units(enable_full_port_scan) * total_ips)
+
+        workers = max(1, min(self.max_hosts, total_ips))
+        hosts = asyncio.Queue(workers * 2)
+        await asyncio.gather(self._feed_hosts(ips, hosts, workers, enable_full_port_scan),
+                             *(self._host_worker(hosts, total_ips, enable_full_port_scan)
+                               for _ in range(workers)))
+
+    async def _scan_imported_host(self, job: HostJob):
+        """检测导入的一组开放端口：已知服务端口执行探测计划，其余端口检测vLLM"""
+        ip = job.ip
+        if job.probes:
+            with self.metrics.timer("phase_seconds", phase=PHASE_SERVICES):
+                responses = await self._probe_services_async(ip, job.probes)
+            self.complete_phase(ip, PHASE_SERVICES, self.classify_responses(ip, responses))
+        if job.sweep_open:
+            with self.metrics.timer("phase_seconds", phase=PHASE_SWEEP):
+                found = await asyncio.gather(*(self._verify_vllm_port(ip, port) for port in job.sweep_open))
+            self.open_ports.extend(job.sweep_open)
+            self.complete_phase(ip, PHASE_SWEEP, sorted((r for r in found if r), key=lambda r: r["port"]))
+
+    async def _feed_imported(self, imported: PortImport, jobs: asyncio.Queue, workers: int,
+                             enable_full_port_scan: bool):
+        """按批读取导入数据(在线程中执行)，探测任务放入任务队列，最后为每个协程放入结束标记"""
+        loop = asyncio.get_running_loop()
+        source = self.imported_jobs(imported, enable_full_port_scan)
+        while True:
+            batch = await loop.run_in_executor(None, lambda: list(islice(source, DISCOVERY_BATCH)))
+            if not batch:
+                break
+            for job in batch:
+                await jobs.put(job)
+        for _ in range(workers):
+            await jobs.put(None)
+
+    async def _imported_worker(self, jobs: asyncio.Queue):
+        """导入任务协程，从任务队列中领取任务直到收到结束标记"""
+        while True:
+            job = await jobs.get()
+            if job is None:
+                return
+            try:
+                if not self.stop_flag:
+                    with self.metrics.timer("host_seconds"):
+                        await self._scan_imported_host(job)
+            finally:
+                self.release_host(job.ip)
+
+    async def _run_imported(self, imported: PortImport, enable_full_port_scan: bool):
+        """导入开放端口扫描主流程，跳过存活探测和端口扫描"""
+        self._slots = asyncio.Semaphore(ensure_fd_budget(self.max_inflight))
+        self.reset_units(0)  # 总量未知，进度按导入数据的读取位置计算
+        jobs = asyncio.Queue(self.max_hosts * 2)
+        await asyncio.gather(self._feed_imported(imported, jobs, self.max_hosts, enable_full_port_scan),
+                             *(self._imported_worker(jobs) for _ in range(self.max_hosts)))
+
+    def scan(self, target: str, target_type: str, enable_full_port_scan: bool = False, exclude: str = ""):
+        """执行扫描"""
+        ips = self.begin_scan(target, target_type, enable_full_port_scan, exclude)
+        if not ips:
+            return []
+        self.scan_targets(ips, enable_full_port_scan)
+        return self.finish_scan()
+
+    def scan_targets(self, ips: TargetSpace, enable_full_port_scan: bool = False):
+        """扫描目标空间中的全部主机(不输出任务信息，也不发送 done 消息)
+
+        ips 为 PortImport 时扫描导入的开放端口。
+        """
+        if isinstance(ips, PortImport):
+            self.log(f"异步引擎: 在途上限 {self.max_inflight}, 并发主机 {self.max_hosts}")
+            self.start_limiter()
+            asyncio.run(self._run_imported(ips, enable_full_port_scan))
+            return
+        self.log(f"异步引擎: 在途上限 {self.max_inflight}, 并发主机 {min(self.max_hosts, len(ips))}")
+        self.start_limiter()
+        asyncio.run(self._run(ips, enable_full_port_scan))
+
@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 性能基准模块
+在回环地址(127.x)上启动模拟的LLM服务以及慢响应、黑洞、大响应体端口，端到端运行扫描，
+统计探测速率、主机速率、探测延迟分位数、内存峰值和检测准确率，并保存为可对比的基准
+
+用法: python benchmark.py --hosts 64 --save benchmark_baseline.json
+      python benchmark.py --engine async --compare benchmark_baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import platform
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from llm_scanner import LLMScanner
+from message_bus import VERBOSITY_QUIET
+from targets import int_to_ip
+
+# ============ 配置 ============
+
+# 模拟主机的起始地址(Linux 上整个 127.0.0.0/8 都指向回环接口)
+MOCK_BASE = (127 << 24) | (20 << 16) | 1
+
+# 默认基准文件
+BASELINE_FILE = "benchmark_baseline.json"
+
+# 与基准对比时允许的性能波动，超过即视为退化
+REGRESSION_TOLERANCE = 0.15
+
+MODELS = {"object": "list", "data": [{"id": "meta-llama/Llama-3.1-8B-Instruct", "object": "model",
+                                      "owned_by": "vllm", "max_model_len": 8192}]}
+
+# 模拟服务：端口、路由(dict 返回JSON，str 返回HTML，None 返回空响应体)、期望扫描器识别出的服务
+MOCK_KINDS = {
+    "ollama": {"port": 11434, "expect": ["Ollama"], "routes": {
+        "/api/tags": {"models": [{"name": "qwen2.5:7b", "model": "qwen2.5:7b", "size": 4683087332,
+                                  "digest": "845dbda0ea48ed749caafd9e6037047aa19acfcfd82e704d7ca97d631a0b697e"}]},
+        "/api/version": {"version": "0.5.7"}}},
+    "vllm": {"port": 8000, "expect": ["vLLM", "OpenAI Compatible API"], "routes": {
+        "/v1/models": MODELS, "/health": None}},
+    "lmstudio": {"port": 1234, "expect": ["LM Studio"], "routes": {
+        "/v1/models": {"object": "list", "data": [{"id": "lmstudio-community/Qwen2.5-7B-Instruct-GGUF",
+                                                    "object": "model", "owned_by": "organization_owner"}]}}},
+    "llamacpp": {"port": 8080, "expect": ["llama.cpp", "OpenAI Compatible API"], "routes": {
+        "/health": {"status": "ok"},
+        "/v1/models": {"object": "list", "data": [{"id": "ggml-model-q4_0.gguf", "object": "model",
+                                                    "owned_by": "llamacpp"}]}}},
+    "llamafile": {"port": 8080, "expect": ["Mozilla-Llamafile"], "routes": {
+        "/": "<html><head><title>llama.cpp - chat</title></head><body>llamafile</body></html>"}},
+    "jan": {"port": 1337, "expect": ["Jan AI"], "routes": {
+        "/v1/models": {"object": "list", "data": [{"id": "jan-nano-4b", "object": "model"}]}}},
+    "cortex": {"port": 39281, "expect": ["Cortex API"], "routes": {
+        "/v1/models": {"object": "list", "data": [{"id": "cortexso/tinyllama", "object": "model"}]}}},
+    "litellm": {"port": 4000, "expect": ["LiteLLM API"], "routes": {
+        "/health": {"healthy_endpoints": [{"model": "gpt-4o"}], "unhealthy_endpoints": [], "healthy_count": 1},
+        "/v1/models": {"object": "list", "data": [{"id": "gpt-4o", "object": "model", "owned_by": "litellm"}]}}},
+    "gpt4all": {"port": 4891, "expect": ["GPT4All API Server"], "routes": {
+        "/v1/models": {"object": "list", "data": [{"id": "Llama 3 8B Instruct", "object": "model",
+                                                    "owned_by": "gpt4all"}]}}},
+    "openai": {"port": 5000, "expect": ["OpenAI Compatible API"], "routes": {
+        "/v1/models": {"object": "list", "data": [{"id": "gpt-3.5-turbo", "object": "model"}]}}},
+    # 非标准端口上的vLLM，只有全端口扫描能发现
+    "vllm_sweep": {"port": 31000, "expect": ["vLLM"], "sweep": True, "routes": {
+        "/v1/models": MODELS, "/health": None}},
+    # 非LLM的Web服务，不应产生任何结果
+    "web": {"port": 3000, "expect": [], "routes": {
+        "/": "<html><body><h1>Welcome to nginx!</h1></body></html>"}},
+    # 干扰端口: 慢响应、只接受连接不响应、超大响应体
+    "slow": {"port": 8000, "expect": ["vLLM", "OpenAI Compatible API"], "slow": True, "routes": {
+        "/v1/models": MODELS, "/health": None}},
+    "blackhole": {"port": 11434, "expect": [], "blackhole": True, "routes": {}},
+    "large": {"port": 5000, "expect": [], "large": True, "routes": {}},
+}
+
+SERVICE_PROFILES = [
+    ["ollama"], ["vllm"], ["llamacpp", "ollama"], ["lmstudio"], ["llamafile"], ["jan"],
+    ["cortex"], ["litellm"], ["gpt4all"], ["openai"], ["vllm_sweep", "ollama"], ["web"],
+]
+
+
+# ============ 模拟服务 ============
+
+def build_layout(hosts: int, density: float = 0.5, slow_delay: float = 0.3, large_bytes: int = 4 << 20,
+                 blackhole: bool = True) -> List[Tuple[str, List[str]]]:
+    """生成模拟主机布局 [(ip, [服务类型...])]，服务均匀分布在 density 比例的主机上，其余主机为空"""
+    profiles = list(SERVICE_PROFILES)
+    if slow_delay > 0:
+        profiles.append(["slow"])
+    if blackhole:
+        profiles.append(["blackhole"])
+    if large_bytes > 0:
+        profiles.append(["large"])
+    layout = []
+    used = 0
+    for i in range(hosts):
+        kinds = []
+        if int((i + 1) * density) > int(i * density):
+            kinds = profiles[used % len(profiles)]
+            used += 1
+        layout.append((int_to_ip(MOCK_BASE + i), kinds))
+    return layout
+
+
+def expected_findings(layout: List[Tuple[str, List[str]]], full: bool) -> Set[Tuple[str, int, str]]:
+    """布局中应被识别出的 (ip, 端口, 服务)"""
+    expected = set()
+    for ip, kinds in layout:
+        for kind in kinds:
+            spec = MOCK_KINDS[kind]
+            if spec.get("sweep") and not full:
+                continue
+            expected.update((ip, spec["port"], name) for name in spec["expect"])
+    return expected
+
+
+def http_response(status: str, content_type: str, body: bytes) -> bytes:
+    return (f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+            "Connection: keep-alive\r\n\r\n").encode("latin-1") + body
+
+
+async def handle_mock(reader, writer, spec: Dict, options: Dict):
+    """模拟服务的连接处理，同一连接上可依次处理多个请求(长连接/流水线请求)"""
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            if spec.get("blackhole"):
+                # 只接受连接，不返回任何数据，直到客户端断开
+                while await reader.read(4096):
+                    pass
+                return
+            path = head.split(b" ", 2)[1].decode("latin-1").split("?", 1)[0]
+            if spec.get("slow"):
+                await asyncio.sleep(options["slow_delay"])
+            if spec.get("large"):
+                size = options["large_bytes"]
+                writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: text/html\r\nContent-Length: {size}\r\n\r\n"
+                             .encode("latin-1"))
+                chunk = b"<p>" + b"x" * 65533
+                for _ in range(0, size, len(chunk)):
+                    writer.write(chunk)
+                    await writer.drain()
+                return
+            if path not in spec["routes"]:
+                writer.write(http_response("404 Not Found", "text/plain", b"404 page not found"))
+            else:
+                body = spec["routes"][path]
+                if isinstance(body, (dict, list)):
+                    writer.write(http_response("200 OK", "application/json", json.dumps(body).encode("utf-8")))
+                else:
+                    writer.write(http_response("200 OK", "text/html; charset=utf-8", (body or "").encode("utf-8")))
+            await writer.drain()
+            if b"connection: close" in head.lower():
+                return
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, OSError):
+        pass
+    finally:
+        writer.close()
+
+
+def serve_mocks(layout: List[Tuple[str, List[str]]], options: Dict, ready, stop):
+    """子进程入口：启动布局中的全部模拟服务，直到 stop 被设置"""
+
+    async def main():
+        servers = []
+        for ip, kinds in layout:
+            for kind in kinds:
+                spec = MOCK_KINDS[kind]
+
+                async def handler(reader, writer, spec=spec):
+                    await handle_mock(reader, writer, spec, options)
+
+                servers.append(await asyncio.start_server(handler, ip, spec["port"], backlog=512))
+        ready.set()
+        await asyncio.get_running_loop().run_in_executor(None, stop.wait)
+        for server in servers:
+            server.close()
+
+    asyncio.run(main())
+
+
+# ============ 探测统计 ============
+
+class ProbeStats:
+    """探测次数与延迟"""
+
+    def __init__(self):
+        self.connects = []  # type: List[float]
+        self.http = []  # type: List[float]
+        self._lock = threading.Lock()
+
+    def add(self, kind: str, seconds: float):
+        with self._lock:
+            getattr(self, kind).append(seconds)
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def instrumented(engine: str):
+    """返回带探测统计的扫描器类(统计连接和HTTP探测，不含存活探测)"""
+    if engine == "async":
+        from async_scanner import AsyncLLMScanner
+
+        class InstrumentedAsyncScanner(AsyncLLMScanner):
+            def __init__(self, **options):
+                super().__init__(**options)
+                self.stats = ProbeStats()
+
+            async def check_port_open_async(self, ip, port):
+                started = time.monotonic()
+                try:
+                    return await super().check_port_open_async(ip, port)
+                finally:
+                    self.stats.add("connects", time.monotonic() - started)
+
+            async def _pipeline_async(self, ip, port, paths, *args, **kwargs):
+                # 流水线请求逐个计一次，延迟为整批耗时按请求数平均；回退的完整客户端请求单独计入
+                started = time.monotonic()
+                try:
+                    return await super()._pipeline_async(ip, port, paths, *args, **kwargs)
+                finally:
+                    elapsed = time.monotonic() - started
+                    for _ in paths:
+                        self.stats.add("http", elapsed / len(paths))
+
+            async def full_client_get_async(self, url, *args, **kwargs):
+                started = time.monotonic()
+                try:
+                    return await super().full_client_get_async(url, *args, **kwargs)
+                finally:
+                    self.stats.add("http", time.monotonic() - started)
+
+        return InstrumentedAsyncScanner
+
+    class InstrumentedScanner(LLMScanner):
+        def __init__(self, **options):
+            super().__init__(**options)
+            self.stats = ProbeStats()
+            # 当前线程中 http_get 的累计耗时，用于从流水线批次的耗时中扣除完整客户端的回退请求
+            self._fallback = threading.local()
+
+        def iter_connects(self, ip, ports):
+            for result in super().iter_connects(ip, ports):
+                self.stats.add("connects", result.rtt)
+                yield result
+
+        def http_get(self, url, *args, **kwargs):
+            started = time.monotonic()
+            try:
+                return super().http_get(url, *args, **kwargs)
+            finally:
+                elapsed = time.monotonic() - started
+                self.stats.add("http", elapsed)
+                self._fallback.seconds = getattr(self._fallback, "seconds", 0.0) + elapsed
+
+        def http_get_paths(self, ip, port, paths, *args, **kwargs):
+            # 流水线请求逐个计一次，延迟为整批耗时按请求数平均；
+            # 重定向等回退到 http_get 的请求已由 http_get 单独计入，从整批耗时中扣除
+            self._fallback.seconds = 0.0
+            started = time.monotonic()
+            try:
+                return super().http_get_paths(ip, port, paths, *args, **kwargs)
+            finally:
+                elapsed = time.monotonic() - started - self._fallback.seconds
+                for _ in paths:
+                    self.stats.add("http", elapsed / len(paths))
+
+    return InstrumentedScanner
+
+
+def peak_rss_mb() -> Optional[float]:
+    """本进程的内存峰值；ru_maxrss 覆盖进程整个生命周期，因此每个负载在独立子进程中运行"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以KB计，macOS 以字节计
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def run_workload(name: str, engine: str, layout: List[Tuple[str, List[str]]], full: bool) -> Dict:
+    """端到端扫描布局中的主机，返回该负载的统计"""
+    scanner = instrumented(engine)(verbosity=VERBOSITY_QUIET)
+
+    def drain():
+        while True:
+            try:
+                if scanner.msg_queue.get(timeout=0.5)[0] == "done":
+                    return
+            except queue.Empty:
+                continue
+
+    drainer = threading.Thread(target=drain, daemon=True)
+    drainer.start()
+    started = time.monotonic()
+    results = scanner.scan(",".join(ip for ip, _ in layout), "auto", full)
+    elapsed = time.monotonic() - started
+    drainer.join()
+
+    stats = scanner.stats
+    found = {(r["ip"], r["port"], r["service"]) for r in results}
+    expected = expected_findings(layout, full)
+    probes = len(stats.connects) + len(stats.http)
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 2)
+
+    return {
+        "workload": name, "hosts": len(layout), "elapsed": round(elapsed, 3),
+        "connects": len(stats.connects), "http_probes": len(stats.http),
+        "probes_per_sec": round(probes / elapsed, 1), "hosts_per_sec": round(len(layout) / elapsed, 2),
+        "http_p50_ms": ms(percentile(stats.http, 0.5)), "http_p99_ms": ms(percentile(stats.http, 0.99)),
+        "connect_p50_ms": ms(percentile(stats.connects, 0.5)), "connect_p99_ms": ms(percentile(stats.connects, 0.99)),
+        "peak_rss_mb": peak_rss_mb(),
+        "recall": round(len(found & expected) / len(expected), 4) if expected else 1.0,
+        "precision": round(len(found & expected) / len(found), 4) if found else 1.0,
+        "missed": sorted(f"{ip}:{port} {service}" for ip, port, service in expected - found),
+        "unexpected": sorted(f"{ip}:{port} {service}" for ip, port, service in found - expected),
+    }
+
+
+def _workload_process(conn, name: str, engine: str, layout: List[Tuple[str, List[str]]], full: bool):
+    """子进程入口：运行一个负载并通过管道返回统计"""
+    conn.send(run_workload(name, engine, layout, full))
+    conn.close()
+
+
+def run_isolated(ctx, name: str, engine: str, layout: List[Tuple[str, List[str]]], full: bool) -> Optional[Dict]:
+    """在独立子进程中运行负载，使内存峰值只反映该负载；子进程异常退出时返回 None"""
+    receiver, sender = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_workload_process, args=(sender, name, engine, layout, full))
+    process.start()
+    sender.close()
+    try:
+        return receiver.recv()
+    except EOFError:
+        return None
+    finally:
+        receiver.close()
+        process.join()
+
+
+# ============ 报告与对比 ============
+
+# 指标: (名称, 越大越好)
+METRICS = [
+    ("probes_per_sec", True), ("hosts_per_sec", True),
+    ("http_p50_ms", False), ("http_p99_ms", False), ("connect_p99_ms", False),
+    ("peak_rss_mb", False), ("recall", True), ("precision", True),
+]
+
+
+def print_report(report: Dict):
+    def fmt(value, unit=""):
+        return "-" if value is None else f"{value}{unit}"
+
+    for w in report["workloads"]:
+        print(f"[{w['workload']}] {w['hosts']} 台主机, 耗时 {w['elapsed']} 秒")
+        print(f"  探测速率   {w['probes_per_sec']} 次/秒 (连接 {w['connects']}, HTTP {w['http_probes']})")
+        print(f"  主机速率   {w['hosts_per_sec']} 台/秒")
+        print(f"  HTTP延迟   p50 {fmt(w['http_p50_ms'], ' ms')}, p99 {fmt(w['http_p99_ms'], ' ms')}")
+        print(f"  连接延迟   p50 {fmt(w['connect_p50_ms'], ' ms')}, p99 {fmt(w['connect_p99_ms'], ' ms')}")
+        print(f"  内存峰值   {fmt(w['peak_rss_mb'], ' MB')}")
+        print(f"  检测准确率 召回 {w['recall']:.1%}, 精确 {w['precision']:.1%} "
+              f"(漏报 {len(w['missed'])}, 误报 {len(w['unexpected'])})")
+        for item in w["missed"]:
+            print(f"    漏报: {item}")
+        for item in w["unexpected"]:
+            print(f"    误报: {item}")
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float = REGRESSION_TOLERANCE) -> List[str]:
+    """与基准逐项对比并输出，返回退化的指标"""
+    regressions = []
+    previous = {w["workload"]: w for w in baseline.get("workloads", [])}
+    meta, old_meta = report["meta"], baseline.get("meta", {})
+    print(f"与基准对比 ({old_meta.get('timestamp', '?')}, 允许波动 {tolerance:.0%}):")
+    differs = [key for key in ("engine", "hosts", "density", "sweep_hosts", "options", "blackhole", "cpus")
+               if meta.get(key) != old_meta.get(key)]
+    if differs:
+        print(f"  注意: 基准的配置不同({', '.join(differs)})，对比结果仅供参考")
+    for w in report["workloads"]:
+        old = previous.get(w["workload"])
+        if old is None:
+            continue
+        for metric, higher_better in METRICS:
+            new_value, old_value = w.get(metric), old.get(metric)
+            if new_value is None or not old_value:
+                continue
+            change = (new_value - old_value) / old_value
+            # 准确率不允许任何下降
+            limit = 0.0 if metric in ("recall", "precision") else tolerance
+            worse = change < -limit if higher_better else change > limit
+            mark = "  退化" if worse else ""
+            print(f"  [{w['workload']}] {metric:15} {old_value} -> {new_value} ({change:+.1%}){mark}")
+            if worse:
+                regressions.append(f"{w['workload']}.{metric}")
+    return regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="LLM Scanner 回环性能基准")
+    parser.add_argument("--engine", default="thread", choices=["thread", "async"], help="扫描引擎(默认thread)")
+    parser.add_argument("--hosts", type=int, default=64, help="模拟主机数(默认64)")
+    parser.add_argument("--density", type=float, default=0.5, help="部署了服务的主机比例(默认0.5)")
+    parser.add_argument("--sweep-hosts", type=int, default=2, help="全端口扫描负载的主机数，0表示跳过(默认2)")
+    parser.add_argument("--slow-delay", type=float, default=0.3, help="慢响应端口的延迟(秒)，0表示不部署")
+    parser.add_argument("--large-bytes", type=int, default=4 << 20, help="大响应体端口的响应大小，0表示不部署")
+    parser.add_argument("--no-blackhole", action="store_true", help="不部署只接受连接不响应的黑洞端口")
+    parser.add_argument("--save", metavar="FILE", help=f"把本次结果保存为基准(如 {BASELINE_FILE})")
+    parser.add_argument("--compare", metavar="FILE", help="与已保存的基准对比，有指标退化时以状态码1退出")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    options = {"slow_delay": args.slow_delay, "large_bytes": args.large_bytes}
+    layout = build_layout(args.hosts, args.density, args.slow_delay, args.large_bytes, not args.no_blackhole)
+    # 全端口扫描负载: 部署了非标准端口vLLM的主机优先，其次为空主机
+    sweep_layout = sorted(layout, key=lambda host: ("vllm_sweep" not in host[1], bool(host[1])))[:args.sweep_hosts]
+
+    ctx = multiprocessing.get_context()
+    ready, stop = ctx.Event(), ctx.Event()
+    server = ctx.Process(target=serve_mocks, args=(layout, options, ready, stop), daemon=True)
+    server.start()
+    if not ready.wait(30):
+        sys.stderr.write("模拟服务启动失败\n")
+        return 1
+    try:
+        workloads = [run_isolated(ctx, "services", args.engine, layout, False)]
+        if sweep_layout:
+            workloads.append(run_isolated(ctx, "sweep", args.engine, sweep_layout, True))
+    finally:
+        stop.set()
+        server.join(5)
+    if None in workloads:
+        sys.stderr.write("负载进程异常退出\n")
+        return 1
+
+    report = {
+        "meta": {"timestamp": datetime.now().isoformat(timespec="seconds"), "engine": args.engine,
+                 "hosts": args.hosts, "density": args.density, "sweep_hosts": len(sweep_layout),
+                 "options": options, "blackhole": not args.no_blackhole,
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "cpus": multiprocessing.cpu_count()},
+        "workloads": workloads,
+    }
+    print_report(report)
+    regressions = []
+    if args.compare:
+        try:
+            with open(args.compare, "r", encoding="utf-8") as f:
+                regressions = compare(report, json.load(f))
+        except (OSError, ValueError) as e:
+            sys.stderr.write(f"无法读取基准文件 {args.compare}: {e}\n")
+            return 1
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"基准已保存: {args.save}")
+    if regressions:
+        print(f"性能退化: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
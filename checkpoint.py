@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 断点续扫模块
+扫描过程中以追加方式记录已完成的 (主机, 阶段) 和发现的结果，中断后可跳过已完成部分继续扫描
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from result_sink import read_jsonl, to_json_line
+
+# ============ 配置 ============
+
+# 断点记录先写入内存缓冲，按时间或条数批量落盘(中断时最多重扫这段时间内完成的主机)
+CHECKPOINT_FLUSH_INTERVAL = 2.0
+CHECKPOINT_FLUSH_RECORDS = 1000
+
+# 主机扫描阶段
+PHASE_SERVICES = "services"
+PHASE_SWEEP = "sweep"
+
+# 图形界面使用的断点文件(运行时生成)
+CHECKPOINT_FILE = "scan_checkpoint.jsonl"
+
+
+def job_signature(target: str, target_type: str, enable_full_port_scan: bool, exclude: str = "",
+                  ports: Optional[List[int]] = None) -> Dict:
+    """扫描任务的标识，只有相同任务的断点才能续扫"""
+    return {"target": str(target), "type": target_type, "full": bool(enable_full_port_scan),
+            "exclude": exclude or "", "ports": ports or None}
+
+
+class CheckpointState:
+    """从断点文件恢复的扫描状态"""
+
+    def __init__(self, job: Dict):
+        self.job = job
+        self.done = {}  # type: Dict[str, Set[str]]  # 阶段 -> 已完成的主机
+        self.results = []  # type: List[Tuple[str, str, Dict]]  # (主机, 阶段, 结果)
+        self.finished = False
+
+    def is_done(self, ip: str, phase: str) -> bool:
+        return ip in self.done.get(phase, ())
+
+    def hosts_done(self) -> int:
+        return len(self.done.get(PHASE_SERVICES, ()))
+
+    def completed_results(self) -> List[Dict]:
+        """所属阶段已完成的结果(阶段未完成时其结果会在续扫时重新发现)"""
+        return [result for ip, phase, result in self.results if self.is_done(ip, phase)]
+
+
+def load_checkpoint(path: str) -> Optional[CheckpointState]:
+    """读取断点文件，文件不存在或格式不符时返回None，忽略中断时写了一半的末行"""
+    if not os.path.exists(path):
+        return None
+    state = None
+    try:
+        for record in read_jsonl(path):
+            if "job" in record:
+                state = CheckpointState(record["job"])
+            elif state is None:
+                return None
+            elif "done" in record:
+                state.done.setdefault(record["phase"], set()).add(record["done"])
+            elif "result" in record:
+                state.results.append((record["ip"], record["phase"], record["result"]))
+            elif record.get("finished"):
+                state.finished = True
+    except (OSError, KeyError, TypeError):
+        return None
+    return state
+
+
+class CheckpointWriter:
+    """断点记录写入器：只追加，批量落盘
+
+    记录写入内存缓冲，距上次落盘超过 CHECKPOINT_FLUSH_INTERVAL 秒或缓冲达到
+    CHECKPOINT_FLUSH_RECORDS 条时一次写入，扫描热路径上只有一次字符串拼接。
+    """
+
+    def __init__(self, path: str, job: Dict, resume: bool = False):
+        self.path = path
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        if not resume:
+            self._append({"job": job})
+            self.flush()
+
+    def _append(self, record: Dict):
+        with self._lock:
+            self._buffer.append(to_json_line(record))
+            if (len(self._buffer) < CHECKPOINT_FLUSH_RECORDS
+                    and time.monotonic() - self._last_flush < CHECKPOINT_FLUSH_INTERVAL):
+                return
+            self._flush_locked()
+
+    def mark_done(self, ip: str, phase: str, results: List[Dict]):
+        """记录主机某阶段完成及该阶段发现的结果(结果在完成标记之前写入)"""
+        for result in results:
+            self._append({"result": result, "ip": ip, "phase": phase})
+        self._append({"done": ip, "phase": phase})
+
+    def finish(self):
+        """记录整个任务已完成"""
+        self._append({"finished": True})
+        self.flush()
+
+    def _flush_locked(self):
+        if self._buffer and not self._file.closed:
+            self._file.write("".join(self._buffer))
+            self._file.flush()
+        self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._file.close()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 命令行模块
+无界面运行扫描，结果以JSONL逐条输出，适合无图形环境、定时任务和管道处理
+
+用法: python -m llm_scanner 192.168.1.0/24 -o results.jsonl
+"""
+
+import argparse
+import json
+import queue
+import sys
+import threading
+from typing import List, Optional
+
+from llm_scanner import LLMScanner
+from message_bus import VERBOSITY_QUIET, VERBOSITY_NORMAL, VERBOSITY_DEBUG
+from metrics import MetricsServer, MetricsDumper, METRICS_INTERVAL, is_loopback, parse_listen
+from port_import import IMPORT_FORMATS
+
+
+def parse_ports(text: str) -> List[int]:
+    """解析端口列表，支持逗号分隔和范围: 8000,8080,11434 / 8000-8100"""
+    ports = []
+    for item in text.replace(" ", "").split(","):
+        if not item:
+            continue
+        if "-" in item:
+            start, end = (int(p) for p in item.split("-", 1))
+        else:
+            start = end = int(item)
+        if not 1 <= start <= end <= 65535:
+            raise argparse.ArgumentTypeError(f"无效的端口: {item}")
+        ports.extend(range(start, end + 1))
+    if not ports:
+        raise argparse.ArgumentTypeError("端口列表为空")
+    return ports
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="llm-scan",
+        description="本地LLM服务未授权访问扫描(命令行模式)，结果以JSONL格式逐条输出")
+    parser.add_argument("targets", nargs="*",
+                        help="扫描目标: IP、主机名、IP范围(1.1.1.1-254)或CIDR，可写多个")
+    parser.add_argument("-iL", "--target-file", help="从文件读取目标，每行一个或多个，# 开头为注释")
+    parser.add_argument("--import", dest="import_file", metavar="FILE",
+                        help="导入其它工具发现的开放端口(- 表示标准输入)，跳过存活探测和端口扫描直接识别服务")
+    parser.add_argument("--import-format", default="auto", choices=IMPORT_FORMATS,
+                        help="导入文件格式: masscan -oJ/-oL、nmap -oX/-oG 或 ip:port 列表(默认自动识别)")
+    parser.add_argument("-t", "--type", default="auto", choices=["auto", "single", "range", "cidr"],
+                        help="目标格式(默认自动识别)")
+    parser.add_argument("--exclude", default="", help="排除的目标，逗号分隔")
+    parser.add_argument("-p", "--ports", type=parse_ports,
+                        help="只探测这些端口(默认探测所有已知LLM服务端口)")
+    parser.add_argument("--full", action="store_true", help="启用全端口扫描检测vLLM")
+    parser.add_argument("-Pn", "--assume-up", action="store_true",
+                        help="跳过存活探测，所有目标视为存活(目标屏蔽ICMP和常见端口时使用)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL结果文件(追加写入)，默认输出到标准输出")
+    parser.add_argument("--engine", default="thread", choices=["thread", "async"], help="扫描引擎(默认thread)")
+    parser.add_argument("--checkpoint", metavar="FILE", help="断点文件，记录已完成的主机，中断后可用 --resume 继续")
+    parser.add_argument("--resume", action="store_true", help="从 --checkpoint 指定的断点继续同一任务")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="分片扫描的工作进程数，大于1时目标按进程切分(并发参数按进程生效)")
+
+    group = parser.add_argument_group("结果库与增量扫描")
+    group.add_argument("--store", metavar="FILE", help="SQLite结果库，保存每台主机的端口和发现并输出与上次的变化")
+    group.add_argument("--ttl", type=float, metavar="HOURS",
+                       help="增量模式: 该时间内完整验证过的主机只确认端口仍开放，沿用库中结果(需要 --store)")
+    group.add_argument("--diff", action="store_true", help="标准输出只输出与上次扫描相比的变化(需要 --store)；使用 -o 时变化输出到标准错误")
+    group.add_argument("--history", metavar="FILE",
+                       help="命中历史文件: 历史上有发现的主机、端口和路径优先探测，扫描结束后更新")
+
+    group = parser.add_argument_group("并发与超时")
+    group.add_argument("--workers", type=int, help="全局在途HTTP探测数上限(thread引擎)")
+    group.add_argument("--hosts", type=int, help="同时扫描的主机数")
+    group.add_argument("--per-host", type=int, help="单主机在途探测数上限，0表示不限制")
+    group.add_argument("--inflight", type=int, help="在途连接总数上限(async引擎为全部探测，thread引擎为端口扫描)")
+    group.add_argument("--connect-timeout", type=float, help="尚无RTT样本时的连接超时(秒)")
+    group.add_argument("--http-timeout", type=float, help="尚无RTT样本时的HTTP超时(秒)")
+    group.add_argument("--rate", type=float, help="全局探测速率上限(次/秒，TCP连接与HTTP请求合计)，默认不限速")
+    group.add_argument("--host-rate", type=float, help="单主机探测速率上限(次/秒)")
+    group.add_argument("--no-adaptive", action="store_true", help="关闭连接超时比例突增时的自动降速")
+
+    group = parser.add_argument_group("多节点协同")
+    group.add_argument("--coordinator", metavar="HOST:PORT",
+                       help="作为协调节点在该地址监听，把目标切分为工作单元分配给工作节点；"
+                            "省略主机时只监听 127.0.0.1，监听其他地址时必须指定 --token")
+    group.add_argument("--worker", metavar="URL", help="作为工作节点连接协调节点执行扫描，无需指定目标")
+    group.add_argument("--unit-hosts", type=int, help="每个工作单元的主机数(协调节点)")
+    group.add_argument("--token", help="协调节点与工作节点之间的共享口令，同时用作指标端点的 Bearer 口令")
+
+    group = parser.add_argument_group("扫描指标")
+    group.add_argument("--metrics", metavar="HOST:PORT",
+                       help="扫描期间在该地址提供指标: /metrics 为Prometheus文本格式，/stats 为JSON；"
+                            "省略主机时只监听 127.0.0.1，监听其他地址时必须指定 --token")
+    group.add_argument("--metrics-file", metavar="FILE", help="定期把指标快照写入该JSON文件，扫描结束时再写一次")
+    group.add_argument("--metrics-interval", type=float, default=METRICS_INTERVAL, metavar="SECONDS",
+                       help=f"写入指标文件的间隔(默认{METRICS_INTERVAL:g}秒)")
+
+    group = parser.add_argument_group("日志")
+    group.add_argument("-q", "--quiet", action="store_true", help="只输出发现、警告和错误")
+    group.add_argument("-v", "--verbose", action="store_true", help="输出逐端口/逐探测的调试日志")
+    return parser
+
+
+def get_verbosity(args) -> int:
+    return VERBOSITY_QUIET if args.quiet else (VERBOSITY_DEBUG if args.verbose else VERBOSITY_NORMAL)
+
+
+def get_engine_options(args) -> dict:
+    """所选引擎的并发参数"""
+    engine_options = {}
+    if args.per_host is not None:
+        engine_options["per_host_limit"] = args.per_host
+    if args.engine == "async":
+        if args.inflight is not None:
+            engine_options["max_inflight"] = args.inflight
+        if args.hosts is not None:
+            engine_options["max_hosts"] = args.hosts
+    else:
+        if args.workers is not None:
+            engine_options["max_workers"] = args.workers
+        if args.hosts is not None:
+            engine_options["host_workers"] = args.hosts
+        if args.inflight is not None:
+            engine_options["sweep_inflight"] = args.inflight
+    return engine_options
+
+
+def create_scanner(args, results_file: Optional[str]) -> LLMScanner:
+    """按命令行参数创建扫描器，只导入所选的引擎"""
+    # 命令行模式下结果逐条输出，不在内存中保留
+    options = {"verbosity": get_verbosity(args), "results_file": results_file, "max_results": 0}
+    engine_options = get_engine_options(args)
+    if args.coordinator:
+        from distributed import Coordinator, UNIT_HOSTS
+        scanner = Coordinator(args.coordinator, args.unit_hosts or UNIT_HOSTS, token=args.token, **options)
+    elif args.processes > 1:
+        from sharded_scanner import ShardedScanner
+        scanner = ShardedScanner(args.processes, args.engine, **options, **engine_options)
+    else:
+        options.update(checkpoint_file=args.checkpoint, resume=args.resume, store_file=args.store,
+                       incremental_ttl=args.ttl * 3600 if args.ttl else None)
+        if args.engine == "async":
+            from async_scanner import AsyncLLMScanner
+            scanner = AsyncLLMScanner(**options, **engine_options)
+        else:
+            scanner = LLMScanner(**options, **engine_options)
+    if args.ports:
+        scanner.set_ports(args.ports)
+    if args.connect_timeout is not None:
+        scanner.connect_timeout = args.connect_timeout
+    if args.http_timeout is not None:
+        scanner.http_timeout = args.http_timeout
+    scanner.assume_up = args.assume_up
+    scanner.import_format = args.import_format
+    scanner.history_file = args.history
+    scanner.rate_limit = args.rate
+    scanner.per_host_rate = args.host_rate
+    scanner.adaptive_rate = not args.no_adaptive
+    return scanner
+
+
+def run_worker(args) -> int:
+    """工作节点模式：从协调节点领取单元执行，结果由协调节点汇总"""
+    from distributed import run_worker as worker_loop
+    from message_bus import LEVEL_VERBOSITY
+
+    verbosity = get_verbosity(args)
+
+    def log(text: str, level: str):
+        if LEVEL_VERBOSITY.get(level, VERBOSITY_NORMAL) <= verbosity:
+            sys.stderr.write(text + "\n")
+
+    options = dict(get_engine_options(args), verbosity=verbosity)
+    try:
+        worker_loop(args.worker, args.engine, options, args.token, log)
+    except (ConnectionError, RuntimeError) as e:
+        sys.stderr.write(f"{e}\n")
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.worker:
+        return run_worker(args)
+    if sum(map(bool, (args.targets, args.target_file, args.import_file))) != 1:
+        parser.error("请指定扫描目标、--target-file 或 --import (三者选一)")
+    if args.import_file and (args.checkpoint or args.store or args.coordinator or args.processes > 1):
+        parser.error("--import 不能与 --checkpoint/--store/--processes/--coordinator 同时使用")
+    if args.resume and not args.checkpoint:
+        parser.error("--resume 需要同时指定 --checkpoint")
+    if args.checkpoint and (args.coordinator or args.processes > 1):
+        parser.error("--checkpoint 仅支持单进程扫描(不能与 --processes/--coordinator 同时使用)")
+    if (args.ttl or args.diff) and not args.store:
+        parser.error("--ttl/--diff 需要同时指定 --store")
+    if args.store and (args.coordinator or args.processes > 1):
+        parser.error("--store 仅支持单进程扫描(不能与 --processes/--coordinator 同时使用)")
+    for option, listen in (("--coordinator", args.coordinator), ("--metrics", args.metrics)):
+        if not listen:
+            continue
+        try:
+            host, _ = parse_listen(listen)
+        except ValueError:
+            parser.error(f"无效的 {option} 地址: {listen}")
+        if not args.token and not is_loopback(host):
+            parser.error(f"{option} 监听非本机地址时必须指定 --token")
+    if args.import_file:
+        target, target_type = args.import_file, "import"
+    elif args.target_file:
+        target, target_type = args.target_file, "file"
+    else:
+        target, target_type = ",".join(args.targets), args.type
+
+    to_stdout = args.output == "-"
+    scanner = create_scanner(args, None if to_stdout else args.output)
+    metrics_server = metrics_dumper = None
+    if args.metrics:
+        try:
+            metrics_server = MetricsServer(args.metrics, scanner.metrics_snapshot, args.token)
+            metrics_server.start()
+        except (OSError, ValueError) as e:
+            sys.stderr.write(f"无法在 {args.metrics} 提供指标: {e}\n")
+            return 1
+    if args.metrics_file:
+        metrics_dumper = MetricsDumper(args.metrics_file, scanner.metrics_snapshot, args.metrics_interval)
+        metrics_dumper.start()
+    errors = []
+
+    def run_scan():
+        try:
+            scanner.scan(target, target_type, args.full, args.exclude)
+        except Exception as e:
+            # 扫描线程异常退出时不会发送 done 消息，由这里补发
+            errors.append(e)
+            scanner.msg_queue.put(("log", f"扫描异常终止: {e}", "error"))
+            scanner.msg_queue.put(("done", [], None))
+
+    scan_thread = threading.Thread(target=run_scan, daemon=True)
+    scan_thread.start()
+
+    # 日志输出到标准错误，标准输出只有JSONL结果，便于管道处理
+    done = interrupted = False
+    while not done:
+        try:
+            msg_type, msg_data, msg_level = scanner.msg_queue.get(timeout=0.2)
+        except queue.Empty:
+            continue
+        except KeyboardInterrupt:
+            interrupted = True
+            scanner.stop()
+            continue
+        if msg_type == "log_batch":
+            sys.stderr.write("".join(text + "\n" for text, _ in msg_data))
+        elif msg_type == "log":
+            sys.stderr.write(msg_data + "\n")
+        elif msg_type == "diff" and args.diff:
+            # 结果写入 -o 文件时，变化输出到标准错误
+            stream = sys.stdout if to_stdout else sys.stderr
+            stream.write(json.dumps(msg_data, ensure_ascii=False) + "\n")
+            stream.flush()
+        elif msg_type == "result" and to_stdout and not args.diff:
+            sys.stdout.write(json.dumps(msg_data, ensure_ascii=False) + "\n")
+            sys.stdout.flush()
+        elif msg_type == "done":
+            done = True
+    scan_thread.join()
+    if metrics_dumper is not None:
+        metrics_dumper.stop()
+    if metrics_server is not None:
+        metrics_server.stop()
+    sys.stderr.flush()
+    # 只有完整执行的扫描返回0，定时任务和CI可据此发现失败
+    if errors or scanner.scan_failed:
+        return 1
+    return 130 if interrupted else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 非阻塞连接扫描模块
+基于selectors(epoll/kqueue/select)在单线程内维持大量并发TCP连接
+"""
+
+import errno
+import heapq
+import selectors
+import socket
+import sys
+import time
+from collections import namedtuple
+from typing import Iterable, Iterator, Tuple, Callable, Optional
+
+# ============ 配置 ============
+
+# 单个扫描器的默认在途连接数
+CONNECT_INFLIGHT = 1000
+
+# 默认连接超时(秒)
+CONNECT_TIMEOUT = 0.2
+
+# Windows 的 select() 最多支持 512 个套接字
+WINDOWS_SELECT_LIMIT = 500
+
+# 为系统保留的文件描述符数量
+FD_RESERVE = 64
+
+# 连接结果状态
+OPEN = "open"
+REFUSED = "refused"
+TIMEOUT = "timeout"
+ERROR = "error"
+
+# 文件描述符耗尽时等待在途连接释放的时间(秒)
+FD_RETRY_DELAY = 0.01
+
+# 无法创建套接字(文件描述符或缓冲区耗尽)的错误码
+_NO_SOCKET = {errno.EMFILE, errno.ENFILE, errno.ENOBUFS}
+
+# 非阻塞connect进行中的错误码
+_IN_PROGRESS = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY, 10035}
+
+ConnectResult = namedtuple("ConnectResult", ["ip", "port", "state", "rtt"])
+
+
+def ensure_fd_budget(wanted: int) -> int:
+    """尽量提高进程文件描述符上限，返回实际可用的并发连接数"""
+    if sys.platform == "win32":
+        return min(wanted, WINDOWS_SELECT_LIMIT)
+    try:
+        import resource
+    except ImportError:
+        return wanted
+    try:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        need = wanted + FD_RESERVE
+        if soft != resource.RLIM_INFINITY and soft < need:
+            new_soft = need if hard == resource.RLIM_INFINITY else min(need, hard)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (new_soft, hard))
+            soft = new_soft
+        if soft == resource.RLIM_INFINITY:
+            return wanted
+        return max(1, min(wanted, soft - FD_RESERVE))
+    except (ValueError, OSError):
+        return wanted
+
+
+class ConnectScanner:
+    """非阻塞TCP connect扫描器
+
+    单线程内同时保持最多 max_inflight 个进行中的连接，
+    套接字数量始终有上限，连接完成(或超时)即关闭并补充新目标，
+    结果按完成顺序逐个产出。
+    传入 timing(HostTiming)时，每个连接使用其当前的连接超时，
+    并把握手成功或被拒绝的RTT反馈给它。
+    传入 limiter(RateLimiter)时，每个连接发起前预占令牌，令牌不足时
+    暂停发起新连接(已在途的连接照常完成)，直到令牌到期。
+    """
+
+    def __init__(self, max_inflight: int = CONNECT_INFLIGHT, timeout: float = CONNECT_TIMEOUT, timing=None,
+                 limiter=None):
+        self.max_inflight = ensure_fd_budget(max_inflight)
+        self.timeout = timeout
+        self.timing = timing
+        self.limiter = limiter
+
+    def _result(self, ip: str, port: int, state: str, rtt: float) -> ConnectResult:
+        if self.timing is not None and state in (OPEN, REFUSED):
+            self.timing.observe(rtt)
+        return ConnectResult(ip, port, state, rtt)
+
+    def _start(self, ip: str, port: int):
+        """发起非阻塞连接，返回(套接字, 立即得到的状态)；无法创建套接字时返回 (None, None)"""
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        except OSError as e:
+            return None, None if e.errno in _NO_SOCKET else ERROR
+        sock.setblocking(False)
+        try:
+            err = sock.connect_ex((ip, port))
+        except OSError as e:
+            err = e.errno or -1
+        if err in _IN_PROGRESS:
+            return sock, None
+        sock.close()
+        if err == 0:
+            return None, OPEN
+        return None, REFUSED if err == errno.ECONNREFUSED else ERROR
+
+    def scan(self, targets: Iterable[Tuple[str, int]],
+             should_stop: Optional[Callable[[], bool]] = None) -> Iterator[ConnectResult]:
+        """扫描 (ip, port) 目标序列，按完成顺序产出 ConnectResult"""
+        selector = selectors.DefaultSelector()
+        deadlines = []  # (截止时间, 序号, 套接字)
+        inflight = {}   # 套接字 -> (ip, port, 开始时间)
+        targets = iter(targets)
+        exhausted = False
+        held = None     # 等待令牌的目标 (可发起时间, ip, port)
+        seq = 0
+
+        def finish(sock):
+            selector.unregister(sock)
+            sock.close()
+            return inflight.pop(sock)
+
+        try:
+            while True:
+                stopping = should_stop is not None and should_stop()
+                while (held is not None or not exhausted) and not stopping and len(inflight) < self.max_inflight:
+                    if held is None:
+                        target = next(targets, None)
+                        if target is None:
+                            exhausted = True
+                            break
+                        ip, port = target
+                        delay = self.limiter.reserve(ip) if self.limiter is not None else 0.0
+                        if delay > 0:
+                            held = (time.monotonic() + delay, ip, port)
+                    if held is not None:
+                        if held[0] > time.monotonic():
+                            break
+                        _, ip, port = held
+                        held = None
+                    started = time.monotonic()
+                    sock, state = self._start(ip, port)
+                    if sock is None and state is None:
+                        # 文件描述符耗尽：降低在途上限，目标等在途连接完成后重试；没有在途连接时记为错误
+                        if inflight:
+                            self.max_inflight = max(1, len(inflight))
+                            held = (time.monotonic() + FD_RETRY_DELAY, ip, port)
+                            break
+                        state = ERROR
+                    if sock is None:
+                        yield self._result(ip, port, state, time.monotonic() - started)
+                        continue
+                    selector.register(sock, selectors.EVENT_WRITE)
+                    inflight[sock] = (ip, port, started)
+                    seq += 1
+                    timeout = self.timing.connect_timeout if self.timing is not None else self.timeout
+                    heapq.heappush(deadlines, (started + timeout, seq, sock))
+
+                if stopping or (not inflight and held is None):
+                    return
+                if not inflight:
+                    time.sleep(min(self.timeout, max(0.0, held[0] - time.monotonic())))
+                    continue
+
+                # 跳过已完成的连接，取最早的截止时间(或令牌到期时间)作为select超时
+                while deadlines and deadlines[0][2] not in inflight:
+                    heapq.heappop(deadlines)
+                wait = max(0.0, deadlines[0][0] - time.monotonic()) if deadlines else self.timeout
+                if held is not None:
+                    wait = min(wait, max(0.0, held[0] - time.monotonic()))
+                for key, _ in selector.select(wait):
+                    sock = key.fileobj
+                    err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    ip, port, started = finish(sock)
+                    if err == 0:
+                        state = OPEN
+                    elif err == errno.ECONNREFUSED or err == 10061:
+                        state = REFUSED
+                    else:
+                        state = ERROR
+                    yield self._result(ip, port, state, time.monotonic() - started)
+
+                now = time.monotonic()
+                while deadlines and deadlines[0][0] <= now:
+                    _, _, sock = heapq.heappop(deadlines)
+                    if sock in inflight:
+                        ip, port, started = finish(sock)
+                        yield ConnectResult(ip, port, TIMEOUT, now - started)
+        finally:
+            for sock in list(inflight):
+                finish(sock)
+            selector.close()
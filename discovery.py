@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 存活探测模块
+在昂贵的服务探测和全端口扫描之前批量探测主机是否存活：
+ICMP回显(有权限时) + 常见端口的TCP连接，任一端口握手成功或被拒绝(RST)即视为存活
+"""
+
+import errno
+import os
+import select
+import socket
+import struct
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, Set
+
+from connect_scan import ConnectScanner, OPEN, REFUSED
+
+# ============ 配置 ============
+
+# 存活探测的TCP端口(另加当前探测的已知LLM服务端口)
+DISCOVERY_PORTS = [80, 443, 22, 445, 3389, 135, 139, 21, 23, 25, 53, 3306, 5432, 8443]
+
+# 每批探测的主机数和在途连接数上限
+DISCOVERY_BATCH = 256
+DISCOVERY_INFLIGHT = 2000
+
+# ICMP回显等待时间上限(秒)，所有主机都已回复时提前结束
+ICMP_TIMEOUT = 1.0
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+
+def icmp_checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def open_icmp_socket() -> Optional[socket.socket]:
+    """打开ICMP套接字：优先使用无需特权的 SOCK_DGRAM，其次 SOCK_RAW；均无权限时返回None"""
+    for kind in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+        try:
+            sock = socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP)
+        except OSError:
+            continue
+        sock.setblocking(False)
+        return sock
+    return None
+
+
+def icmp_echo_request(ident: int, seq: int) -> bytes:
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    payload = b"llm-scanner"
+    checksum = icmp_checksum(header + payload)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, checksum, ident, seq) + payload
+
+
+def icmp_sweep(ips: List[str], timeout: float = ICMP_TIMEOUT, limiter=None) -> Iterator[str]:
+    """向一批主机发送ICMP回显请求，按回复顺序产出存活主机；没有ICMP权限时不产出任何主机
+
+    传入 limiter(RateLimiter)时按其速率发送。
+    """
+    sock = open_icmp_socket()
+    if sock is None:
+        return
+    raw = sock.type == socket.SOCK_RAW
+    ident = os.getpid() & 0xFFFF
+    waiting = set()
+    try:
+        for seq, ip in enumerate(ips):
+            if limiter is not None:
+                delay = limiter.reserve(ip)
+                if delay > 0:
+                    time.sleep(delay)
+            try:
+                sock.sendto(icmp_echo_request(ident, seq & 0xFFFF), (ip, 0))
+                waiting.add(ip)
+            except OSError:
+                continue
+        deadline = time.monotonic() + timeout
+        while waiting:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([sock], [], [], remaining)[0]:
+                return
+            try:
+                packet, (ip, _) = sock.recvfrom(1024)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    continue
+                return
+            # SOCK_RAW 收到的是含IP头的全部ICMP报文，SOCK_DGRAM 只有本套接字的ICMP报文
+            if raw:
+                packet = packet[(packet[0] & 0x0F) * 4:]
+            if len(packet) < 8 or packet[0] != ICMP_ECHO_REPLY:
+                continue
+            if raw and struct.unpack("!H", packet[4:6])[0] != ident:
+                continue
+            if ip in waiting:
+                waiting.discard(ip)
+                yield ip
+    finally:
+        sock.close()
+
+
+def tcp_discover(ips: List[str], ports: List[int], inflight: int = DISCOVERY_INFLIGHT,
+                 timeout: float = 1.0, should_stop: Optional[Callable[[], bool]] = None,
+                 limiter=None) -> Iterator[str]:
+    """按端口轮询一批主机的TCP端口，按确认顺序产出存活主机
+
+    目标按 端口 -> 主机 的顺序惰性生成，已确认存活的主机不再发起后续连接。
+    """
+    alive = set()  # type: Set[str]
+
+    def targets():
+        for port in ports:
+            for ip in ips:
+                if ip not in alive:
+                    yield ip, port
+
+    scanner = ConnectScanner(inflight, timeout, limiter=limiter)
+    for result in scanner.scan(targets(), should_stop):
+        if result.state in (OPEN, REFUSED) and result.ip not in alive:
+            alive.add(result.ip)
+            yield result.ip
+
+
+def discover_hosts(ips: Iterable[str], ports: List[int], inflight: int = DISCOVERY_INFLIGHT,
+                   timeout: float = 1.0, use_icmp: bool = True,
+                   should_stop: Optional[Callable[[], bool]] = None, limiter=None) -> Iterator[str]:
+    """批量存活探测，确认存活即产出；先ICMP，未回复的主机再做TCP探测
+
+    探测占用 limiter 的速率配额，但不向其反馈连接结果(不存在的主机本来就全部超时)。
+    """
+    ips = list(ips)
+    alive = set()
+    if use_icmp:
+        for ip in icmp_sweep(ips, min(timeout, ICMP_TIMEOUT), limiter):
+            alive.add(ip)
+            yield ip
+    remaining = [ip for ip in ips if ip not in alive]
+    if remaining and not (should_stop and should_stop()):
+        yield from tcp_discover(remaining, ports, inflight, timeout, should_stop, limiter)
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 多节点协同扫描模块
+协调节点将目标切分为工作单元并以租约方式分配，工作节点运行扫描引擎并回传结果。
+通信使用HTTP+JSON，工作节点未完整扫描的单元会被交还，停止心跳后其单元会在租约到期时重新分配。
+"""
+
+import json
+import os
+import queue
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Optional, Callable
+
+from llm_scanner import LLMScanner, MAX_RESULTS
+from message_bus import VERBOSITY_NORMAL
+from metrics import is_loopback, parse_listen
+from sharded_scanner import create_engine
+from targets import TargetSpace
+
+# ============ 配置 ============
+
+# 每个工作单元包含的主机数
+UNIT_HOSTS = 256
+
+# 租约时长(秒)，期间收不到心跳则重新分配
+LEASE_SECONDS = 30
+
+# 工作节点心跳间隔(秒)，有新结果时会提前发送
+HEARTBEAT_INTERVAL = 5
+
+# 暂无可分配单元时工作节点的等待间隔(秒)
+WAIT_INTERVAL = 1
+
+# 扫描结束后协调节点继续应答的时间(秒)，让等待中的工作节点收到结束通知
+SHUTDOWN_GRACE = 3
+
+# 工作节点连续请求失败的重试次数
+RETRY_LIMIT = 5
+
+# 请求头中的共享口令
+TOKEN_HEADER = "X-Scan-Token"
+
+# 协调节点的默认监听地址(只接受本机连接)
+DEFAULT_LISTEN = "127.0.0.1:8765"
+
+# 工作单元状态
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+
+
+def result_key(result: Dict) -> tuple:
+    """结果去重键(同一单元重新分配后可能被重复回传)"""
+    return result["ip"], result["port"], result["service"], result["url"]
+
+
+class WorkUnit:
+    """一个工作单元：一段连续的目标主机"""
+
+    def __init__(self, unit_id: int, space: TargetSpace, units: int):
+        self.id = unit_id
+        self.ranges = space.ranges
+        self.hosts = len(space)
+        self.units = units  # 探测数，用于汇总进度
+        self.state = PENDING
+        self.lease = None
+        self.worker = None
+        self.expires = 0.0
+        self.progress = 0
+        self.attempts = 0
+
+
+class Coordinator(LLMScanner):
+    """协调节点
+
+    与 LLMScanner 使用相同的 scan()/stop()/msg_queue 接口，扫描时在 listen 地址上
+    启动HTTP服务，由工作节点领取单元执行。监听非本机地址时必须设置共享口令。工作节点的接口:
+      POST /lease      {"worker"}                        -> 单元 / {"wait": true} / {"done": true}
+      POST /heartbeat  {"unit", "lease", "progress", "results"} -> {"ok"} / {"lost"} / {"stop"}
+      POST /complete   {"unit", "lease", "results"}       -> {"ok"} / {"lost"}
+      POST /release    {"unit", "lease", "results"}       -> {"ok"} / {"lost"}  未完整扫描，交还单元
+    """
+
+    def __init__(self, listen: str = DEFAULT_LISTEN, unit_hosts: int = UNIT_HOSTS,
+                 lease_seconds: float = LEASE_SECONDS, token: Optional[str] = None,
+                 verbosity: int = VERBOSITY_NORMAL, results_file: Optional[str] = None,
+                 max_results: Optional[int] = MAX_RESULTS):
+        super().__init__(verbosity=verbosity, results_file=results_file, max_results=max_results)
+        self.listen = parse_listen(listen)
+        if not token and not is_loopback(self.listen[0]):
+            raise ValueError(f"协调节点监听非本机地址 {self.listen[0]} 时必须设置共享口令")
+        self.unit_hosts = max(1, unit_hosts)
+        self.lease_seconds = lease_seconds
+        self.token = token
+        self.units = []  # type: List[WorkUnit]
+        self.enable_full_port_scan = False
+        self._pending = []  # 待分配的单元序号(栈，重新分配的单元优先)
+        self._leased = {}   # 单元序号 -> 已分配的单元
+        self._remaining = 0
+        self._done_units = 0
+        self._total_units = 1
+        self._seen = set()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._server = None
+
+    # ---------- 工作单元管理 ----------
+
+    def _requeue(self, unit: WorkUnit):
+        """单元放回待分配栈顶，优先重新分配(需持有锁)"""
+        unit.state, unit.lease, unit.worker, unit.progress = PENDING, None, None, 0
+        del self._leased[unit.id]
+        self._pending.append(unit.id)
+
+    def _expire_leases(self):
+        """回收租约到期的单元(需持有锁)"""
+        now = time.monotonic()
+        for unit in [u for u in self._leased.values() if u.expires < now]:
+            self.log(f"单元 {unit.id} 的租约已过期(工作节点 {unit.worker})，重新分配", "warning")
+            self._requeue(unit)
+
+    def _lease(self, request: Dict) -> Dict:
+        with self._lock:
+            if self.stop_flag or not self._remaining:
+                return {"done": True}
+            self._expire_leases()
+            if not self._pending:
+                return {"wait": True, "retry": WAIT_INTERVAL}
+            unit = self.units[self._pending.pop()]
+            unit.state, unit.lease, unit.worker = LEASED, uuid.uuid4().hex, str(request.get("worker"))
+            self._leased[unit.id] = unit
+            unit.expires = time.monotonic() + self.lease_seconds
+            unit.attempts += 1
+            self.log(f"单元 {unit.id} ({unit.hosts} 台主机) 分配给 {unit.worker}", "debug")
+            return {"unit": unit.id, "lease": unit.lease, "ranges": unit.ranges,
+                    "full": self.enable_full_port_scan, "settings": self.export_settings(),
+                    "lease_seconds": self.lease_seconds, "heartbeat": HEARTBEAT_INTERVAL}
+
+    def _holder(self, request: Dict) -> Optional[WorkUnit]:
+        """校验租约，返回仍由请求方持有的单元(需持有锁)"""
+        unit_id = request.get("unit")
+        if not isinstance(unit_id, int) or not 0 <= unit_id < len(self.units):
+            return None
+        unit = self.units[unit_id]
+        if unit.state != LEASED or unit.lease != request.get("lease"):
+            return None
+        return unit
+
+    def _accept_results(self, results: List[Dict], worker: str):
+        """登记工作节点回传的结果，重复结果只记录一次"""
+        fresh = []
+        with self._lock:
+            for result in results:
+                key = result_key(result)
+                if key not in self._seen:
+                    self._seen.add(key)
+                    fresh.append(result)
+        for result in fresh:
+            self.log(f"[!] 发现漏洞: {result['service']} @ {result['ip']}:{result['port']} ({worker})", "error")
+        self.add_results(fresh)
+
+    def _heartbeat(self, request: Dict) -> Dict:
+        with self._lock:
+            unit = self._holder(request)
+            if unit is None:
+                return {"lost": True}
+            unit.expires = time.monotonic() + self.lease_seconds
+            unit.progress = max(0, min(100, int(request.get("progress", 0))))
+            worker = unit.worker
+        self._accept_results(request.get("results", []), worker)
+        self._update_progress()
+        return {"stop": True} if self.stop_flag else {"ok": True}
+
+    def _complete(self, request: Dict) -> Dict:
+        with self._lock:
+            unit = self._holder(request)
+            if unit is None:
+                return {"lost": True}
+            unit.state, unit.progress = DONE, 100
+            del self._leased[unit.id]
+            self._remaining -= 1
+            self._done_units += unit.units
+            worker = unit.worker
+        self._accept_results(request.get("results", []), worker)
+        self.log(f"单元 {unit.id} 完成 ({worker})", "debug")
+        self._update_progress()
+        with self._changed:
+            self._changed.notify_all()
+        return {"ok": True}
+
+    def _release(self, request: Dict) -> Dict:
+        with self._lock:
+            unit = self._holder(request)
+            if unit is None:
+                return {"lost": True}
+            worker = unit.worker
+            self._requeue(unit)
+        # 已发现的结果照常登记，单元重新扫描时的重复结果会被去重
+        self._accept_results(request.get("results", []), worker)
+        self.log(f"单元 {unit.id} 未完整扫描，由 {worker} 交还，重新分配", "warning")
+        self._update_progress()
+        return {"ok": True}
+
+    def _update_progress(self):
+        with self._lock:
+            done = self._done_units * 100 + sum(unit.units * unit.progress for unit in self._leased.values())
+        value = min(99, int(done / self._total_units))
+        with self._progress_lock:
+            if value <= self.progress:
+                return
+            self.progress = value
+        self.bus.progress(value)
+
+    def handle(self, path: str, request: Dict) -> Optional[Dict]:
+        """分发工作节点请求，未知路径返回None"""
+        handlers = {"/lease": self._lease, "/heartbeat": self._heartbeat, "/complete": self._complete,
+                    "/release": self._release}
+        handler = handlers.get(path)
+        return handler(request) if handler else None
+
+    # ---------- 扫描流程 ----------
+
+    def prepare_units(self, ips: TargetSpace, enable_full_port_scan: bool = False):
+        """把目标切分为工作单元，全部置为待分配"""
+        self.enable_full_port_scan = enable_full_port_scan
+        per_host = self.host_units(enable_full_port_scan)
+        parts = (len(ips) + self.unit_hosts - 1) // self.unit_hosts
+        self.units = [WorkUnit(i, space, per_host * len(space)) for i, space in enumerate(ips.split(parts))]
+        self._pending = list(range(len(self.units) - 1, -1, -1))
+        self._leased = {}
+        self._remaining = len(self.units)
+        self._done_units = 0
+        self._total_units = sum(unit.units for unit in self.units) or 1
+        self._seen = set()
+
+    def scan_targets(self, ips: TargetSpace, enable_full_port_scan: bool = False):
+        """切分工作单元，启动HTTP服务并等待所有单元完成"""
+        self.prepare_units(ips, enable_full_port_scan)
+        try:
+            self._server = ThreadingHTTPServer(self.listen, make_handler(self))
+        except OSError as e:
+            self.log(f"无法监听 {self.listen[0]}:{self.listen[1]}: {e}", "error")
+            return
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.log(f"协调节点监听 {self.listen[0]}:{self.listen[1]}, 共 {len(self.units)} 个工作单元")
+
+        with self._changed:
+            while not self.stop_flag and self._remaining:
+                self._changed.wait(1.0)
+                self._expire_leases()
+        # 留出时间让工作节点收到结束/停止通知
+        time.sleep(SHUTDOWN_GRACE)
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+
+    def stop(self):
+        """停止扫描，工作节点在下次心跳时收到停止通知"""
+        super().stop()
+        with self._changed:
+            self._changed.notify_all()
+
+
+def make_handler(coordinator: Coordinator):
+    """创建绑定到协调节点的HTTP请求处理类"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if coordinator.token and self.headers.get(TOKEN_HEADER) != coordinator.token:
+                return self._reply(403, {"error": "forbidden"})
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                return self._reply(400, {"error": "bad request"})
+            response = coordinator.handle(self.path, request)
+            if response is None:
+                return self._reply(404, {"error": "not found"})
+            self._reply(200, response)
+
+        def _reply(self, status: int, body: Dict):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+# ============ 工作节点 ============
+
+class CoordinatorClient:
+    """工作节点访问协调节点的HTTP客户端，失败时按次数重试"""
+
+    def __init__(self, url: str, token: Optional[str] = None, timeout: float = 10):
+        self.url = url.rstrip("/")
+        if "://" not in self.url:
+            self.url = "http://" + self.url
+        self.token = token
+        self.timeout = timeout
+
+    def call(self, path: str, payload: Dict) -> Dict:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers[TOKEN_HEADER] = self.token
+        error = None
+        for attempt in range(RETRY_LIMIT):
+            request = urllib.request.Request(self.url + path, data=data, headers=headers, method="POST")
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    return json.loads(response.read())
+            except urllib.error.HTTPError as e:
+                raise ConnectionError(f"协调节点拒绝请求: HTTP {e.code}")
+            except (OSError, ValueError) as e:
+                error = e
+                time.sleep(min(2 ** attempt, 10))
+        raise ConnectionError(f"无法连接协调节点 {self.url}: {error}")
+
+
+def run_unit(client: CoordinatorClient, lease: Dict, engine: str, options: Dict,
+             log: Callable[[str, str], None], should_stop: Optional[Callable[[], bool]] = None) -> bool:
+    """执行一个租到的单元，按心跳间隔回传进度和结果；返回False表示协调节点要求停止或本节点被停止
+
+    只有完整扫描的单元才报告完成；扫描被停止或异常终止时交还单元(交还失败则等租约到期)，
+    异常终止时随后抛出 RuntimeError。
+    """
+    scanner = create_engine(engine, dict(options, max_results=0, results_file=None))
+    scanner.apply_settings(lease.get("settings") or {})
+    scanner.prepare_schedule()
+    ident = {"unit": lease["unit"], "lease": lease["lease"]}
+    interval = min(lease.get("heartbeat", HEARTBEAT_INTERVAL), lease.get("lease_seconds", LEASE_SECONDS) / 3)
+
+    errors = []
+
+    def scan():
+        try:
+            scanner.scan_targets(TargetSpace(lease["ranges"]), lease.get("full", False))
+        except Exception as e:
+            errors.append(e)
+
+    scanner.scanning = True
+    scanner.bus.start()
+    worker = threading.Thread(target=scan, daemon=True)
+    worker.start()
+
+    pending, progress = [], 0
+    last_beat = time.monotonic()
+    lost = False
+    keep_going = True
+    while worker.is_alive() or not scanner.msg_queue.empty():
+        if should_stop is not None and should_stop() and not scanner.stop_flag:
+            scanner.stop_flag = True
+            keep_going = False
+        try:
+            msg_type, msg_data, msg_level = scanner.msg_queue.get(timeout=0.2)
+            if msg_type == "log_batch":
+                for text, level in msg_data:
+                    log(text, level)
+            elif msg_type == "progress":
+                progress = msg_data
+            elif msg_type == "result":
+                pending.append(msg_data)
+        except queue.Empty:
+            pass
+        if pending or time.monotonic() - last_beat >= interval:
+            reply = client.call("/heartbeat", dict(ident, progress=progress, results=pending))
+            pending, last_beat = [], time.monotonic()
+            if reply.get("lost") or reply.get("stop"):
+                # 租约已被回收或扫描已取消，放弃本单元
+                scanner.stop_flag = True
+                keep_going = not reply.get("stop")
+                lost = bool(reply.get("lost"))
+                break
+    worker.join()
+    scanner.scanning = False
+    scanner.bus.stop()
+    if lost:
+        return keep_going
+    if not errors and not scanner.stop_flag:
+        client.call("/complete", dict(ident, results=pending))
+        return keep_going
+    try:
+        client.call("/release", dict(ident, results=pending))
+    except ConnectionError as e:
+        log(f"交还单元 {lease['unit']} 失败，等待租约到期后重新分配: {e}", "warning")
+    if errors:
+        raise RuntimeError(f"单元 {lease['unit']} 扫描异常终止: {errors[0]}")
+    return keep_going
+
+
+def run_worker(url: str, engine: str = "thread", options: Optional[Dict] = None, token: Optional[str] = None,
+               log: Optional[Callable[[str, str], None]] = None, should_stop: Optional[Callable[[], bool]] = None):
+    """工作节点主循环：不断领取单元执行，直到协调节点通知结束"""
+    log = log or (lambda text, level: None)
+    client = CoordinatorClient(url, token)
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    while should_stop is None or not should_stop():
+        lease = client.call("/lease", {"worker": worker_id})
+        if lease.get("done"):
+            log("协调节点通知扫描结束", "info")
+            return
+        if lease.get("wait"):
+            time.sleep(lease.get("retry", WAIT_INTERVAL))
+            continue
+        log(f"领取单元 {lease['unit']} ({TargetSpace(lease['ranges']).describe()})", "info")
+        if not run_unit(client, lease, engine, options or {}, log, should_stop):
+            if should_stop is None or not should_stop():
+                log("协调节点已取消扫描", "warning")
+            return
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 指纹签名库模块
+启动时将所有服务签名编译为一个多模式正则，单次扫描响应即可得到全部命中的服务及置信度
+"""
+
+import json
+import os
+import re
+from typing import List, Dict, Optional, Iterable
+
+# ============ 内置签名 ============
+#
+# 每个签名包含若干规则(rules)，任一规则成立即命中，签名置信度取成立规则中的最大值。
+# 规则的 all 列表中所有条件都成立时规则成立，条件可以是:
+#   - 字符串: 响应中包含该关键字(不区分大小写)
+#   - {"json": "路径", ...}: 对JSON响应做结构化检查，路径用 . 分隔，[] 表示遍历数组，
+#     可选 "equals": 值 / "in": [值...] / "contains": 子串，均未指定时只要求字段存在
+# 签名可带 "service": {"name", "ports", "paths"}，用于向探测计划中添加新的服务。
+
+DEFAULT_SIGNATURES = [
+    {"id": "ollama", "rules": [
+        {"all": ["ollama"], "confidence": 0.9},
+        {"all": [{"json": "models[].digest"}], "confidence": 0.8},
+        {"all": ["models"], "confidence": 0.5},
+    ]},
+    {"id": "vllm", "rules": [
+        {"all": ["vllm"], "confidence": 0.9},
+        {"all": [{"json": "data[].owned_by", "equals": "vllm"}], "confidence": 0.95},
+        {"all": ['"data"', '"id"', '"object"'], "confidence": 0.6},
+        {"all": ['"status"', "healthy"], "confidence": 0.5},
+        {"all": ["model", "object"], "confidence": 0.4},
+        {"all": ["model", "models"], "confidence": 0.4},
+    ]},
+    {"id": "lmstudio", "rules": [
+        {"all": ["lmstudio"], "confidence": 0.9},
+        {"all": ["lm studio"], "confidence": 0.9},
+    ]},
+    {"id": "llama", "rules": [
+        {"all": ["llama"], "confidence": 0.6},
+        {"all": ["ggml"], "confidence": 0.8},
+    ]},
+    {"id": "llamafile", "rules": [
+        {"all": ["llamafile"], "confidence": 0.9},
+        {"all": ["mozilla"], "confidence": 0.5},
+    ]},
+    {"id": "jan", "rules": [
+        {"all": ["jan"], "confidence": 0.5},
+        {"all": ["models"], "confidence": 0.4},
+    ]},
+    {"id": "cortex", "rules": [
+        {"all": ["cortex"], "confidence": 0.8},
+    ]},
+    {"id": "local-llm", "rules": [
+        {"all": ["local", "llm"], "confidence": 0.5},
+    ]},
+    {"id": "litellm", "rules": [
+        {"all": ["litellm"], "confidence": 0.9},
+        {"all": ["healthy"], "confidence": 0.5},
+    ]},
+    {"id": "gpt4all", "rules": [
+        {"all": ["gpt4all"], "confidence": 0.9},
+    ]},
+    {"id": "openai", "rules": [
+        {"all": [{"json": "object", "equals": "list"}, {"json": "data[].object", "equals": "model"}],
+         "confidence": 0.9},
+        {"all": ["openai"], "confidence": 0.8},
+        {"all": ["model"], "confidence": 0.5},
+    ]},
+]
+
+# 用户签名文件(环境变量优先，其次为工作目录下的 signatures.json)
+SIGNATURES_ENV = "LLM_SCANNER_SIGNATURES"
+SIGNATURES_FILE = "signatures.json"
+
+_MISSING = object()
+
+
+def json_values(data, path: List[str]) -> Iterable:
+    """按路径取出JSON中的所有值，[] 表示遍历数组"""
+    if not path:
+        yield data
+        return
+    key, rest = path[0], path[1:]
+    if key.endswith("[]"):
+        key = key[:-2]
+        value = data.get(key, _MISSING) if isinstance(data, dict) else _MISSING
+        if isinstance(value, list):
+            for item in value:
+                yield from json_values(item, rest)
+    elif isinstance(data, dict) and key in data:
+        yield from json_values(data[key], rest)
+
+
+def trie_regex(words: Iterable[str]) -> str:
+    """将关键字按公共前缀合并为字典树形式的正则，同一位置优先匹配最长的关键字
+
+    CPython 的 re 对普通交替会在每个位置逐个尝试所有分支，
+    按前缀合并后每个位置只需沿一条分支比较，扫描速度快数倍。
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: Dict) -> str:
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+
+    return emit(trie)
+
+
+class JsonCheck:
+    """结构化JSON字段检查"""
+
+    def __init__(self, spec: Dict):
+        self.path = [p for p in spec["json"].split(".") if p]
+        self.equals = spec.get("equals", _MISSING)
+        self.any_of = spec.get("in")
+        self.contains = spec.get("contains")
+
+    def __call__(self, data) -> bool:
+        for value in json_values(data, self.path):
+            if self.equals is not _MISSING and value != self.equals:
+                continue
+            if self.any_of is not None and value not in self.any_of:
+                continue
+            if self.contains is not None and (not isinstance(value, str)
+                                              or self.contains.lower() not in value.lower()):
+                continue
+            return True
+        return False
+
+
+class SignatureDB:
+    """编译后的指纹签名库
+
+    所有关键字合并为一个带前瞻的字典树正则，一次扫描找出响应中出现的全部关键字
+    (包括相互重叠的关键字)，再按规则组合判断命中的服务。
+    """
+
+    def __init__(self, signatures: List[Dict]):
+        self.signatures = signatures
+        self._compile()
+
+    def _compile(self):
+        keywords = set()
+        self._rules = []  # (签名id, 关键字集合, JSON检查列表, 置信度)
+        for sig in self.signatures:
+            for rule in sig["rules"]:
+                words, checks = set(), []
+                for cond in rule["all"]:
+                    if isinstance(cond, str):
+                        words.add(cond.lower())
+                    else:
+                        checks.append(JsonCheck(cond))
+                keywords |= words
+                self._rules.append((sig["id"], frozenset(words), checks, float(rule.get("confidence", 0.5))))
+        # 同一位置只会匹配最长的关键字，被其包含的较短关键字通过 implied 补齐
+        self._implied = {kw: {other for other in keywords if other in kw} for kw in keywords}
+        self._pattern = re.compile("(?=(" + trie_regex(keywords) + "))") if keywords else None
+
+    def keywords_in(self, text: str) -> set:
+        """一次扫描返回响应中出现的所有关键字"""
+        found = set()
+        if self._pattern is None:
+            return found
+        for word in set(self._pattern.findall(text.lower())):
+            found |= self._implied[word]
+        return found
+
+    def match(self, text: str) -> Dict[str, float]:
+        """返回响应命中的所有服务及其置信度"""
+        found = self.keywords_in(text)
+        data = _MISSING
+        matches = {}
+        for sig_id, words, checks, confidence in self._rules:
+            if confidence <= matches.get(sig_id, 0.0) or not words <= found:
+                continue
+            if checks:
+                if data is _MISSING:
+                    data = parse_json(text)
+                if data is None or not all(check(data) for check in checks):
+                    continue
+            matches[sig_id] = confidence
+        return matches
+
+    def extra_services(self, services: List[Dict]) -> List[Dict]:
+        """签名中声明的、服务配置里尚不存在的服务"""
+        known = {s["identifier"] for s in services}
+        extra = []
+        for sig in self.signatures:
+            service = sig.get("service")
+            if service and sig["id"] not in known:
+                extra.append({"name": service["name"], "ports": list(service["ports"]),
+                              "paths": list(service["paths"]), "identifier": sig["id"]})
+                known.add(sig["id"])
+        return extra
+
+
+def parse_json(text: str):
+    """尝试将响应解析为JSON，失败返回None"""
+    stripped = text.lstrip()
+    if stripped[:1] not in ("{", "["):
+        return None
+    try:
+        return json.loads(stripped)
+    except ValueError:
+        return None
+
+
+def validate_signature(sig: Dict):
+    """校验签名结构，不合法时抛出 ValueError"""
+    if not isinstance(sig, dict) or not isinstance(sig.get("id"), str):
+        raise ValueError(f"签名缺少 id: {sig!r}")
+    rules = sig.get("rules")
+    if not isinstance(rules, list) or not rules:
+        raise ValueError(f"签名 {sig['id']} 缺少 rules")
+    for rule in rules:
+        conds = rule.get("all") if isinstance(rule, dict) else None
+        if not isinstance(conds, list) or not conds:
+            raise ValueError(f"签名 {sig['id']} 的规则缺少 all 条件")
+        for cond in conds:
+            if not isinstance(cond, str) and not (isinstance(cond, dict) and isinstance(cond.get("json"), str)):
+                raise ValueError(f"签名 {sig['id']} 含无效条件: {cond!r}")
+    service = sig.get("service")
+    if service is not None and not all(k in service for k in ("name", "ports", "paths")):
+        raise ValueError(f"签名 {sig['id']} 的 service 需包含 name/ports/paths")
+
+
+def load_signature_db(path: Optional[str] = None) -> SignatureDB:
+    """加载签名库：内置签名 + 用户签名文件(同id覆盖内置签名，新id追加)
+
+    未指定 path 时依次查找环境变量 LLM_SCANNER_SIGNATURES 和工作目录下的 signatures.json。
+    文件不存在时只使用内置签名，文件格式错误时抛出 ValueError。
+    """
+    signatures = [dict(sig) for sig in DEFAULT_SIGNATURES]
+    if path is None:
+        path = os.environ.get(SIGNATURES_ENV) or (SIGNATURES_FILE if os.path.exists(SIGNATURES_FILE) else None)
+    if path:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                user_signatures = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"无法读取签名文件 {path}: {e}")
+        if isinstance(user_signatures, dict):
+            user_signatures = user_signatures.get("signatures", [])
+        index = {sig["id"]: i for i, sig in enumerate(signatures)}
+        for sig in user_signatures:
+            validate_signature(sig)
+            if sig["id"] in index:
+                signatures[index[sig["id"]]] = sig
+            else:
+                index[sig["id"]] = len(signatures)
+                signatures.append(sig)
+    return SignatureDB(signatures)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 轻量HTTP探测模块
+指纹探测专用的最小HTTP/1.1客户端：请求报文直接拼接，同一连接上流水线发送多个GET请求，
+只解析状态行、分帧所需的响应头和有上限的响应体前部；重定向、压缩响应等交给完整客户端(requests)
+"""
+
+import asyncio
+import socket
+import time
+from typing import Callable, Dict, Generator, Tuple
+
+# ============ 配置 ============
+
+USER_AGENT = "LLM-Scanner/1.0"
+
+# 响应头读取上限
+MAX_HEADER_BYTES = 8 * 1024
+
+# 每次从套接字读取的字节数
+RECV_BYTES = 16 * 1024
+
+# 需要完整客户端跟随的重定向状态码
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+def build_request(netloc: str, path: str, keep_alive: bool = True) -> bytes:
+    """构造GET请求报文(不声明 Accept-Encoding，服务器按原文返回响应体)"""
+    return (
+        f"GET {path} HTTP/1.1\r\n"
+        f"Host: {netloc}\r\n"
+        f"User-Agent: {USER_AGENT}\r\n"
+        "Accept: */*\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    ).encode("latin-1")
+
+
+def scan_chunked(data: bytes) -> Tuple[bytes, int]:
+    """解码 Transfer-Encoding: chunked 响应体，返回(已收到的响应体, 消息结束位置)
+
+    消息尚未接收完整或格式错误时结束位置为 -1。
+    """
+    out = bytearray()
+    pos = 0
+    while True:
+        line_end = data.find(b"\r\n", pos)
+        if line_end < 0:
+            return bytes(out), -1
+        try:
+            size = int(data[pos:line_end].split(b";")[0].strip() or b"0", 16)
+        except ValueError:
+            return bytes(out), -1
+        start = line_end + 2
+        if size == 0:
+            # 最后一块之后是可选的尾部字段和一个空行
+            if data[start:start + 2] == b"\r\n":
+                return bytes(out), start + 2
+            end = data.find(b"\r\n\r\n", start)
+            return bytes(out), end + 4 if end >= 0 else -1
+        out += data[start:start + size]
+        pos = start + size + 2
+        if pos > len(data):
+            return bytes(out), -1
+
+
+def decode_chunked(body: bytes) -> bytes:
+    """解码 Transfer-Encoding: chunked 响应体"""
+    return scan_chunked(body)[0]
+
+
+def content_charset(content_type: bytes) -> str:
+    """Content-Type 中声明的字符集，未声明时为 utf-8"""
+    for param in content_type.decode("latin-1").split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "charset" and value.strip('"\' '):
+            return value.strip('"\' ')
+    return "utf-8"
+
+
+def decode_text(body: bytes, charset: str) -> str:
+    try:
+        return body.decode(charset, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+def parse_head(head: bytes) -> Tuple[bytes, int, Dict[bytes, bytes]]:
+    """解析状态行和响应头，返回(协议版本, 状态码, {小写名称: 值})，状态行无效时抛出 ValueError"""
+    lines = head.split(b"\r\n")
+    fields = lines[0].split(None, 2)
+    if len(fields) < 2 or not fields[0].startswith(b"HTTP/"):
+        raise ValueError("无效的HTTP状态行")
+    status = int(fields[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(b":")
+        headers[name.strip().lower()] = value.strip()
+    return fields[0], status, headers
+
+
+def parse_http_response(raw: bytes, max_body: int) -> Tuple[int, str]:
+    """解析原始HTTP响应，返回(状态码, 响应体文本)，响应体最多解码 max_body 字节"""
+    head, sep, body = raw.partition(b"\r\n\r\n")
+    if not sep:
+        return 0, ""
+    try:
+        _, status, headers = parse_head(head)
+    except ValueError:
+        return 0, ""
+    if b"chunked" in headers.get(b"transfer-encoding", b"").lower():
+        body = decode_chunked(body)
+    return status, decode_text(body[:max_body], content_charset(headers.get(b"content-type", b"")))
+
+
+class ProbeResponse:
+    """一个HTTP响应：状态码、响应头和最多 max_body 字节的响应体前部"""
+
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status: int, headers: Dict[bytes, bytes], body: bytes = b""):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def text(self) -> str:
+        return decode_text(self.body, content_charset(self.headers.get(b"content-type", b"")))
+
+    def needs_full_client(self) -> bool:
+        """重定向(可能跳转到HTTPS)和压缩的响应体由完整客户端处理"""
+        encoding = self.headers.get(b"content-encoding", b"identity").lower()
+        return self.status in REDIRECT_STATUSES or encoding not in (b"", b"identity")
+
+
+class ResponseFramer:
+    """HTTP/1.1响应分帧(不含IO)，由 ProbeConnection 和 AsyncProbeConnection 提供读取
+
+    响应体按 Content-Length 或 chunked 分帧，完整读取后可以继续读取下一个响应；
+    服务器声明关闭连接、响应体超出上限或提前停止读取后 reusable 为 False，
+    之后的请求需要在新连接上重发。响应格式错误抛出 ValueError。
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.reusable = True
+        self.bytes_read = 0
+
+    def _feed(self, chunk: bytes) -> bool:
+        """追加读到的数据，对端已关闭连接(空数据)时返回 False"""
+        if not chunk:
+            self.reusable = False
+            return False
+        self.buffer += chunk
+        self.bytes_read += len(chunk)
+        return True
+
+    def _take(self, count: int) -> bytes:
+        data = bytes(self.buffer[:count])
+        del self.buffer[:count]
+        return data
+
+    def _read_steps(self, max_body: int, until: Callable[[str], bool] = None
+                    ) -> Generator[None, bool, ProbeResponse]:
+        """读取下一个响应的分帧过程：缓冲区数据不足时 yield，恢复时收到是否读到了更多数据"""
+        while True:
+            end = self.buffer.find(b"\r\n\r\n")
+            while end < 0:
+                if len(self.buffer) > MAX_HEADER_BYTES:
+                    raise ValueError("HTTP响应头过长")
+                if not self.reusable or not (yield):
+                    raise ConnectionError("连接在响应前关闭")
+                end = self.buffer.find(b"\r\n\r\n")
+            version, status, headers = parse_head(self._take(end + 4)[:end])
+            # 跳过 100 Continue 等中间响应
+            if not 100 <= status < 200:
+                break
+        connection = headers.get(b"connection", b"").lower()
+        if b"close" in connection or (version == b"HTTP/1.0" and b"keep-alive" not in connection):
+            self.reusable = False
+        response = ProbeResponse(status, headers)
+        if status in (204, 304):
+            return response
+
+        if b"chunked" in headers.get(b"transfer-encoding", b"").lower():
+            while True:
+                body, end = scan_chunked(self.buffer)
+                if end >= 0:
+                    del self.buffer[:end]
+                    response.body = body[:max_body]
+                    return response
+                if len(body) >= max_body or not (yield):
+                    self.reusable = False
+                    response.body = body[:max_body]
+                    return response
+
+        length = headers.get(b"content-length", b"").strip()
+        if length.isdigit() and int(length) <= max_body:
+            # 上限内的响应体读完整，连接可以继续使用
+            length = int(length)
+            while len(self.buffer) < length and (yield):
+                pass
+            response.body = self._take(length)
+            return response
+
+        # 未声明长度(以关闭连接结束)或超出上限：只读取前部
+        self.reusable = False
+        charset = content_charset(headers.get(b"content-type", b""))
+        while len(self.buffer) < max_body:
+            if until is not None and self.buffer and until(decode_text(bytes(self.buffer), charset)):
+                break
+            if not (yield):
+                break
+        response.body = self._take(max_body)
+        return response
+
+
+class ProbeConnection(ResponseFramer):
+    """到单个 (主机, 端口) 的HTTP/1.1连接，请求可一次写出多个，响应按顺序读取
+
+    分帧规则见 ResponseFramer。连接失败和读取超时抛出 OSError，响应格式错误抛出 ValueError。
+    """
+
+    def __init__(self, host: str, port: int, timeout: float):
+        super().__init__()
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def close(self):
+        self.sock.close()
+
+    def send(self, data: bytes):
+        self.sock.sendall(data)
+
+    def _fill(self, deadline: float) -> bool:
+        """读取更多数据，对端已关闭连接时返回 False"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise socket.timeout("timed out")
+        self.sock.settimeout(remaining)
+        return self._feed(self.sock.recv(RECV_BYTES))
+
+    def read_response(self, max_body: int, deadline: float,
+                      until: Callable[[str], bool] = None) -> ProbeResponse:
+        """读取下一个响应；until(已读文本) 只在响应体无法在上限内读完整时用于提前停止"""
+        steps = self._read_steps(max_body, until)
+        more = None
+        try:
+            while True:
+                steps.send(more)
+                more = self._fill(deadline)
+        except StopIteration as done:
+            return done.value
+
+
+class AsyncProbeConnection(ResponseFramer):
+    """ProbeConnection 的 asyncio 版本，分帧规则相同
+
+    连接失败抛出 OSError，读取超时抛出 asyncio.TimeoutError，响应格式错误抛出 ValueError。
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        super().__init__()
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host: str, port: int, timeout: float) -> "AsyncProbeConnection":
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return cls(reader, writer)
+
+    def close(self):
+        self.writer.close()
+
+    async def send(self, data: bytes):
+        self.writer.write(data)
+        await self.writer.drain()
+
+    async def read_response(self, max_body: int, deadline: float,
+                            until: Callable[[str], bool] = None) -> ProbeResponse:
+        """读取下一个响应，参数与 ProbeConnection.read_response 相同"""
+        steps = self._read_steps(max_body, until)
+        more = None
+        try:
+            while True:
+                steps.send(more)
+                chunk = await asyncio.wait_for(self.reader.read(RECV_BYTES), deadline - time.monotonic())
+                more = self._feed(chunk)
+        except StopIteration as done:
+            return done.value
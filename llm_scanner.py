@@ -5,13 +5,33 @@ LLM Scanner V1.0 - 扫描引擎模块
 本地LLM服务未授权访问扫描核心逻辑
 """
 
-import socket
-import requests
-import ipaddress
+import errno
 import queue
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict, Tuple
+from urllib.parse import urlsplit
+from typing import List, Dict, Tuple, Set, Iterable, Iterator, Callable, Optional
+
+from fingerprints import load_signature_db
+from connect_scan import ConnectScanner, ConnectResult, ensure_fd_budget, OPEN, REFUSED, TIMEOUT, ERROR
+from targets import TargetSpace
+from timing import HostTiming, INITIAL_CONNECT_TIMEOUT
+from message_bus import MessageBus, VERBOSITY_NORMAL
+from result_sink import JsonlWriter
+from checkpoint import CheckpointWriter, load_checkpoint, job_signature, PHASE_SERVICES, PHASE_SWEEP
+from result_store import ResultStore, CHANGE_NEW, CHANGE_GONE, CHANGE_CHANGED
+from pipeline import Stage
+from discovery import discover_hosts, DISCOVERY_PORTS, DISCOVERY_BATCH
+from rate_limit import RateLimiter, RATE_LIMIT, PER_HOST_RATE, EVENT_BACKOFF
+from metrics import ScanMetrics
+from port_import import PortImport
+from priors import HitHistory
+from http_probe import ProbeConnection, build_request
 
 # ============ 配置 ============
 
@@ -48,298 +68,1349 @@ PORT_RANGES = [
     (7000, 9000), (9000, 10000), (10000, 12000), (30000, 40000),
 ]
 
-# 超时设置
+# 超时设置(扫描时按主机实测RTT自适应，见 timing.py；以下为不跟踪RTT时的默认值)
 TCP_TIMEOUT = 0.2
 HTTP_TIMEOUT = 3
 
+# 响应体读取上限(结果只保存前500字符，识别也只需响应前部)
+MAX_BODY_BYTES = 16 * 1024
+BODY_CHUNK_BYTES = 4096
+
+# 每个 (ip, port) 长连接会话的连接池大小
+SESSION_POOL_SIZE = 2
+
+# 并发设置
+MAX_WORKERS = 200       # 全局在途阻塞探测(HTTP请求)数上限，所有主机共享
+HOST_WORKERS = 16       # 同时扫描的主机数
+PER_HOST_LIMIT = 0      # 单主机在途探测数上限，0表示不限制
+SWEEP_INFLIGHT = 4000   # 端口扫描的非阻塞连接总数上限，由同时扫描的主机均分
+SWEEP_BACKLOG = 1024    # 已扫描完高概率端口、排队等待长尾端口扫描的主机数上限
+
+# 结果保留设置(发现的结果总会以 result 消息实时发送，并写入结果文件)
+MAX_RESULTS = None      # 内存中保留的结果数上限，None表示不限制，0表示不保留
+
+
+# 指纹签名库(内置签名 + 用户签名文件)，启动时编译一次
+try:
+    SIGNATURE_DB = load_signature_db()
+    SIGNATURE_ERROR = ""
+except ValueError as e:
+    SIGNATURE_DB = load_signature_db(path="")
+    SIGNATURE_ERROR = str(e)
+
+# 用户签名中声明的新服务加入服务配置
+LLM_SERVICES.extend(SIGNATURE_DB.extra_services(LLM_SERVICES))
+
+
+def build_probe_plan(services: List[Dict]) -> List[Dict]:
+    """将服务配置编译为探测计划，按(端口, 路径)去重，保持首次出现的顺序
+    
+    每个探测项包含 port、path 以及共用该URL的服务列表，同一URL只需请求一次。
+    """
+    plan = []
+    index = {}
+    for service in services:
+        for port in service["ports"]:
+            for path in service["paths"]:
+                key = (port, path)
+                if key not in index:
+                    index[key] = {"port": port, "path": path, "services": []}
+                    plan.append(index[key])
+                index[key]["services"].append(service)
+    return plan
+
+
+# 编译后的探测计划
+PROBE_PLAN = build_probe_plan(LLM_SERVICES)
+
+# 探测计划涉及的已知端口(HTTP探测前先做TCP连通性预检)
+KNOWN_PORTS = sorted({probe["port"] for probe in PROBE_PLAN})
+
+
+def services_for_ports(ports: Iterable[int]) -> List[Dict]:
+    """只探测指定端口时的服务配置
+    
+    已知端口只保留对应的服务，不属于任何已知服务的端口按所有服务的路径探测。
+    """
+    ports = list(dict.fromkeys(ports))
+    extra = [port for port in ports if port not in KNOWN_PORTS]
+    return [dict(service, ports=[p for p in service["ports"] if p in ports] + extra)
+            for service in LLM_SERVICES]
+
+
+def decode_body(body: bytes, encoding: str) -> str:
+    """解码已读取的响应体，截断处的不完整字符会被替换"""
+    try:
+        return bytes(body).decode(encoding, errors="replace")
+    except LookupError:
+        return bytes(body).decode("utf-8", errors="replace")
+
+
+def probe_matched(probe: Dict) -> Callable[[str], bool]:
+    """探测项的提前停止条件：共用该URL的服务全部命中"""
+    identifiers = {s["identifier"] for s in probe["services"]}
+    return lambda text: identifiers <= SIGNATURE_DB.match(text).keys()
+
+
+def group_probes(probes: List[Dict]) -> List[Tuple[int, List[Dict]]]:
+    """探测项按端口分组(保持原顺序)，同一端口的请求在一个连接上流水线发送"""
+    groups = {}
+    for probe in probes:
+        groups.setdefault(probe["port"], []).append(probe)
+    return list(groups.items())
+
+
+def vllm_matched(text: str) -> bool:
+    """全端口扫描验证的提前停止条件：已识别为vLLM"""
+    return "vllm" in SIGNATURE_DB.match(text)
+
+
+def sweep_ports() -> List[int]:
+    """全端口扫描的端口列表(排除常用服务端口和已知LLM端口，去除重叠范围)"""
+    excluded = set(EXCLUDED_PORTS)
+    for service in LLM_SERVICES:
+        excluded.update(service["ports"])
+    ports = []
+    for start, end in PORT_RANGES:
+        for port in range(start, end + 1):
+            if port not in excluded:
+                excluded.add(port)
+                ports.append(port)
+    return ports
+
+
+# ============ 并发预算 ============
+
+class ProbeBudget:
+    """探测并发预算：全局上限 + 可选的单主机上限"""
+    
+    def __init__(self, global_limit: int, per_host_limit: int = 0):
+        self.per_host_limit = per_host_limit
+        self._global = threading.BoundedSemaphore(global_limit)
+        self._hosts = {}
+        self._lock = threading.Lock()
+        
+    def _host_semaphore(self, ip: str):
+        with self._lock:
+            sem = self._hosts.get(ip)
+            if sem is None:
+                sem = self._hosts[ip] = threading.BoundedSemaphore(self.per_host_limit)
+            return sem
+            
+    @contextmanager
+    def slot(self, ip: str):
+        """占用一个探测名额，先取单主机名额再取全局名额"""
+        host_sem = self._host_semaphore(ip) if self.per_host_limit > 0 else None
+        if host_sem:
+            host_sem.acquire()
+        self._global.acquire()
+        try:
+            yield
+        finally:
+            self._global.release()
+            if host_sem:
+                host_sem.release()
+                
+    def release_host(self, ip: str):
+        """主机扫描结束后释放其单主机信号量"""
+        with self._lock:
+            self._hosts.pop(ip, None)
+
+
+# ============ 流水线 ============
+
+class HostJob:
+    """流水线中一台主机的扫描状态
+    
+    按阶段统计未完成的任务数(端口检查、扫描、每个端口上的HTTP探测各算一个)，
+    某阶段的任务全部完成时汇总该阶段结果，所有阶段完成时释放主机。
+    """
+    
+    def __init__(self, ip: str, index: int, total: int, full: bool):
+        self.ip = ip
+        self.index = index
+        self.total = total
+        self.full = full  # 任务是否启用全端口扫描
+        self.sweep = False  # 本主机是否需要执行全端口扫描阶段(断点或缓存可能已覆盖)
+        self.responses = {}  # (端口, 路径) -> (成功, 响应文本)
+        self.probes = []  # 导入扫描: 本组端口上要执行的已知服务探测
+        self.sweep_open = []  # 全端口扫描发现的开放端口
+        self.sweep_results = []
+        self.failed = set()  # 执行出错的阶段
+        self.started = time.monotonic()  # 准入时间，用于统计单主机耗时
+        self.phase_started = {}  # 阶段 -> 开始时间
+        self._pending = {}  # 阶段 -> 未完成任务数
+        self._lock = threading.Lock()
+        
+    def add(self, phase: str, count: int = 1):
+        with self._lock:
+            self._pending[phase] = self._pending.get(phase, 0) + count
+            
+    def pending(self, phase: str) -> bool:
+        with self._lock:
+            return phase in self._pending
+            
+    def done(self, phase: str) -> Tuple[bool, bool]:
+        """完成该阶段的一个任务，返回(阶段是否完成, 主机是否完成)"""
+        with self._lock:
+            self._pending[phase] -= 1
+            if self._pending[phase]:
+                return False, False
+            del self._pending[phase]
+            return True, not self._pending
+
 
 # ============ 扫描引擎 ============
 
 class LLMScanner:
     """LLM服务扫描器"""
     
-    def __init__(self):
-        self.msg_queue = queue.Queue()  # 消息队列
+    def __init__(self, max_workers: int = MAX_WORKERS, host_workers: int = HOST_WORKERS,
+                 per_host_limit: int = PER_HOST_LIMIT, sweep_inflight: int = SWEEP_INFLIGHT,
+                 verbosity: int = VERBOSITY_NORMAL, results_file: Optional[str] = None,
+                 max_results: Optional[int] = MAX_RESULTS, checkpoint_file: Optional[str] = None,
+                 resume: bool = False, store_file: Optional[str] = None, incremental_ttl: Optional[float] = None):
+        self.bus = MessageBus(verbosity=verbosity)
+        self.msg_queue = self.bus.queue  # 消息队列
         self.results = []
+        self.result_count = 0
+        self.results_file = results_file  # JSONL结果文件，发现即追加写入
+        self.max_results = max_results
+        self._writer = None
+        self._results_lock = threading.Lock()
+        self.checkpoint_file = checkpoint_file  # 断点文件，记录已完成的 (主机, 阶段)
+        self.resume = resume  # 从断点文件继续同一任务
+        self._checkpoint = None
+        self._resume_state = None
+        self.store_file = store_file  # SQLite结果库，记录各主机各阶段的端口和发现，输出变化
+        self.incremental_ttl = incremental_ttl  # 增量复扫有效期(秒)，None表示每次完整扫描
+        self.store = None
+        self.changes = []
+        self._phase_ports = {}  # (ip, 阶段) -> 该阶段发现的开放端口
         self.open_ports = []
         self.scanning = False
         self.stop_flag = False
+        self.scan_failed = False  # 最近一次扫描是否因目标无效、文件无法打开等原因未能开始
         self.progress = 0
+        self.max_workers = max_workers
+        self.host_workers = host_workers
+        self.per_host_limit = per_host_limit
+        self.sweep_inflight = sweep_inflight
+        self.max_body_bytes = MAX_BODY_BYTES
+        self.connect_timeout = INITIAL_CONNECT_TIMEOUT  # 尚无RTT样本时的超时
+        self.http_timeout = HTTP_TIMEOUT
+        self.services = LLM_SERVICES
+        self.probe_plan = PROBE_PLAN
+        self.known_ports = KNOWN_PORTS
+        self.ports = None  # set_ports 指定的端口，None表示所有已知服务端口
+        self.assume_up = False  # 跳过存活探测，所有目标视为存活
+        self.import_format = "auto"  # 目标类型为 import 时导入文件的格式
+        self.history_file = None  # 命中历史文件，按历史发现安排探测顺序，扫描结束后更新
+        self.history = HitHistory()
+        self._sweep_order = sweep_ports()  # 全端口扫描的端口顺序，前 _sweep_hot 个为高概率端口
+        self._sweep_hot = 0
+        self._sweep_slots = None
+        self.rate_limit = RATE_LIMIT  # 全局探测速率上限(次/秒)，None表示不限速
+        self.per_host_rate = PER_HOST_RATE  # 单主机探测速率上限(次/秒)
+        self.adaptive_rate = True  # 连接超时比例突增时自动降速
+        self.limiter = RateLimiter(None, None, adaptive=False)
+        self.metrics = ScanMetrics()  # 连接结果、HTTP状态、各阶段耗时等扫描指标
+        self._scan_started = None
+        self._scan_finished = None
+        self.budget = ProbeBudget(max_workers, per_host_limit)
+        self._active_hosts = 1
+        self._sweep_budget = sweep_inflight  # 按文件描述符上限修正后的端口扫描总在途数
+        self._discover_stage = None  # 流水线各阶段，scan_targets 期间有效
+        self._admit_stage = None
+        self._known_stage = None
+        self._sweep_stage = None
+        self._fingerprint_stage = None
+        self._timings = {}
+        self._timings_lock = threading.Lock()
+        self._sessions = {}  # ip -> {port: requests.Session}
+        self._sessions_lock = threading.Lock()
+        self._host_refs = {}  # 导入扫描中同时在检测的同一主机的端口组数
+        self._host_refs_lock = threading.Lock()
+        self._units_total = 0
+        self._units_done = 0
+        self._progress_lock = threading.Lock()
         
     def log(self, message: str, level: str = "info"):
-        """输出日志到队列"""
+        """输出日志到队列(低于当前详细程度的日志直接丢弃)"""
+        if not self.bus.accepts(level):
+            return
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.msg_queue.put(("log", f"[{timestamp}] {message}", level))
+        self.bus.log(f"[{timestamp}] {message}", level)
         
     def update_progress(self, value: int):
         """更新进度"""
         self.progress = value
-        self.msg_queue.put(("progress", value, None))
+        self.bus.progress(value)
+        
+    def add_results(self, results: List[Dict], spill: bool = True, verified: bool = True):
+        """登记新发现的结果：写入结果文件、发送 result 消息，并按上限保留在内存中
+        
+        spill=False 用于从断点恢复的结果，它们在上次扫描时已写入结果文件。
+        verified=False 表示结果沿用自结果库缓存，本次没有实际探测，不计入命中历史。
+        """
+        for result in results:
+            with self._results_lock:
+                self.result_count += 1
+                if self.max_results is None or len(self.results) < self.max_results:
+                    self.results.append(result)
+            if spill and self._writer is not None:
+                self._writer.write(result)
+            if spill and verified:
+                self.history.record(result)
+            self.metrics.inc("findings_total", service=result.get("service", ""))
+            self.bus.put(("result", result, None))
+            
+    def open_checkpoint(self, target: str, target_type: str, enable_full_port_scan: bool,
+                        exclude: str = "") -> bool:
+        """打开断点文件，resume 时恢复同一任务已完成的部分；无法写入时返回False"""
+        job = job_signature(target, target_type, enable_full_port_scan, exclude, self.ports)
+        state = load_checkpoint(self.checkpoint_file) if self.resume else None
+        if state is not None and state.job != job:
+            self.log("断点文件属于其它扫描任务，将重新开始扫描", "warning")
+            state = None
+        try:
+            self._checkpoint = CheckpointWriter(self.checkpoint_file, job, resume=state is not None)
+        except OSError as e:
+            self.log(f"无法写入断点文件 {self.checkpoint_file}: {e}", "error")
+            return False
+        self._resume_state = state
+        if state is not None:
+            restored = state.completed_results()
+            self.log(f"从断点继续: 已完成 {state.hosts_done()} 台主机, 恢复 {len(restored)} 条结果")
+            self.add_results(restored, spill=False)
+        return True
+        
+    def open_store(self) -> bool:
+        """打开结果库，失败时输出错误并返回False"""
+        try:
+            self.store = ResultStore(self.store_file)
+        except sqlite3.Error as e:
+            self.log(f"无法打开结果库 {self.store_file}: {e}", "error")
+            return False
+        if self.incremental_ttl:
+            self.log(f"增量模式: {self.incremental_ttl / 3600:g} 小时内验证过的主机只确认端口")
+        return True
+        
+    def close_store(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+        
+    def close_checkpoint(self):
+        """扫描结束时关闭断点文件，正常完成的任务标记为已完成"""
+        if self._checkpoint is not None:
+            if not self.stop_flag:
+                self._checkpoint.finish()
+            self._checkpoint.close()
+            self._checkpoint = None
+        self._resume_state = None
+        
+    def phase_done(self, ip: str, phase: str) -> bool:
+        """该主机的扫描阶段是否已在断点中完成"""
+        return self._resume_state is not None and self._resume_state.is_done(ip, phase)
+        
+    def host_done(self, ip: str, enable_full_port_scan: bool) -> bool:
+        """该主机的所有阶段是否已在断点中完成"""
+        return (self.phase_done(ip, PHASE_SERVICES)
+                and (not enable_full_port_scan or self.phase_done(ip, PHASE_SWEEP)))
+        
+    def complete_phase(self, ip: str, phase: str, results: List[Dict], verified: bool = True):
+        """登记某阶段的结果，阶段完整执行(未被停止)时记入断点和结果库
+        
+        verified=False 表示结果沿用自结果库缓存。
+        """
+        self.add_results(results, verified=verified)
+        ports = self._phase_ports.pop((ip, phase), [])
+        if self.stop_flag:
+            return
+        if self._checkpoint is not None:
+            self._checkpoint.mark_done(ip, phase, results)
+        if self.store is not None:
+            for change in self.store.record_phase(ip, phase, results, ports, verified):
+                self.add_change(change)
+                
+    def add_change(self, change: Dict):
+        """登记与结果库相比的一项变化，并发送 diff 消息"""
+        labels = {CHANGE_NEW: ("新增", "error"), CHANGE_GONE: ("消失", "success"), CHANGE_CHANGED: ("变化", "warning")}
+        label, level = labels[change["change"]]
+        with self._results_lock:
+            self.changes.append(change)
+        self.log(f"[{label}] {change['service']} @ {change['ip']}:{change['port']}", level)
+        self.bus.put(("diff", change, None))
+        
+    def cached_phases(self, ip: str) -> Dict[str, Dict]:
+        """增量模式下结果库中仍在有效期内的阶段"""
+        if self.store is None or not self.incremental_ttl:
+            return {}
+        return self.store.fresh_phases(ip, self.incremental_ttl)
+        
+    def reusable_phases(self, ip: str, cached: Dict[str, Dict], open_now: Set[int]) -> Dict[str, List[Dict]]:
+        """开放端口未变化的阶段直接沿用缓存结果
+        
+        已知服务阶段要求已知端口的开放集合与上次相同；
+        全端口阶段要求上次发现的端口仍全部开放(新开放的端口在有效期过后的完整扫描中发现)。
+        """
+        reusable = {}
+        for phase, entry in cached.items():
+            ports = set(entry["ports"])
+            if phase == PHASE_SERVICES:
+                unchanged = open_now & set(self.known_ports) == ports
+            else:
+                unchanged = ports <= open_now
+            if unchanged:
+                self._phase_ports[(ip, phase)] = entry["ports"]
+                reusable[phase] = entry["results"]
+        return reusable
+        
+    def cache_ports(self, cached: Dict[str, Dict]) -> List[int]:
+        """增量模式下需要确认的端口：已知服务端口 + 缓存中各阶段的开放端口"""
+        ports = set(self.known_ports)
+        for entry in cached.values():
+            ports.update(entry["ports"])
+        return sorted(ports)
+            
+    def reset_units(self, total: int):
+        """设置本次扫描的探测总量，用于跨主机汇总进度"""
+        with self._progress_lock:
+            self._units_total = total
+            self._units_done = 0
+            
+    def advance(self, units: int = 1):
+        """按已完成的探测数推进总进度，仅在百分比变化时发送消息"""
+        with self._progress_lock:
+            self._units_done += units
+            if self._units_total <= 0:
+                return
+            value = min(99, int(self._units_done * 100 / self._units_total))
+            if value == self.progress:
+                return
+            self.progress = value
+        self.bus.progress(value)
+        
+    def set_ports(self, ports: Iterable[int]):
+        """只探测指定端口(默认探测所有已知服务端口)"""
+        self.ports = list(ports)
+        self.services = services_for_ports(self.ports)
+        self.probe_plan = build_probe_plan(self.services)
+        self.known_ports = sorted({probe["port"] for probe in self.probe_plan})
+        
+    def export_settings(self) -> Dict:
+        """导出需要同步给其它进程或节点上扫描器的设置(可JSON序列化)"""
+        return {"ports": self.ports, "connect_timeout": self.connect_timeout,
+                "http_timeout": self.http_timeout, "max_body_bytes": self.max_body_bytes,
+                "assume_up": self.assume_up, "rate_limit": self.rate_limit,
+                "per_host_rate": self.per_host_rate, "adaptive_rate": self.adaptive_rate,
+                "history_file": self.history_file}
+        
+    def apply_settings(self, settings: Dict):
+        """应用 export_settings 导出的设置"""
+        if settings.get("ports"):
+            self.set_ports(settings["ports"])
+        for name in ("connect_timeout", "http_timeout", "max_body_bytes", "assume_up",
+                     "rate_limit", "per_host_rate", "adaptive_rate", "history_file"):
+            if name in settings:
+                setattr(self, name, settings[name])
+        
+    def host_units(self, enable_full_port_scan: bool) -> int:
+        """单台主机的探测数"""
+        return len(self.probe_plan) + (len(sweep_ports()) if enable_full_port_scan else 0)
+        
+    def prepare_schedule(self):
+        """读取命中历史，按命中概率排列探测计划和全端口扫描的端口(高概率的先探测)"""
+        self.history = HitHistory(self.history_file)
+        try:
+            self.history.load()
+        except (OSError, ValueError) as e:
+            self.log(f"命中历史读取失败，仅使用内置先验: {e}", "warning")
+            # 不覆盖读取失败的历史文件
+            self.history = HitHistory()
+        self.probe_plan = self.history.order_probes(self.probe_plan)
+        self._sweep_order = self.history.order_ports(sweep_ports())
+        self._sweep_hot = self.history.hot_ports(self._sweep_order)
+        
+    def save_history(self):
+        if self.history.path is None:
+            return
+        try:
+            self.history.save()
+        except OSError as e:
+            self.log(f"命中历史保存失败: {e}", "warning")
+            
+    def scheduled_hosts(self, ips: TargetSpace) -> Iterator[str]:
+        """按扫描顺序产出主机：历史上有发现的主机优先，其余按地址顺序"""
+        hot = self.history.hot_hosts(ips.contains_ip)
+        if hot:
+            self.log(f"优先扫描 {len(hot)} 台历史上有发现的主机")
+        yield from hot
+        hot = set(hot)
+        for ip in ips.hosts():
+            if ip not in hot:
+                yield ip
+        
+    def start_limiter(self):
+        """按当前设置为本次扫描创建速率限制器"""
+        self.limiter = RateLimiter(self.rate_limit, self.per_host_rate, self.adaptive_rate)
+        
+    def pace(self, ip: str):
+        """按速率限制等待发起一次探测的令牌，停止扫描时不再等待；全局速率变化后按新速率重新预占"""
+        generation = self.limiter.generation
+        delay = self.limiter.reserve(ip)
+        deadline = time.monotonic() + delay
+        while delay > 0 and not self.stop_flag:
+            time.sleep(min(delay, 0.2))
+            if self.limiter.generation != generation:
+                generation = self.limiter.generation
+                delay = self.limiter.reserve(ip)
+                deadline = time.monotonic() + delay
+            else:
+                delay = deadline - time.monotonic()
+            
+    def record_connect(self, ip: str, state: str):
+        """统计连接结果并反馈给速率限制器，全局速率变化时输出日志"""
+        self.metrics.inc("connects_total", state=state)
+        event = self.limiter.record(ip, state)
+        if event is None:
+            return
+        kind, ratio, rate = event
+        if kind == EVENT_BACKOFF:
+            self.log(f"[{ip}] 连接超时比例升至 {ratio:.0%}，全局速率降至 {rate:.0f} 次/秒", "warning")
+        else:
+            self.log(f"超时比例已恢复正常，全局速率恢复为 {f'{rate:.0f} 次/秒' if rate else '不限速'}")
+            
+    def metrics_snapshot(self) -> Dict:
+        """扫描指标快照：计数器、耗时直方图，以及进度、结果数和已用时间"""
+        snapshot = self.metrics.snapshot()
+        elapsed = 0.0
+        if self._scan_started is not None:
+            elapsed = (self._scan_finished or time.monotonic()) - self._scan_started
+        snapshot["gauges"] = {"progress_percent": self.progress, "results": self.result_count,
+                              "elapsed_seconds": elapsed}
+        return snapshot
+        
+    def host_timing(self, ip: str) -> HostTiming:
+        """获取主机的RTT估计，扫描期间按主机缓存"""
+        with self._timings_lock:
+            timing = self._timings.get(ip)
+            if timing is None:
+                timing = self._timings[ip] = HostTiming(self.connect_timeout, self.http_timeout)
+            return timing
+            
+    def session_for(self, ip: str, port: int) -> "requests.Session":
+        """获取 (ip, port) 的长连接会话，同一端口上的多个探测复用TCP连接"""
+        import requests  # 延迟导入，异步引擎和命令行 --help 不需要加载 requests
+        import requests.adapters
+        with self._sessions_lock:
+            ports = self._sessions.setdefault(ip, {})
+            session = ports.get(port)
+            if session is None:
+                session = ports[port] = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=SESSION_POOL_SIZE,
+                                                        max_retries=0)
+                session.mount("http://", adapter)
+            return session
+            
+    def hold_host(self, ip: str):
+        """导入扫描中同一主机可能有多组端口同时在检测，最后一组完成时才释放主机资源"""
+        with self._host_refs_lock:
+            self._host_refs[ip] = self._host_refs.get(ip, 0) + 1
+            
+    def release_host(self, ip: str):
+        """主机扫描结束后释放其并发名额、RTT估计和连接池"""
+        with self._host_refs_lock:
+            refs = self._host_refs.pop(ip, 0)
+            if refs > 1:
+                self._host_refs[ip] = refs - 1
+                return
+        self.budget.release_host(ip)
+        self.limiter.release_host(ip)
+        for phase in (PHASE_SERVICES, PHASE_SWEEP):
+            self._phase_ports.pop((ip, phase), None)
+        with self._timings_lock:
+            self._timings.pop(ip, None)
+        with self._sessions_lock:
+            sessions = self._sessions.pop(ip, {})
+        for session in sessions.values():
+            session.close()
             
     def check_port_open(self, ip: str, port: int) -> bool:
         """检查端口是否开放"""
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(TCP_TIMEOUT)
-            result = sock.connect_ex((ip, port))
-            sock.close()
+        timing = self.host_timing(ip)
+        self.pace(ip)
+        with self.budget.slot(ip):
+            try:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.settimeout(timing.connect_timeout)
+                started = time.monotonic()
+                result = sock.connect_ex((ip, port))
+                if result in (0, errno.ECONNREFUSED):
+                    timing.observe(time.monotonic() - started)
+                sock.close()
+            except:
+                self.record_connect(ip, ERROR)
+                return False
+            state = {0: OPEN, errno.ECONNREFUSED: REFUSED, errno.EWOULDBLOCK: TIMEOUT}.get(result, ERROR)
+            self.record_connect(ip, state)
             return result == 0
-        except:
-            return False
+                
+    def connect_scanner(self, timing: HostTiming = None) -> ConnectScanner:
+        """为单台主机创建非阻塞连接扫描器
+        
+        端口扫描总在途数 sweep_inflight 由同时扫描的主机均分，
+        设置了 per_host_limit 时不超过该值。
+        """
+        inflight = max(1, self._sweep_budget // max(1, self._active_hosts))
+        if self.per_host_limit > 0:
+            inflight = min(inflight, self.per_host_limit)
+        return ConnectScanner(inflight, TCP_TIMEOUT, timing, self.limiter)
+        
+    def iter_connects(self, ip: str, ports: Iterable[int]) -> Iterator[ConnectResult]:
+        """以非阻塞方式并发连接一组端口，按完成顺序产出连接结果，超时随主机RTT自适应"""
+        targets = ((ip, port) for port in ports)
+        for result in self.connect_scanner(self.host_timing(ip)).scan(targets, lambda: self.stop_flag):
+            self.record_connect(ip, result.state)
+            yield result
+        
+    def check_ports_open(self, ip: str, ports: List[int]) -> Set[int]:
+        """并行检查一组端口，返回开放的端口集合"""
+        return {r.port for r in self.iter_connects(ip, ports) if r.state == OPEN}
+            
+    def http_get(self, url: str, timeout: float = HTTP_TIMEOUT,
+                 until: Callable[[str], bool] = None) -> Tuple[bool, str]:
+        """通过完整客户端(requests)发送HTTP GET请求，流式读取响应体，跟随重定向
+        
+        最多读取 max_body_bytes 字节，总耗时不超过 timeout；
+        until(已读文本) 返回 True 时提前停止读取(例如指纹已命中)。
+        请求通过 (ip, port) 的长连接会话发送，响应体读完整时连接放回池中复用。
+        """
+        parts = urlsplit(url)
+        self.pace(parts.hostname)
+        with self.budget.slot(parts.hostname):
+            return self.full_client_get(url, timeout, until)
             
-    def http_get(self, url: str) -> Tuple[bool, str]:
-        """发送HTTP GET请求"""
+    def full_client_get(self, url: str, timeout: float = HTTP_TIMEOUT,
+                        until: Callable[[str], bool] = None) -> Tuple[bool, str]:
+        """http_get 的请求部分，不做限速和并发控制，由调用方负责；异步引擎在线程池中调用"""
+        parts = urlsplit(url)
         try:
-            response = requests.get(url, timeout=HTTP_TIMEOUT)
-            if response.status_code == 200:
-                return True, response.text
+            session = self.session_for(parts.hostname, parts.port or 80)
+            response = session.get(url, timeout=timeout, stream=True)
+        except:
+            self.metrics.inc("http_requests_total", status="error")
             return False, ""
+        self.metrics.inc("http_requests_total", status=str(response.status_code))
+        try:
+            if response.status_code != 200:
+                return False, ""
+            deadline = time.monotonic() + timeout
+            encoding = response.encoding or "utf-8"
+            length = response.headers.get("Content-Length")
+            length = int(length) if length and length.isdigit() else None
+            body = bytearray()
+            for chunk in response.iter_content(chunk_size=BODY_CHUNK_BYTES):
+                body += chunk
+                if len(body) >= self.max_body_bytes or time.monotonic() > deadline:
+                    break
+                # 响应体已读完时继续迭代到结束，使连接可以复用
+                complete = length is not None and len(body) >= length
+                if not complete and until is not None and until(decode_body(body, encoding)):
+                    break
+            self.metrics.inc("http_bytes_read_total", len(body))
+            return True, decode_body(body[:self.max_body_bytes], encoding)
         except:
             return False, ""
+        finally:
+            response.close()
+            
+    def http_get_paths(self, ip: str, port: int, paths: List[str], timeout: float = HTTP_TIMEOUT,
+                       until: List[Callable[[str], bool]] = None) -> List[Tuple[bool, str]]:
+        """在同一连接上流水线发送多个GET请求，按顺序返回各路径的 (成功, 响应文本)
+        
+        只解析状态行和有上限的响应体前部。服务器处理完部分请求就关闭连接时，
+        其余请求在新连接上按服务器实际处理的个数分批重发；
+        重定向(可能跳转到HTTPS)和压缩的响应交给完整客户端 http_get 重新请求。
+        """
+        responses = [None] * len(paths)
+        pending = list(range(len(paths)))
+        depth = len(paths)
+        netloc = f"{ip}:{port}"
+        while pending and not self.stop_flag:
+            batch, answered = pending[:depth], 0
+            for _ in batch:
+                self.pace(ip)
+            with self.budget.slot(ip):
+                connection = None
+                try:
+                    connection = ProbeConnection(ip, port, timeout)
+                    connection.send(b"".join(build_request(netloc, paths[i], keep_alive=i != batch[-1])
+                                             for i in batch))
+                    for i in batch:
+                        response = connection.read_response(self.max_body_bytes, time.monotonic() + timeout,
+                                                            until[i] if until else None)
+                        self.metrics.inc("http_requests_total", status=str(response.status))
+                        responses[i] = response
+                        answered += 1
+                        if not connection.reusable:
+                            break
+                except (OSError, ValueError):
+                    pass
+                finally:
+                    if connection is not None:
+                        connection.close()
+                        self.metrics.inc("http_bytes_read_total", connection.bytes_read)
+            if not answered:
+                # 连接失败或第一个请求就没有响应，本批请求都视为失败
+                self.metrics.inc("http_requests_total", len(batch), status="error")
+                pending = pending[len(batch):]
+                continue
+            pending = pending[answered:]
+            depth = answered
+            
+        results = []
+        for i, response in enumerate(responses):
+            if response is not None and response.needs_full_client() and not self.stop_flag:
+                results.append(self.http_get(f"http://{netloc}{paths[i]}", timeout, until[i] if until else None))
+            elif response is not None and response.status == 200:
+                results.append((True, response.text))
+            else:
+                results.append((False, ""))
+        return results
             
     def is_llm_service(self, response: str, identifier: str) -> bool:
         """判断响应是否为LLM服务"""
-        response_lower = response.lower()
-        checks = {
-            "ollama": lambda r: "ollama" in r or "models" in r,
-            "vllm": lambda r: self.is_vllm_response(response),
-            "lmstudio": lambda r: "lmstudio" in r or "lm studio" in r,
-            "llama": lambda r: "llama" in r or "ggml" in r,
-            "llamafile": lambda r: "llamafile" in r or "mozilla" in r,
-            "jan": lambda r: "jan" in r or "models" in r,
-            "cortex": lambda r: "cortex" in r,
-            "local-llm": lambda r: "local" in r and "llm" in r,
-            "litellm": lambda r: "litellm" in r or "healthy" in r,
-            "gpt4all": lambda r: "gpt4all" in r,
-            "openai": lambda r: "model" in r or "openai" in r,
-        }
-        return checks.get(identifier, lambda r: False)(response_lower)
+        return identifier in SIGNATURE_DB.match(response)
         
     def is_vllm_response(self, response: str) -> bool:
         """判断响应是否为vLLM服务"""
-        r = response.lower()
-        if "vllm" in r:
-            return True
-        if '"data"' in r and '"id"' in r and '"object"' in r:
-            return True
-        if '"status"' in r and "healthy" in r:
-            return True
-        if "model" in r and ("object" in r or "models" in r):
-            return True
-        return False
-        
-    def scan_ip_services(self, ip: str, ip_progress_base: int, ip_progress_weight: int) -> List[Dict]:
+        return "vllm" in SIGNATURE_DB.match(response)
+        
+    def make_service_result(self, ip: str, port: int, service: Dict, url: str, response_text: str,
+                            confidence: float = 0.0) -> Dict:
+        """构造已知服务的漏洞结果"""
+        return {
+            "ip": ip, "port": port, "service": service["name"],
+            "status": "Vulnerable",
+            "vulnerability": f"{service['name']} 未授权访问漏洞",
+            "timestamp": datetime.now().isoformat(),
+            "url": url,
+            "confidence": confidence,
+            "response": response_text[:500] if len(response_text) > 500 else response_text,
+            "details": f"检测到 {service['name']} 服务未授权访问\n风险等级: 高\n置信度: {confidence:.2f}\n建议: 启用认证或限制访问"
+        }
+        
+    def make_vllm_result(self, ip: str, port: int, path: str, url: str, response_text: str,
+                         confidence: float = 0.0) -> Dict:
+        """构造全端口扫描发现的vLLM漏洞结果"""
+        return {
+            "ip": ip, "port": port, "service": "vLLM",
+            "status": "Vulnerable",
+            "vulnerability": "vLLM 未授权访问漏洞",
+            "timestamp": datetime.now().isoformat(),
+            "url": url,
+            "confidence": confidence,
+            "response": response_text[:500] if len(response_text) > 500 else response_text,
+            "details": f"在端口 {port} 检测到vLLM服务\n风险等级: 高\n置信度: {confidence:.2f}\n检测路径: {path}"
+        }
+        
+    def discovery_ports(self) -> List[int]:
+        """存活探测使用的TCP端口：常见端口 + 已知LLM服务端口"""
+        return sorted(set(DISCOVERY_PORTS) | set(self.known_ports))
+        
+    def discover_live(self, hosts: List[Tuple[int, str]], enable_full_port_scan: bool) -> Iterator[Tuple[int, str]]:
+        """对一批 (序号, 主机) 做存活探测，确认存活即产出；未响应的主机计入进度后跳过
+        
+        assume_up 时不探测，全部产出；断点中已完成的主机无需探测，直接产出。
+        """
+        if self.assume_up:
+            self.metrics.inc("hosts_total", len(hosts), state="assumed")
+            yield from hosts
+            return
+        pending = {}
+        for i, ip in hosts:
+            if self.host_done(ip, enable_full_port_scan):
+                yield i, ip
+            else:
+                pending[ip] = i
+        if not pending:
+            return
+        probed = len(pending)
+        for ip in discover_hosts(list(pending), self.discovery_ports(), timeout=self.connect_timeout,
+                                 should_stop=lambda: self.stop_flag, limiter=self.limiter):
+            if ip in pending:
+                self.metrics.inc("hosts_total", state="up")
+                yield pending.pop(ip), ip
+        if self.stop_flag or not pending:
+            return
+        self.metrics.inc("hosts_total", len(pending), state="down")
+        for ip in pending:
+            self.log(f"[{ip}] 主机未响应存活探测，跳过", "debug")
+        self.log(f"存活探测: {probed} 台主机中 {len(pending)} 台未响应，已跳过")
+        if self.store is not None:
+            # 结果库中有记录的主机已下线：上次的发现作为"消失"输出，缓存作废，重新上线后完整扫描
+            for ip in pending:
+                for change in self.store.mark_down(ip):
+                    self.add_change(change)
+        self.advance(self.host_units(enable_full_port_scan) * len(pending))
+        
+    def check_known_ports(self, ip: str) -> Set[int]:
+        """预检已知服务端口，返回开放的端口集合"""
+        with self.metrics.timer("task_seconds", task="known_ports"):
+            open_known = self.check_ports_open(ip, self.known_ports)
+        if not open_known:
+            self.log(f"[{ip}] 已知LLM端口均未开放，跳过HTTP检测", "debug")
+            return open_known
+        self._phase_ports[(ip, PHASE_SERVICES)] = sorted(open_known)
+        self.log(f"[{ip}] 已知端口开放: {sorted(open_known)} ({self.host_timing(ip).describe()})")
+        return open_known
+        
+    def scan_ip_services(self, ip: str) -> List[Dict]:
         """扫描单个IP的所有LLM服务"""
-        results = []
-        total_checks = sum(len(s["ports"]) * len(s["paths"]) for s in LLM_SERVICES)
-        check_count = 0
+        responses = {}
         
-        for service in LLM_SERVICES:
+        open_known = self.check_known_ports(ip)
+        timing = self.host_timing(ip)
+        if not open_known:
+            self.advance(len(self.probe_plan))
+            return []
+        
+        probes = [probe for probe in self.probe_plan if probe["port"] in open_known]
+        self.advance(len(self.probe_plan) - len(probes))
+        for port, group in group_probes(probes):
+            self.advance(len(group))
             if self.stop_flag:
-                break
-                
+                continue
+            responses.update(self.probe_port(ip, port, group, timing.http_timeout))
+            
+        return self.classify_responses(ip, responses)
+        
+    def probe_port(self, ip: str, port: int, probes: List[Dict],
+                   timeout: float = HTTP_TIMEOUT) -> Dict[Tuple[int, str], Tuple[bool, str]]:
+        """执行同一端口上的一组探测，返回 {(端口, 路径): (成功, 响应文本)}"""
+        for probe in probes:
+            self.log(f"检测 http://{ip}:{port}{probe['path']} ({', '.join(s['name'] for s in probe['services'])})",
+                     "debug")
+        fetched = self.http_get_paths(ip, port, [probe["path"] for probe in probes], timeout,
+                                      [probe_matched(probe) for probe in probes])
+        return {(port, probe["path"]): response for probe, response in zip(probes, fetched)}
+        
+    def classify_responses(self, ip: str, responses: Dict[Tuple[int, str], Tuple[bool, str]]) -> List[Dict]:
+        """按服务配置顺序对缓存的响应逐一识别，每个服务端口取第一个命中的路径
+        
+        每个响应只经签名库匹配一次，得到所有命中服务的置信度。
+        """
+        results = []
+        matches = {key: SIGNATURE_DB.match(text) if success else {}
+                   for key, (success, text) in responses.items()}
+        for service in self.services:
             for port in service["ports"]:
-                if self.stop_flag:
-                    break
-                    
-                self.log(f"检测 {ip}:{port} ({service['name']})")
-                
                 for path in service["paths"]:
-                    if self.stop_flag:
-                        break
-                    
-                    check_count += 1
-                    sub_progress = int((check_count / total_checks) * ip_progress_weight * 0.5)
-                    self.update_progress(ip_progress_base + sub_progress)
-                        
-                    url = f"http://{ip}:{port}{path}"
-                    success, response_text = self.http_get(url)
-                    
-                    if success and self.is_llm_service(response_text, service["identifier"]):
-                        result = {
-                            "ip": ip, "port": port, "service": service["name"],
-                            "status": "Vulnerable",
-                            "vulnerability": f"{service['name']} 未授权访问漏洞",
-                            "timestamp": datetime.now().isoformat(),
-                            "url": url,
-                            "response": response_text[:500] if len(response_text) > 500 else response_text,
-                            "details": f"检测到 {service['name']} 服务未授权访问\n风险等级: 高\n建议: 启用认证或限制访问"
-                        }
-                        results.append(result)
+                    confidence = matches.get((port, path), {}).get(service["identifier"])
+                    if confidence is not None:
+                        url = f"http://{ip}:{port}{path}"
+                        response_text = responses[(port, path)][1]
+                        results.append(self.make_service_result(ip, port, service, url, response_text, confidence))
                         self.log(f"[!] 发现漏洞: {service['name']} @ {ip}:{port}", "error")
                         break
-                        
         return results
         
-    def scan_ports_for_vllm(self, ip: str, ip_progress_base: int, ip_progress_weight: int) -> List[Dict]:
+    def scan_ports_for_vllm(self, ip: str) -> List[Dict]:
         """全端口扫描检测vLLM"""
         results = []
         open_ports = []
         
-        known_ports = set()
-        for service in LLM_SERVICES:
-            known_ports.update(service["ports"])
-            
-        total_ports = sum(end - start + 1 for start, end in PORT_RANGES)
-        scanned_ports = 0
+        ports_to_scan = self._sweep_order
+        self.log(f"[{ip}] 全端口扫描开始，共 {len(ports_to_scan)} 个端口待扫描")
         
-        self.log(f"[{ip}] 全端口扫描开始，共 {total_ports} 个端口待扫描")
-        
-        for range_idx, (start, end) in enumerate(PORT_RANGES):
-            if self.stop_flag:
-                break
-                
-            range_size = end - start + 1
-            self.log(f"[{ip}] 扫描端口 {start}-{end} ({range_size}个)")
-            
-            ports_to_scan = [p for p in range(start, end + 1) 
-                           if p not in EXCLUDED_PORTS and p not in known_ports]
-            
-            with ThreadPoolExecutor(max_workers=100) as executor:
-                future_to_port = {executor.submit(self.check_port_open, ip, p): p for p in ports_to_scan}
-                for future in as_completed(future_to_port):
-                    if self.stop_flag:
-                        break
-                    scanned_ports += 1
-                    sub_progress = int((scanned_ports / total_ports) * ip_progress_weight * 0.5)
-                    self.update_progress(ip_progress_base + int(ip_progress_weight * 0.5) + sub_progress)
-                    
-                    port = future_to_port[future]
-                    try:
-                        if future.result():
-                            open_ports.append(port)
-                            self.log(f"[{ip}] 端口 {port} 开放")
-                    except:
-                        pass
+        scanned_ports = 0
+        for r in self.iter_connects(ip, ports_to_scan):
+            scanned_ports += 1
+            self.advance()
+            if r.state == OPEN:
+                open_ports.append(r.port)
+                self.log(f"[{ip}] 端口 {r.port} 开放", "debug")
+        # 取消时未扫描的端口也计入进度
+        self.advance(len(ports_to_scan) - scanned_ports)
                         
+        if self.stop_flag:
+            return results
+            
         if open_ports:
+            open_ports.sort()
+            self._phase_ports[(ip, PHASE_SWEEP)] = open_ports
             self.open_ports.extend(open_ports)
             self.log(f"[{ip}] 发现 {len(open_ports)} 个开放端口: {open_ports[:10]}{'...' if len(open_ports) > 10 else ''}")
             self.log(f"[{ip}] 开始vLLM服务检测...")
             
-            for i, port in enumerate(open_ports):
+            for port in open_ports:
                 if self.stop_flag:
                     break
-                    
-                for path in VLLM_PATHS:
-                    url = f"http://{ip}:{port}{path}"
-                    success, response_text = self.http_get(url)
-                    
-                    if success and self.is_vllm_response(response_text):
-                        exists = any(r["ip"] == ip and r["port"] == port for r in results)
-                        if not exists:
-                            result = {
-                                "ip": ip, "port": port, "service": "vLLM",
-                                "status": "Vulnerable",
-                                "vulnerability": "vLLM 未授权访问漏洞",
-                                "timestamp": datetime.now().isoformat(),
-                                "url": url,
-                                "response": response_text[:500] if len(response_text) > 500 else response_text,
-                                "details": f"在端口 {port} 检测到vLLM服务\n风险等级: 高\n检测路径: {path}"
-                            }
-                            results.append(result)
-                            self.log(f"[!] 发现漏洞: vLLM @ {ip}:{port}", "error")
-                        break
+                result = self.verify_vllm_port(ip, port)
+                if result:
+                    results.append(result)
         else:
             self.log(f"[{ip}] 未发现额外开放端口")
             
         return results
         
-    def parse_target(self, target: str, target_type: str) -> List[str]:
-        """解析扫描目标"""
-        ips = []
-        if target_type == "single":
-            ips = [target.strip()]
-        elif target_type == "range":
-            parts = target.split("-")
-            if len(parts) == 2:
-                try:
-                    start_ip = ipaddress.IPv4Address(parts[0].strip())
-                    end_ip = ipaddress.IPv4Address(parts[1].strip())
-                    current, end = int(start_ip), int(end_ip)
-                    while current <= end and len(ips) < 256:
-                        ips.append(str(ipaddress.IPv4Address(current)))
-                        current += 1
-                except:
-                    pass
-        elif target_type == "cidr":
+    def verify_vllm_port(self, ip: str, port: int) -> Optional[Dict]:
+        """在开放端口上检测vLLM服务，每个端口取第一个命中的路径"""
+        with self.metrics.timer("task_seconds", task="vllm_verify"):
+            return self._verify_vllm_paths(ip, port)
+            
+    def _verify_vllm_paths(self, ip: str, port: int) -> Optional[Dict]:
+        fetched = self.http_get_paths(ip, port, VLLM_PATHS, self.host_timing(ip).http_timeout,
+                                      [vllm_matched] * len(VLLM_PATHS))
+        for path, (success, response_text) in zip(VLLM_PATHS, fetched):
+            url = f"http://{ip}:{port}{path}"
+            confidence = SIGNATURE_DB.match(response_text).get("vllm") if success else None
+            if confidence is not None:
+                self.log(f"[!] 发现漏洞: vLLM @ {ip}:{port}", "error")
+                return self.make_vllm_result(ip, port, path, url, response_text, confidence)
+        return None
+        
+    def parse_target(self, target: str, target_type: str, exclude: str = "") -> TargetSpace:
+        """解析扫描目标，返回按需产出地址的目标空间
+        
+        target_type 为 import 时 target 是开放端口数据文件，返回 PortImport。
+        """
+        if isinstance(target, (TargetSpace, PortImport)):
+            return target
+        try:
+            if target_type == "import":
+                return PortImport(target, self.import_format, exclude)
+            return TargetSpace.parse(target, target_type, exclude)
+        except (ValueError, OSError) as e:
+            self.log(f"目标解析失败: {e}", "error")
+            return TargetSpace([])
+        
+    def scan(self, target: str, target_type: str, enable_full_port_scan: bool = False, exclude: str = ""):
+        """执行扫描，多台主机在全局并发预算内同时扫描"""
+        ips = self.begin_scan(target, target_type, enable_full_port_scan, exclude)
+        if not ips:
+            return []
+        self.scan_targets(ips, enable_full_port_scan)
+        return self.finish_scan()
+        
+    def scan_targets(self, ips: TargetSpace, enable_full_port_scan: bool = False):
+        """扫描目标空间中的全部主机(不输出任务信息，也不发送 done 消息)
+        
+        主机按批经过存活探测，存活的主机依次经过 准入 -> 已知端口检查 -> 全端口扫描 阶段，
+        发现的开放端口立即交给HTTP指纹识别阶段，不等待本主机的端口扫描结束。
+        阶段之间是有界队列，各阶段有独立的工作线程池。
+        """
+        if isinstance(ips, PortImport):
+            return self.scan_imported(ips, enable_full_port_scan)
+        total_ips = len(ips)
+        self.reset_units(self.host_units(enable_full_port_scan) * total_ips)
+        self.start_limiter()
+        
+        hosts = max(1, min(self.host_workers, total_ips))
+        self._active_hosts = hosts
+        # 文件描述符按所有主机的端口扫描连接加HTTP探测一次性申请，上限不足时按实际可用数均分
+        self._sweep_budget = max(1, ensure_fd_budget(self.sweep_inflight + self.max_workers) - self.max_workers)
+        fingerprint_workers = max(1, min(self.max_workers, hosts * len(self.probe_plan)))
+        # 全端口扫描和指纹识别阶段按命中概率出队：所有主机的高概率端口和探测先于长尾
+        self._sweep_slots = threading.BoundedSemaphore(SWEEP_BACKLOG)
+        self._discover_stage = Stage("discover", self._discover_batch, 1, on_error=self._stage_error)
+        self._admit_stage = Stage("admit", self._admit_host, hosts, on_error=self._stage_error)
+        self._known_stage = Stage("known", self._check_known, hosts, on_error=self._stage_error)
+        # 队列中每台主机最多一个任务(持有名额)，另为各工作线程的结束标记预留位置，
+        # 工作线程把长尾任务放回本阶段队列时不会因队列满而互相等待
+        self._sweep_stage = Stage("sweep", self._sweep_host, hosts, capacity=SWEEP_BACKLOG + hosts,
+                                  on_error=self._stage_error, priority=True)
+        self._fingerprint_stage = Stage("fingerprint", self._fingerprint, fingerprint_workers,
+                                        on_error=self._stage_error, priority=True)
+        stages = [self._discover_stage, self._admit_stage, self._known_stage, self._sweep_stage,
+                  self._fingerprint_stage]
+        for stage in stages:
+            stage.start()
+        
+        # 主机按需从目标空间中领取，不预先生成完整IP列表；探测队列满时在此等待
+        batch = []
+        for item in enumerate(self.scheduled_hosts(ips)):
+            if self.stop_flag:
+                break
+            batch.append(item)
+            if len(batch) >= DISCOVERY_BATCH:
+                self._discover_stage.put((batch, total_ips, enable_full_port_scan))
+                batch = []
+        if batch and not self.stop_flag:
+            self._discover_stage.put((batch, total_ips, enable_full_port_scan))
+        # 上游阶段全部结束后才关闭下游，保证已投递的任务都被处理
+        for stage in stages:
+            stage.close()
+            
+    def imported_job(self, ip: str, ports: List[int], index: int, enable_full_port_scan: bool,
+                     sweep: Set[int]) -> Optional[HostJob]:
+        """把导入的一组开放端口转为探测任务：已知服务端口执行探测计划，
+        启用全端口扫描时全端口扫描范围内的其它端口检测vLLM；没有可探测的端口时返回None
+        """
+        open_set = set(ports)
+        probes = [probe for probe in self.probe_plan if probe["port"] in open_set]
+        extra = sorted(open_set & sweep - set(self.known_ports))
+        if not probes and not extra:
+            return None
+        job = HostJob(ip, index, 0, enable_full_port_scan)
+        job.probes = probes
+        if probes:
+            job.phase_started[PHASE_SERVICES] = job.started
+            job.add(PHASE_SERVICES, len(group_probes(probes)))
+        if extra:
+            job.sweep = True
+            job.sweep_open = extra
+            job.phase_started[PHASE_SWEEP] = job.started
+            job.add(PHASE_SWEEP, len(extra))
+        return job
+        
+    def imported_jobs(self, imported: PortImport, enable_full_port_scan: bool) -> Iterator[HostJob]:
+        """边读取导入数据边产出探测任务，登记主机引用，并按读取位置更新进度"""
+        sweep = set(sweep_ports()) if enable_full_port_scan else set()
+        count = 0
+        try:
+            for ip, ports in imported.hosts():
+                if self.stop_flag:
+                    break
+                job = self.imported_job(ip, ports, count, enable_full_port_scan, sweep)
+                if job is not None:
+                    count += 1
+                    self.log(f">>> 扫描 {ip}, 导入的开放端口: {ports[:10]}{'...' if len(ports) > 10 else ''}")
+                    self.hold_host(ip)
+                    yield job
+                value = imported.progress()
+                if value is not None and min(99, value) > self.progress:
+                    self.update_progress(min(99, value))
+        except (OSError, ValueError) as e:
+            self.log(f"读取导入文件失败: {e}", "error")
+        self.log(f"导入({imported.format}): {imported.records} 个开放端口，{count} 组进行了指纹识别")
+        
+    def scan_imported(self, imported: PortImport, enable_full_port_scan: bool = False):
+        """扫描导入的开放端口：跳过存活探测和端口扫描，端口直接交给HTTP指纹识别阶段"""
+        self.reset_units(0)  # 总量未知，进度按导入数据的读取位置计算
+        self.start_limiter()
+        self._fingerprint_stage = Stage("fingerprint", self._fingerprint, self.max_workers,
+                                        on_error=self._stage_error, priority=True)
+        self._fingerprint_stage.start()
+        try:
+            for job in self.imported_jobs(imported, enable_full_port_scan):
+                # 任务已在 imported_job 中全部登记，某阶段先完成时不会误判主机已完成
+                for port, probes in group_probes(job.probes):
+                    self.queue_fingerprint(job, PHASE_SERVICES, port, probes)
+                for port in job.sweep_open:
+                    self.queue_fingerprint(job, PHASE_SWEEP, port)
+        finally:
+            self._fingerprint_stage.close()
+        
+    def queue_fingerprint(self, job: HostJob, phase: str, port: int, probes: Optional[List[Dict]] = None):
+        """投递指纹识别任务(一个端口上的一组探测)，命中概率高的先出队"""
+        if probes:
+            score = max(self.history.probe_score(port, probe["path"]) for probe in probes)
+        else:
+            score = self.history.port_score(port)
+        self._fingerprint_stage.put((job, phase, port, probes), -score)
+        
+    def queue_sweep(self, job: HostJob):
+        """主机进入全端口扫描阶段；排队等待长尾扫描的主机达到上限时在此等待"""
+        self._sweep_slots.acquire()
+        self._sweep_stage.put((job, False))
+        
+    def _stage_error(self, stage: str, error: Exception):
+        self.log(f"流水线阶段 {stage} 任务异常: {error}", "error")
+        
+    def _discover_batch(self, task: Tuple[List[Tuple[int, str]], int, bool]):
+        """存活探测阶段：一批主机中确认存活的立即进入准入阶段"""
+        batch, total_ips, enable_full_port_scan = task
+        for i, ip in self.discover_live(batch, enable_full_port_scan):
+            self._admit_stage.put(HostJob(ip, i, total_ips, enable_full_port_scan))
+            
+    def _admit_host(self, job: HostJob):
+        """准入阶段：跳过断点中已完成的阶段，增量模式下沿用端口未变化的阶段，其余交给后续阶段"""
+        ip, full = job.ip, job.full
+        if self.stop_flag:
+            return
+        if self.host_done(ip, full):
+            self.advance(self.host_units(full))
+            return
+        job.started = time.monotonic()
+        self.log(f"")
+        self.log(f">>> 扫描 [{job.index + 1}/{job.total}] {ip}")
+        
+        cached = self.cached_phases(ip)
+        reused = self.reusable_phases(ip, cached, self.check_ports_open(ip, self.cache_ports(cached))) if cached else {}
+        
+        if self.phase_done(ip, PHASE_SERVICES):
+            self.advance(len(self.probe_plan))
+        elif PHASE_SERVICES in reused:
+            self.log(f"[{ip}] 已知端口未变化，沿用 {len(reused[PHASE_SERVICES])} 条缓存结果")
+            self.advance(len(self.probe_plan))
+            self.complete_phase(ip, PHASE_SERVICES, reused[PHASE_SERVICES], verified=False)
+        else:
+            job.add(PHASE_SERVICES)
+        
+        if full:
+            if self.stop_flag or self.phase_done(ip, PHASE_SWEEP):
+                self.advance(len(sweep_ports()))
+            elif PHASE_SWEEP in reused:
+                self.log(f"[{ip}] 端口集合未变化，跳过全端口扫描，沿用 {len(reused[PHASE_SWEEP])} 条缓存结果")
+                self.advance(len(sweep_ports()))
+                self.complete_phase(ip, PHASE_SWEEP, reused[PHASE_SWEEP], verified=False)
+            else:
+                job.sweep = True
+                job.add(PHASE_SWEEP)
+        
+        if job.pending(PHASE_SERVICES):
+            self._known_stage.put(job)
+        elif job.sweep:
+            self.queue_sweep(job)
+        else:
+            self.finish_host(job)
+            
+    def _check_known(self, job: HostJob):
+        """已知端口检查阶段：开放端口上的探测交给指纹识别阶段，主机随即进入全端口扫描阶段"""
+        ip = job.ip
+        job.phase_started[PHASE_SERVICES] = time.monotonic()
+        open_known = set() if self.stop_flag else self.check_known_ports(ip)
+        if open_known:
+            self.log(f"[{ip}] 检测LLM服务...")
+        probes = [probe for probe in self.probe_plan if probe["port"] in open_known]
+        self.advance(len(self.probe_plan) - len(probes))
+        groups = group_probes(probes)
+        job.add(PHASE_SERVICES, len(groups))
+        for port, group in groups:
+            self.queue_fingerprint(job, PHASE_SERVICES, port, group)
+        if job.sweep:
+            self.queue_sweep(job)
+        self._task_done(job, PHASE_SERVICES)
+        
+    def _sweep_host(self, task: Tuple[HostJob, bool]):
+        """全端口扫描阶段：每发现一个开放端口立即交给指纹识别阶段
+        
+        先扫描高概率端口，长尾端口作为低优先级任务重新入队，
+        排在所有主机的高概率端口之后扫描。
+        """
+        job, tail = task
+        ip = job.ip
+        order, hot = self._sweep_order, self._sweep_hot
+        has_tail = not tail and 0 < hot < len(order)
+        requeued = False
+        try:
+            if not tail:
+                self.log(f"[{ip}] 全端口扫描开始，共 {len(order)} 个端口待扫描")
+                job.phase_started[PHASE_SWEEP] = time.monotonic()
+            ports_to_scan = order[hot:] if tail else order[:hot or None]
+            
+            scanned_ports = 0
             try:
-                network = ipaddress.IPv4Network(target.strip(), strict=False)
-                for i, ip in enumerate(network.hosts()):
-                    if i >= 256:
-                        break
-                    ips.append(str(ip))
-            except:
-                pass
-        return ips
+                with self.metrics.timer("task_seconds", task="port_sweep"):
+                    for r in self.iter_connects(ip, ports_to_scan):
+                        scanned_ports += 1
+                        self.advance()
+                        if r.state == OPEN:
+                            job.sweep_open.append(r.port)
+                            self.log(f"[{ip}] 端口 {r.port} 开放", "debug")
+                            job.add(PHASE_SWEEP)
+                            self.queue_fingerprint(job, PHASE_SWEEP, r.port)
+            finally:
+                # 取消或出错时未扫描的端口也计入进度
+                self.advance(len(ports_to_scan) - scanned_ports)
+            
+            if has_tail and not self.stop_flag:
+                job.add(PHASE_SWEEP)
+                requeued = True
+                try:
+                    self._sweep_stage.put((job, True), 1, block=False)
+                except queue.Full:
+                    # 容量已预留，正常不会发生；放不回队列时在本线程继续扫描长尾端口
+                    self._sweep_host((job, True))
+                return
+            if not self.stop_flag:
+                open_ports = sorted(job.sweep_open)
+                if open_ports:
+                    self.log(f"[{ip}] 发现 {len(open_ports)} 个开放端口: {open_ports[:10]}{'...' if len(open_ports) > 10 else ''}")
+                else:
+                    self.log(f"[{ip}] 未发现额外开放端口")
+        except Exception:
+            # 扫描出错的阶段不记入断点和结果库，下次扫描重新执行；异常交给流水线记录
+            job.failed.add(PHASE_SWEEP)
+            raise
+        finally:
+            if not requeued:
+                if has_tail:
+                    self.advance(len(order) - hot)
+                self._sweep_slots.release()
+            self._task_done(job, PHASE_SWEEP)
+        
+    def _fingerprint(self, task: Tuple[HostJob, str, int, Optional[List[Dict]]]):
+        """HTTP指纹识别阶段：执行一个端口上的已知服务探测，或在全端口扫描发现的端口上检测vLLM"""
+        job, phase, port, probes = task
+        ip = job.ip
+        if phase == PHASE_SERVICES:
+            if not self.stop_flag:
+                with self.metrics.timer("task_seconds", task="service_probe"):
+                    job.responses.update(self.probe_port(ip, port, probes, self.host_timing(ip).http_timeout))
+            self.advance(len(probes))
+        else:
+            result = self.verify_vllm_port(ip, port)
+            if result:
+                job.sweep_results.append(result)
+        self._task_done(job, phase)
+        
+    def _task_done(self, job: HostJob, phase: str):
+        """完成主机某阶段的一个任务；阶段完成时登记结果，主机完成时释放资源"""
+        phase_done, host_done = job.done(phase)
+        if phase_done:
+            started = job.phase_started.get(phase)
+            if started is not None:
+                self.metrics.observe("phase_seconds", time.monotonic() - started, phase=phase)
+            if phase == PHASE_SERVICES:
+                results = self.classify_responses(job.ip, job.responses)
+            else:
+                open_ports = sorted(job.sweep_open)
+                if open_ports:
+                    self._phase_ports[(job.ip, PHASE_SWEEP)] = open_ports
+                    self.open_ports.extend(open_ports)
+                results = sorted(job.sweep_results, key=lambda r: r["port"])
+            if phase in job.failed:
+                self.add_results(results)
+                self._phase_ports.pop((job.ip, phase), None)
+            else:
+                self.complete_phase(job.ip, phase, results)
+        if host_done:
+            self.finish_host(job)
+            
+    def finish_host(self, job: HostJob):
+        """主机所有阶段完成：统计单主机耗时并释放资源"""
+        self.metrics.observe("host_seconds", time.monotonic() - job.started)
+        self.release_host(job.ip)
         
-    def scan(self, target: str, target_type: str, enable_full_port_scan: bool = False):
-        """执行扫描"""
+    def begin_scan(self, target: str, target_type: str, enable_full_port_scan: bool,
+                   exclude: str = "") -> TargetSpace:
+        """重置扫描状态并输出任务信息，返回待扫描的目标空间"""
         self.scanning = True
         self.stop_flag = False
+        self.scan_failed = False
         self.results = []
+        self.result_count = 0
+        self.changes = []
         self.open_ports = []
         self.progress = 0
+        self.metrics = ScanMetrics()
+        self._scan_started = time.monotonic()
+        self._scan_finished = None
         
+        self.bus.start()
         self.update_progress(0)
         self.log("=" * 40)
         self.log("开始扫描任务")
+        if SIGNATURE_ERROR:
+            self.log(f"签名库加载失败，仅使用内置签名: {SIGNATURE_ERROR}", "warning")
         
-        ips = self.parse_target(target, target_type)
+        ips = self.parse_target(target, target_type, exclude)
         if not ips:
             self.log("错误: 无效的目标地址", "error")
+        elif isinstance(ips, PortImport) and (self.checkpoint_file or self.store_file):
+            self.log("导入开放端口扫描不支持断点文件和结果库", "error")
+            ips = TargetSpace([])
+        elif self.results_file and not self.open_results_file():
+            ips = TargetSpace([])
+        elif self.checkpoint_file and not self.open_checkpoint(target, target_type, enable_full_port_scan, exclude):
+            self.close_results_file()
+            ips = TargetSpace([])
+        elif self.store_file and not self.open_store():
+            self.close_results_file()
+            self.close_checkpoint()
+            ips = TargetSpace([])
+        if not ips:
             self.scanning = False
+            self.scan_failed = True
+            self._scan_finished = time.monotonic()
             self.update_progress(100)
+            self.bus.put(("done", [], None))
+            self.bus.stop()
             return []
             
+        self.prepare_schedule()
         self.log(f"目标: {target}")
         self.log(f"类型: {target_type}")
-        self.log(f"IP数量: {len(ips)}")
+        if exclude:
+            self.log(f"排除: {exclude}")
+        if isinstance(ips, PortImport):
+            self.log(f"导入格式: {ips.format}，跳过存活探测和端口扫描")
+        else:
+            self.log(f"IP数量: {len(ips)}")
         self.log(f"全端口扫描: {'启用' if enable_full_port_scan else '禁用'}")
+        if self.history.path:
+            self.log(f"命中历史: {self.history.path} (已累计 {self.history.scans} 次扫描)")
+        if not isinstance(ips, PortImport):
+            self.log(f"存活探测: {'跳过(所有目标视为存活)' if self.assume_up else '启用'}")
+        if self.rate_limit or self.per_host_rate:
+            self.log(f"速率限制: 全局 {self.rate_limit or '不限'}, 单主机 {self.per_host_rate or '不限'} (次/秒)")
+        if self._writer:
+            self.log(f"结果文件: {self.results_file}")
         self.log("=" * 40)
+        return ips
         
-        total_ips = len(ips)
+    def open_results_file(self) -> bool:
+        """打开JSONL结果文件(追加写入)，失败时输出错误并返回False"""
+        try:
+            self._writer = JsonlWriter(self.results_file)
+        except OSError as e:
+            self.log(f"无法打开结果文件 {self.results_file}: {e}", "error")
+            return False
+        return True
         
-        for i, ip in enumerate(ips):
-            if self.stop_flag:
-                break
-            
-            ip_progress_base = int((i / total_ips) * 100)
-            ip_progress_weight = int(100 / total_ips)
-            
-            self.log(f"")
-            self.log(f">>> 扫描 [{i+1}/{total_ips}] {ip} ({int((i+1)/total_ips*100)}%)")
-            self.update_progress(ip_progress_base)
-            
-            self.log(f"[{ip}] 检测LLM服务...")
-            service_results = self.scan_ip_services(ip, ip_progress_base, ip_progress_weight)
-            self.results.extend(service_results)
-            
-            if enable_full_port_scan and not self.stop_flag:
-                self.log(f"[{ip}] 启动全端口扫描...")
-                vllm_results = self.scan_ports_for_vllm(ip, ip_progress_base, ip_progress_weight)
-                self.results.extend(vllm_results)
-                
-            self.update_progress(ip_progress_base + ip_progress_weight)
-                
+    def close_results_file(self):
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+        
+    def finish_scan(self) -> List[Dict]:
+        """输出扫描总结并通知界面扫描结束"""
         self.log("")
         self.log("=" * 40)
         if self.stop_flag:
             self.log("扫描已取消", "warning")
         else:
-            if self.results:
-                self.log(f"扫描完成! 发现 {len(self.results)} 个漏洞", "error")
+            if self.result_count:
+                self.log(f"扫描完成! 发现 {self.result_count} 个漏洞", "error")
             else:
                 self.log("扫描完成! 未发现漏洞", "success")
+        if self._writer:
+            self.log(f"结果已写入: {self.results_file}")
+        if self.max_results and self.result_count > len(self.results):
+            self.log(f"内存中仅保留了 {len(self.results)}/{self.result_count} 条结果", "warning")
+        self.save_history()
+        if self.store is not None:
+            counts = {kind: sum(1 for c in self.changes if c["change"] == kind)
+                      for kind in (CHANGE_NEW, CHANGE_GONE, CHANGE_CHANGED)}
+            self.log(f"与上次扫描相比: 新增 {counts[CHANGE_NEW]}, 消失 {counts[CHANGE_GONE]}, "
+                     f"变化 {counts[CHANGE_CHANGED]}")
         self.log("=" * 40)
+        self.close_results_file()
+        self.close_checkpoint()
+        self.close_store()
         
         self.update_progress(100)
+        self._scan_finished = time.monotonic()
         self.scanning = False
-        self.msg_queue.put(("done", self.results, None))
+        self.bus.put(("done", self.results, None))
+        self.bus.stop()
         return self.results
         
     def stop(self):
         """停止扫描"""
         self.stop_flag = True
         self.log("正在停止扫描...", "warning")
+        if self._checkpoint is not None:
+            # 窗口关闭时扫描线程可能来不及收尾，先把已缓冲的断点落盘
+            self._checkpoint.flush()
+
 
+if __name__ == "__main__":
+    # python -m llm_scanner: 让命令行模块复用当前已加载的扫描引擎，避免重复加载
+    sys.modules.setdefault("llm_scanner", sys.modules[__name__])
+    from cli import main
+    sys.exit(main())
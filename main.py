@@ -10,11 +10,16 @@ import PySimpleGUI as sg
 import threading
 import json
 from llm_scanner import LLMScanner, LLM_SERVICES
+from result_sink import dump_jsonl
+from checkpoint import CHECKPOINT_FILE, load_checkpoint, job_signature
 
 # ============ 版本信息 ============
 VERSION = "1.0.0"
 WINDOW_SIZE = (1050, 620)
 
+# 每次界面刷新最多处理的消息数，避免大量日志阻塞界面
+MAX_MESSAGES_PER_TICK = 200
+
 # ============ 主题配置 ============
 
 class ThemeConfig:
@@ -121,6 +126,7 @@ def create_window(theme_name="light"):
             [sg.HorizontalSeparator(color=BORDER)],
             [sg.Checkbox('启用全端口扫描检测vLLM', key='-FULL_SCAN-', default=False, text_color=TEXT_PRIMARY)],
             [sg.Text('(扫描1024-40000端口范围)', font=('Helvetica', 9), text_color=TEXT_SECONDARY)],
+            [sg.Checkbox('跳过存活探测(所有目标视为存活)', key='-ASSUME_UP-', default=False, text_color=TEXT_PRIMARY)],
             [sg.HorizontalSeparator(color=BORDER)],
             [sg.Button('开始扫描', key='-START-', size=(15, 1), button_color=(BTN_TEXT, BUTTON)),
              sg.Button('停止扫描', key='-STOP-', size=(15, 1), disabled=True, button_color=(BTN_DISABLED_TEXT, BTN_DISABLED_BG))],
@@ -191,6 +197,7 @@ def create_window(theme_name="light"):
             [sg.HorizontalSeparator()],
             [sg.Checkbox('启用全端口扫描检测vLLM', key='-FULL_SCAN-', default=False)],
             [sg.Text('(扫描1024-40000端口范围)', font=('Helvetica', 9), text_color=HINT_COLOR)],
+            [sg.Checkbox('跳过存活探测(所有目标视为存活)', key='-ASSUME_UP-', default=False)],
             [sg.HorizontalSeparator()],
             [sg.Button('开始扫描', key='-START-', size=(15, 1), button_color=(BTN_TEXT, BUTTON)),
              sg.Button('停止扫描', key='-STOP-', size=(15, 1), disabled=True)],
@@ -248,13 +255,26 @@ def create_window(theme_name="light"):
     return window
 
 
+def print_log_lines(window, lines, color_map, default_color):
+    """批量输出日志，连续的同级别日志合并为一次输出"""
+    group, group_level = [], None
+    for text, level in lines:
+        if group and level != group_level:
+            window['-LOG-'].print("\n".join(group), text_color=color_map.get(group_level, default_color))
+            group = []
+        group.append(text)
+        group_level = level
+    if group:
+        window['-LOG-'].print("\n".join(group), text_color=color_map.get(group_level, default_color))
+
+
 def main():
     """主函数"""
     current_theme = get_current_theme()
     theme_config = ThemeConfig.DARK if current_theme == "dark" else ThemeConfig.LIGHT
     
     window = create_window(current_theme)
-    scanner = LLMScanner()
+    scanner = LLMScanner(checkpoint_file=CHECKPOINT_FILE)
     scan_thread = None
     results_data = []
     log_history = []  # 保存日志历史 [(text, level), ...]
@@ -273,11 +293,23 @@ def main():
                 window['-HINT-'].update(hint)
                 break
     
-    def run_scan():
+    def get_scan_options():
         target = window['-TARGET-'].get().strip()
         target_type = "single" if window['-SINGLE-'].get() else ("range" if window['-RANGE-'].get() else "cidr")
         enable_full_scan = window['-FULL_SCAN-'].get()
-        scanner.scan(target, target_type, enable_full_scan)
+        return target, target_type, enable_full_scan
+        
+    def ask_resume():
+        """相同任务存在未完成的断点时询问是否继续"""
+        state = load_checkpoint(CHECKPOINT_FILE)
+        if state is None or state.finished or state.job != job_signature(*get_scan_options()):
+            return False
+        answer = sg.popup_yes_no(f'发现未完成的相同扫描任务(已完成 {state.hosts_done()} 台主机)\n是否从断点继续?',
+                                 title='断点续扫')
+        return answer == 'Yes'
+        
+    def run_scan():
+        scanner.scan(*get_scan_options())
         
     while True:
         event, values = window.read(timeout=50)
@@ -294,6 +326,7 @@ def main():
             saved_range = values['-RANGE-']
             saved_cidr = values['-CIDR-']
             saved_full_scan = values['-FULL_SCAN-']
+            saved_assume_up = values['-ASSUME_UP-']
             saved_log_history = log_history.copy()
             saved_progress = scanner.progress
             saved_results = results_data.copy() if results_data else []
@@ -318,10 +351,10 @@ def main():
             window['-RANGE-'].update(saved_range)
             window['-CIDR-'].update(saved_cidr)
             window['-FULL_SCAN-'].update(saved_full_scan)
+            window['-ASSUME_UP-'].update(saved_assume_up)
             # 重新渲染日志（带颜色）
             log_history = saved_log_history
-            for log_text, log_level in log_history:
-                window['-LOG-'].print(log_text, text_color=color_map.get(log_level, default_color))
+            print_log_lines(window, log_history, color_map, default_color)
             window['-PROGRESS-'].update(saved_progress)
             window['-PROGRESS_TEXT-'].update(f'进度: {saved_progress}%')
             if saved_results:
@@ -333,24 +366,35 @@ def main():
                 window['-STOP-'].update(disabled=False)
             continue
             
-        # 处理消息队列
-        while not scanner.msg_queue.empty():
+        # 处理消息队列(每次刷新限量处理，进度只显示最新值)
+        latest_progress = None
+        new_results = []
+        for _ in range(MAX_MESSAGES_PER_TICK):
             try:
                 msg_type, msg_data, msg_level = scanner.msg_queue.get_nowait()
                 if msg_type == "log":
                     log_history.append((msg_data, msg_level))  # 保存日志历史
                     window['-LOG-'].print(msg_data, text_color=color_map.get(msg_level, default_color))
+                elif msg_type == "log_batch":
+                    log_history.extend(msg_data)
+                    print_log_lines(window, msg_data, color_map, default_color)
                 elif msg_type == "progress":
-                    window['-PROGRESS-'].update(msg_data)
-                    window['-PROGRESS_TEXT-'].update(f'进度: {msg_data}%')
+                    latest_progress = msg_data
+                elif msg_type == "result":
+                    new_results.append(msg_data)
                 elif msg_type == "done":
-                    results_data = msg_data
-                    table_data = [[r['ip'], r['port'], r['service'], r['status'], r['vulnerability']] for r in msg_data]
-                    window['-RESULTS-'].update(values=table_data)
                     window['-START-'].update(disabled=False)
                     window['-STOP-'].update(disabled=True)
             except:
                 break
+        if new_results:
+            # 结果在发现时即显示，无需等待扫描结束
+            results_data.extend(new_results)
+            table_data = [[r['ip'], r['port'], r['service'], r['status'], r['vulnerability']] for r in results_data]
+            window['-RESULTS-'].update(values=table_data)
+        if latest_progress is not None:
+            window['-PROGRESS-'].update(latest_progress)
+            window['-PROGRESS_TEXT-'].update(f'进度: {latest_progress}%')
             
         if event in ['-SINGLE-', '-RANGE-', '-CIDR-']:
             update_hint()
@@ -360,6 +404,8 @@ def main():
             if not target:
                 sg.popup_error('请输入目标地址')
                 continue
+            scanner.resume = ask_resume()
+            scanner.assume_up = values['-ASSUME_UP-']
             window['-START-'].update(disabled=True)
             window['-STOP-'].update(disabled=False)
             window['-PROGRESS-'].update(0)
@@ -395,10 +441,13 @@ def main():
             if results_data:
                 # 使用系统原生对话框，两个主题效果一致
                 filename = sg.popup_get_file('保存结果', save_as=True, default_extension='.json', 
-                                             file_types=(('JSON', '*.json'),), no_window=True)
+                                             file_types=(('JSON', '*.json'), ('JSON Lines', '*.jsonl')), no_window=True)
                 if filename:
                     with open(filename, 'w', encoding='utf-8') as f:
-                        json.dump(results_data, f, ensure_ascii=False, indent=2)
+                        if filename.lower().endswith('.jsonl'):
+                            dump_jsonl(results_data, f)
+                        else:
+                            json.dump(results_data, f, ensure_ascii=False, indent=2)
                     sg.popup(f'已保存: {filename}')
             else:
                 sg.popup('没有结果可导出')
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 消息总线模块
+在扫描引擎与界面之间合并、限速传递消息：日志按批投递，进度按频率合并，低级别日志在源头丢弃
+"""
+
+import queue
+import threading
+import time
+from typing import List, Tuple
+
+# ============ 配置 ============
+
+# 日志详细程度
+VERBOSITY_QUIET = 0     # 只输出发现、警告和错误
+VERBOSITY_NORMAL = 1    # 默认，不输出逐端口/逐探测的调试信息
+VERBOSITY_DEBUG = 2     # 输出全部日志
+
+# 各日志级别所需的最低详细程度
+LEVEL_VERBOSITY = {
+    "error": VERBOSITY_QUIET,
+    "warning": VERBOSITY_QUIET,
+    "success": VERBOSITY_QUIET,
+    "info": VERBOSITY_NORMAL,
+    "debug": VERBOSITY_DEBUG,
+}
+
+# 进度消息每秒最多发送次数
+PROGRESS_RATE = 10
+
+# 日志批量投递：缓冲达到条数或间隔时间即投递
+LOG_BATCH_SIZE = 200
+FLUSH_INTERVAL = 0.1
+
+
+class MessageBus:
+    """合并限速的消息总线
+
+    仍使用 (类型, 数据, 级别) 三元组协议，新增 ("log_batch", [(文本, 级别), ...], None)，
+    batch_logs=False 时日志逐条以 "log" 消息发送。
+    后台线程按 FLUSH_INTERVAL 定期投递缓冲中的日志和最新进度。
+    """
+
+    def __init__(self, msg_queue: "queue.Queue" = None, verbosity: int = VERBOSITY_NORMAL,
+                 progress_rate: float = PROGRESS_RATE, batch_logs: bool = True):
+        self.queue = msg_queue if msg_queue is not None else queue.Queue()
+        self.verbosity = verbosity
+        self.progress_interval = 1.0 / progress_rate if progress_rate > 0 else 0.0
+        self.batch_logs = batch_logs
+        self._lines = []  # type: List[Tuple[str, str]]
+        self._pending_progress = None
+        self._last_progress = 0.0
+        self._lock = threading.Lock()
+        self._ticker = None
+        self._ticker_stop = threading.Event()
+
+    def accepts(self, level: str) -> bool:
+        """该级别的日志在当前详细程度下是否输出"""
+        return LEVEL_VERBOSITY.get(level, VERBOSITY_NORMAL) <= self.verbosity
+
+    def log(self, text: str, level: str = "info"):
+        """缓冲一条日志，缓冲满时立即投递"""
+        if not self.batch_logs:
+            self.queue.put(("log", text, level))
+            return
+        with self._lock:
+            self._lines.append((text, level))
+            if len(self._lines) < LOG_BATCH_SIZE:
+                return
+            self._flush_locked()
+
+    def progress(self, value: int):
+        """记录进度，按频率上限合并发送，100% 总是立即发送"""
+        with self._lock:
+            now = time.monotonic()
+            if value >= 100 or now - self._last_progress >= self.progress_interval:
+                self._flush_lines_locked()
+                self._pending_progress = None
+                self._last_progress = now
+                self.queue.put(("progress", value, None))
+            else:
+                self._pending_progress = value
+
+    def put(self, message: Tuple):
+        """投递其它消息(result/done等)，先投递此前缓冲的日志和进度以保持顺序"""
+        with self._lock:
+            self._flush_locked()
+            self.queue.put(message)
+
+    def flush(self):
+        """投递缓冲中的日志和最新进度"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_lines_locked(self):
+        if self._lines:
+            self.queue.put(("log_batch", self._lines, None))
+            self._lines = []
+
+    def _flush_locked(self):
+        self._flush_lines_locked()
+        if self._pending_progress is not None:
+            self.queue.put(("progress", self._pending_progress, None))
+            self._pending_progress = None
+            self._last_progress = time.monotonic()
+
+    def start(self):
+        """启动定期投递线程"""
+        if self._ticker is not None:
+            return
+        self._ticker_stop.clear()
+        self._ticker = threading.Thread(target=self._tick, daemon=True)
+        self._ticker.start()
+
+    def stop(self):
+        """停止定期投递线程并投递剩余消息"""
+        if self._ticker is not None:
+            self._ticker_stop.set()
+            self._ticker.join()
+            self._ticker = None
+        self.flush()
+
+    def _tick(self):
+        while not self._ticker_stop.wait(FLUSH_INTERVAL):
+            self.flush()
+
+
+def expand_messages(msg_type: str, msg_data, msg_level) -> List[Tuple]:
+    """将 log_batch 展开为逐条 log 消息，便于只支持旧协议的消费者处理"""
+    if msg_type == "log_batch":
+        return [("log", text, level) for text, level in msg_data]
+    return [(msg_type, msg_data, msg_level)]
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 扫描指标模块
+引擎内置的计数器和直方图(连接结果、HTTP状态、读取字节数、各阶段耗时、单主机耗时)，
+可导出为JSON快照、Prometheus文本格式，或通过HTTP端点/定期写文件对外提供
+"""
+
+import ipaddress
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+# ============ 配置 ============
+
+# 耗时直方图的桶上界(秒)
+HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Prometheus 指标名前缀
+METRIC_PREFIX = "llm_scanner_"
+
+# 定期写入JSON快照的默认间隔(秒)
+METRICS_INTERVAL = 10.0
+
+# 监听地址省略主机时使用的地址(只接受本机连接)
+DEFAULT_HOST = "127.0.0.1"
+
+METRIC_HELP = {
+    "connects_total": "TCP连接结果(open/refused/timeout/error)",
+    "http_requests_total": "HTTP探测按状态码统计(error 表示连接失败或超时)",
+    "http_bytes_read_total": "HTTP探测读取的字节数",
+    "hosts_total": "存活探测结果(up/down，跳过存活探测时为assumed)",
+    "findings_total": "发现的服务",
+    "phase_seconds": "单台主机各阶段从开始到完成的耗时(services: 已知服务检测，sweep: 全端口扫描及vLLM检测)",
+    "task_seconds": "单个任务占用的工作时间(known_ports/service_probe/port_sweep/vllm_verify)，sum为累计工作时间",
+    "host_seconds": "单台主机从准入到所有阶段完成的耗时",
+    "progress_percent": "扫描进度",
+    "elapsed_seconds": "扫描已进行的时间",
+    "results": "发现的结果总数",
+}
+
+
+def label_key(labels: Dict[str, str]) -> str:
+    """标签转为Prometheus格式的键: a="1",b="2" """
+    return ",".join(f'{name}="{value}"' for name, value in sorted(labels.items()))
+
+
+class ScanMetrics:
+    """线程安全的计数器与直方图集合
+
+    计数器: {名称: {标签键: 值}}；直方图: {名称: {标签键: [各桶计数, 总和, 次数]}}。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = label_key(labels)
+        index = bisect_left(HISTOGRAM_BUCKETS, value)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            entry = series.get(key)
+            if entry is None:
+                entry = series[key] = [[0] * (len(HISTOGRAM_BUCKETS) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """统计代码块耗时"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - started, **labels)
+
+    def snapshot(self) -> Dict:
+        """可JSON序列化的指标快照"""
+        with self._lock:
+            return {
+                "counters": {name: dict(series) for name, series in self._counters.items()},
+                "histograms": {name: {key: {"buckets": list(entry[0]), "sum": entry[1], "count": entry[2]}
+                                      for key, entry in series.items()}
+                               for name, series in self._histograms.items()},
+            }
+
+
+def merge_snapshots(snapshots: Iterable[Dict]) -> Dict:
+    """合并多个快照(多进程分片扫描时汇总各工作进程的指标)"""
+    merged = {"counters": {}, "histograms": {}, "gauges": {}}
+    for snapshot in snapshots:
+        for name, series in snapshot.get("counters", {}).items():
+            target = merged["counters"].setdefault(name, {})
+            for key, value in series.items():
+                target[key] = target.get(key, 0) + value
+        for name, series in snapshot.get("histograms", {}).items():
+            target = merged["histograms"].setdefault(name, {})
+            for key, entry in series.items():
+                if key not in target:
+                    target[key] = {"buckets": list(entry["buckets"]), "sum": entry["sum"], "count": entry["count"]}
+                    continue
+                current = target[key]
+                current["buckets"] = [a + b for a, b in zip(current["buckets"], entry["buckets"])]
+                current["sum"] += entry["sum"]
+                current["count"] += entry["count"]
+        merged["gauges"].update(snapshot.get("gauges", {}))
+    return merged
+
+
+def _series_name(name: str, key: str, suffix: str = "", extra: str = "") -> str:
+    labels = ",".join(part for part in (key, extra) if part)
+    return f"{METRIC_PREFIX}{name}{suffix}" + (f"{{{labels}}}" if labels else "")
+
+
+def prometheus_text(snapshot: Dict) -> str:
+    """把快照转为Prometheus文本格式"""
+    lines = []
+    for name, series in sorted(snapshot.get("counters", {}).items()):
+        lines.append(f"# HELP {METRIC_PREFIX}{name} {METRIC_HELP.get(name, name)}")
+        lines.append(f"# TYPE {METRIC_PREFIX}{name} counter")
+        for key, value in sorted(series.items()):
+            lines.append(f"{_series_name(name, key)} {value:g}")
+    for name, series in sorted(snapshot.get("histograms", {}).items()):
+        lines.append(f"# HELP {METRIC_PREFIX}{name} {METRIC_HELP.get(name, name)}")
+        lines.append(f"# TYPE {METRIC_PREFIX}{name} histogram")
+        for key, entry in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(HISTOGRAM_BUCKETS + (float("inf"),), entry["buckets"]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                lines.append(f"{_series_name(name, key, '_bucket', le)} {cumulative}")
+            lines.append(f"{_series_name(name, key, '_sum')} {entry['sum']:.6f}")
+            lines.append(f"{_series_name(name, key, '_count')} {entry['count']}")
+    for name, value in sorted(snapshot.get("gauges", {}).items()):
+        lines.append(f"# HELP {METRIC_PREFIX}{name} {METRIC_HELP.get(name, name)}")
+        lines.append(f"# TYPE {METRIC_PREFIX}{name} gauge")
+        lines.append(f"{METRIC_PREFIX}{name} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def write_snapshot(snapshot: Dict, path: str):
+    """写入JSON快照(先写临时文件再替换，读取方不会读到写了一半的文件)"""
+    temp = f"{path}.tmp"
+    with open(temp, "w", encoding="utf-8") as f:
+        json.dump(dict(snapshot, timestamp=time.time()), f, ensure_ascii=False)
+    os.replace(temp, path)
+
+
+def parse_listen(listen: str) -> Tuple[str, int]:
+    """解析 HOST:PORT 监听地址，省略主机时只监听本机"""
+    host, _, port = listen.rpartition(":")
+    return host.strip("[]") or DEFAULT_HOST, int(port)
+
+
+def is_loopback(host: str) -> bool:
+    """监听地址是否只接受本机连接"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class MetricsServer:
+    """指标HTTP端点: /metrics 为Prometheus文本格式，/stats 为JSON快照
+
+    监听非本机地址时必须设置 token，请求需携带 Authorization: Bearer <token>。
+    """
+
+    def __init__(self, listen: str, source: Callable[[], Dict], token: Optional[str] = None):
+        self.listen = parse_listen(listen)
+        if not token and not is_loopback(self.listen[0]):
+            raise ValueError(f"指标端点监听非本机地址 {self.listen[0]} 时必须设置口令")
+        self.source = source
+        self.token = token
+        self._server = None
+
+    def start(self):
+        """开始监听，地址被占用等错误时抛出 OSError"""
+        source = self.source
+        authorization = f"Bearer {self.token}" if self.token else None
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if authorization and self.headers.get("Authorization") != authorization:
+                    self.send_error(401)
+                    return
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    body = prometheus_text(source()).encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/stats":
+                    body = json.dumps(source(), ensure_ascii=False).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(self.listen, Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class MetricsDumper:
+    """定期把指标快照写入JSON文件，停止时再写一次最终快照"""
+
+    def __init__(self, path: str, source: Callable[[], Dict], interval: float = METRICS_INTERVAL):
+        self.path = path
+        self.source = source
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None  # type: Optional[threading.Thread]
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.dump()
+
+    def dump(self):
+        try:
+            write_snapshot(self.source(), self.path)
+        except OSError:
+            pass
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.dump()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 流水线模块
+扫描拆分为多个阶段，阶段之间用有界队列连接，每个阶段有独立的工作线程池，
+不同主机的网络等待和CPU处理在各阶段之间重叠进行
+"""
+
+import itertools
+import queue
+import threading
+from typing import Any, Callable, Optional
+
+# ============ 配置 ============
+
+# 阶段输入队列容量(按工作线程数计)，上游产出过快时在 put() 处阻塞
+STAGE_QUEUE_PER_WORKER = 4
+
+_CLOSE = object()
+
+
+class Stage:
+    """流水线阶段：有界输入队列 + 独立工作线程池
+
+    上游调用 put() 投递任务，队列满时阻塞(反压)，上游不会无限领先于下游；
+    close() 表示不会再有新任务，工作线程处理完队列中剩余的任务后退出。
+    任务只能投递给下游阶段，按上游到下游的顺序关闭各阶段即可保证不丢任务。
+    priority=True 时队列中的任务按 put() 指定的优先级(数值小的先处理)出队，同优先级先进先出。
+    """
+
+    def __init__(self, name: str, handler: Callable[[Any], None], workers: int,
+                 capacity: Optional[int] = None, on_error: Optional[Callable[[str, Exception], None]] = None,
+                 priority: bool = False):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.priority = priority
+        capacity = capacity or self.workers * STAGE_QUEUE_PER_WORKER
+        self.queue = queue.PriorityQueue(capacity) if priority else queue.Queue(capacity)
+        self._seq = itertools.count()
+        self.on_error = on_error
+        self._threads = []
+
+    def start(self):
+        self._threads = [threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+                         for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def put(self, item, priority: float = 0, block: bool = True):
+        """投递任务，队列满时等待下游腾出空位；block=False 时队列满抛出 queue.Full"""
+        self.queue.put((priority, next(self._seq), item) if self.priority else item, block)
+
+    def close(self):
+        """不再投递新任务，等待工作线程处理完剩余任务后退出"""
+        for _ in self._threads:
+            # 优先级队列中结束标记排在所有任务之后
+            self.put(_CLOSE, float("inf"))
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if self.priority:
+                item = item[2]
+            if item is _CLOSE:
+                return
+            try:
+                self.handler(item)
+            except Exception as e:
+                # 单个任务失败不影响同一阶段的其它任务
+                if self.on_error is not None:
+                    self.on_error(self.name, e)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 开放端口导入模块
+流式读取其它工具的端口扫描结果(masscan JSON/列表、nmap XML/grepable、ip:port 列表)，
+按主机产出开放端口；扫描时跳过存活探测和端口扫描，端口直接交给HTTP指纹识别
+"""
+
+import ipaddress
+import json
+import os
+import re
+import stat
+import sys
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Set, Tuple
+from xml.etree import ElementTree
+
+from targets import TargetSpace, parse_item, split_items
+
+# ============ 配置 ============
+
+IMPORT_FORMATS = ["auto", "masscan-json", "masscan-list", "nmap-xml", "nmap-grep", "list"]
+
+# 自动识别格式时读取的文件头字节数
+SNIFF_BYTES = 4096
+
+# 单个主机一次产出的端口数上限，超出部分作为该主机的下一组产出
+MAX_GROUP_PORTS = 1024
+
+MASSCAN_LIST_LINE = re.compile(rb"^open\s+tcp\s+\d+\s+\S+")
+
+
+def detect_format(head: bytes) -> str:
+    """按文件头识别导入格式，无法识别时视为 ip:port 列表"""
+    head = head.lstrip(b"\xef\xbb\xbf \t\r\n")
+    if head.startswith(b"<"):
+        return "nmap-xml"
+    if head.startswith((b"[", b"{")):
+        return "masscan-json"
+    if head.startswith(b"#masscan") or MASSCAN_LIST_LINE.match(head):
+        return "masscan-list"
+    if head.startswith((b"# Nmap", b"Host:")) or b"\nHost: " in head:
+        return "nmap-grep"
+    return "list"
+
+
+def valid_record(ip: str, port) -> Optional[Tuple[str, int]]:
+    """校验 (IPv4地址, 端口)，无效时返回None"""
+    try:
+        ip = str(ipaddress.IPv4Address(ip.strip()))
+        port = int(port)
+    except (ValueError, TypeError):
+        return None
+    return (ip, port) if 1 <= port <= 65535 else None
+
+
+def parse_masscan_json(lines: Iterable[bytes]) -> Iterator[Tuple[str, int]]:
+    """masscan -oJ/-oD 输出：每行一个主机对象(JSON数组的方括号和行间逗号忽略)"""
+    for line in lines:
+        line = line.strip().lstrip(b"[,").rstrip(b",]").strip()
+        if not line.startswith(b"{"):
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        for port in entry.get("ports") or []:
+            # 带 service 字段的是 banner 记录，同样说明端口开放
+            if port.get("proto", "tcp") != "tcp" or port.get("status", "open") != "open":
+                continue
+            record = valid_record(entry.get("ip", ""), port.get("port"))
+            if record:
+                yield record
+
+
+def parse_masscan_list(lines: Iterable[bytes]) -> Iterator[Tuple[str, int]]:
+    """masscan -oL 输出: open tcp 端口 IP 时间戳"""
+    for line in lines:
+        fields = line.split()
+        if len(fields) >= 4 and fields[0] == b"open" and fields[1] == b"tcp":
+            record = valid_record(fields[3].decode("latin-1"), fields[2])
+            if record:
+                yield record
+
+
+def parse_nmap_grep(lines: Iterable[bytes]) -> Iterator[Tuple[str, int]]:
+    """nmap -oG 输出: Host: IP (名称)<TAB>Ports: 端口/状态/协议//服务///, ..."""
+    for line in lines:
+        line = line.decode("utf-8", errors="replace")
+        if not line.startswith("Host:") or "Ports:" not in line:
+            continue
+        ip = line.split(None, 2)[1]
+        for item in line.split("Ports:", 1)[1].split("\t", 1)[0].split(","):
+            fields = item.strip().split("/")
+            if len(fields) >= 3 and fields[1] == "open" and fields[2] == "tcp":
+                record = valid_record(ip, fields[0])
+                if record:
+                    yield record
+
+
+def parse_nmap_xml(stream: BinaryIO) -> Iterator[Tuple[str, int]]:
+    """nmap -oX 输出，按 host 元素增量解析，处理完即释放"""
+    try:
+        for _, element in ElementTree.iterparse(stream, events=("end",)):
+            if element.tag != "host":
+                continue
+            ip = next((a.get("addr", "") for a in element.iter("address") if a.get("addrtype") == "ipv4"), "")
+            for port in element.iter("port"):
+                state = port.find("state")
+                if port.get("protocol") == "tcp" and state is not None and state.get("state") == "open":
+                    record = valid_record(ip, port.get("portid"))
+                    if record:
+                        yield record
+            element.clear()
+    except ElementTree.ParseError:
+        # nmap 被中断时XML不完整，已解析的主机照常产出
+        return
+
+
+def parse_port_list(lines: Iterable[bytes]) -> Iterator[Tuple[str, int]]:
+    """ip:port 列表，也接受 "ip port"，# 开头为注释"""
+    for line in lines:
+        for item in split_items(line.decode("utf-8", errors="replace")):
+            ip, sep, port = item.rpartition(":")
+            if sep:
+                record = valid_record(ip, port)
+                if record:
+                    yield record
+        fields = line.split(b"#", 1)[0].split()
+        if len(fields) == 2 and b":" not in fields[0]:
+            record = valid_record(fields[0].decode("latin-1"), fields[1])
+            if record:
+                yield record
+
+
+class PortImport:
+    """导入的开放端口数据(文件路径，"-" 表示标准输入)
+
+    只在扫描时打开并流式读取，内存占用与文件大小无关(仅为去重保存已产出的 (IP, 端口))。
+    """
+
+    def __init__(self, path: str, fmt: str = "auto", exclude: str = ""):
+        if fmt not in IMPORT_FORMATS:
+            raise ValueError(f"未知的导入格式: {fmt}")
+        if path != "-" and not os.path.isfile(path):
+            raise OSError(f"导入文件不存在: {path}")
+        self.path = path
+        if fmt == "auto" and path != "-":
+            with open(path, "rb") as f:
+                fmt = detect_format(f.read(SNIFF_BYTES))
+        self.format = fmt
+        self.excluded = TargetSpace([parse_item(item) for item in split_items(exclude)])
+        self.records = 0  # 已产出的 (IP, 端口) 数
+        self._file = None
+        self._size = 0
+
+    def __bool__(self) -> bool:
+        return True
+
+    def describe(self) -> str:
+        return "标准输入" if self.path == "-" else self.path
+
+    __str__ = describe
+
+    def progress(self) -> Optional[int]:
+        """按读取位置估算的进度百分比，标准输入等无法定位的输入返回None"""
+        if not self._size or self._file is None:
+            return None
+        try:
+            return min(100, int(self._file.tell() * 100 / self._size))
+        except (OSError, ValueError):
+            return None
+
+    def _open(self) -> BinaryIO:
+        stream = sys.stdin.buffer if self.path == "-" else open(self.path, "rb")
+        try:
+            info = os.fstat(stream.fileno())
+            self._size = info.st_size if stat.S_ISREG(info.st_mode) else 0
+        except (OSError, ValueError):
+            self._size = 0
+        return stream
+
+    def iter_records(self) -> Iterator[Tuple[str, int]]:
+        """按文件顺序产出去重后的开放端口 (IP, 端口)，跳过排除的地址"""
+        self._file = self._open()
+        try:
+            fmt = self.format
+            if fmt == "auto":
+                fmt = self.format = detect_format(self._file.peek(SNIFF_BYTES)[:SNIFF_BYTES])
+            if fmt == "nmap-xml":
+                records = parse_nmap_xml(self._file)
+            else:
+                parser = {"masscan-json": parse_masscan_json, "masscan-list": parse_masscan_list,
+                          "nmap-grep": parse_nmap_grep}.get(fmt, parse_port_list)
+                records = parser(self._file)
+            seen = set()  # type: Set[Tuple[str, int]]
+            for ip, port in records:
+                if (ip, port) in seen or (self.excluded and int(ipaddress.IPv4Address(ip)) in self.excluded):
+                    continue
+                seen.add((ip, port))
+                self.records += 1
+                yield ip, port
+        finally:
+            if self._file is not sys.stdin.buffer:
+                self._file.close()
+
+    def hosts(self) -> Iterator[Tuple[str, List[int]]]:
+        """按主机分组产出开放端口：连续出现的同一主机合为一组
+
+        masscan 等工具的输出中同一主机的端口可能分散在各处，同一主机因此可能产出多组。
+        """
+        current, ports = None, []
+        for ip, port in self.iter_records():
+            if ip != current or len(ports) >= MAX_GROUP_PORTS:
+                if ports:
+                    yield current, ports
+                current, ports = ip, []
+            ports.append(port)
+        if ports:
+            yield current, ports
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 探测排序模块
+按命中概率安排探测顺序：内置先验(常见部署端口和路径) + 历史发现次数，
+命中率高的主机、端口和路径先探测，长尾部分放在后面，尽早得到发现
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+# ============ 配置 ============
+
+# 内置先验(相当于历史命中次数)，未列出的探测和端口为 DEFAULT_PRIOR
+BUILTIN_PROBE_PRIORS = {
+    (11434, "/api/tags"): 40, (11434, "/api/version"): 10,
+    (8000, "/v1/models"): 30, (8000, "/health"): 8,
+    (8080, "/v1/models"): 15, (8080, "/health"): 10, (8080, "/"): 5,
+    (1234, "/v1/models"): 8,
+    (4000, "/v1/models"): 4, (4000, "/health"): 4,
+    (3000, "/v1/models"): 3, (5000, "/v1/models"): 3,
+    (1337, "/v1/models"): 2, (4891, "/v1/models"): 2,
+}
+
+# 全端口扫描中vLLM/推理服务的常见端口(8000、8080等已知服务端口不在全端口扫描范围内)
+BUILTIN_SWEEP_PRIORS = {
+    8001: 10, 8002: 6, 8003: 4, 8004: 3, 8005: 3, 8006: 2, 8007: 2, 8008: 2, 8009: 2, 8010: 2,
+    8888: 5, 8081: 4, 8088: 3, 8100: 2, 8889: 2, 9000: 4, 9001: 2, 30000: 5, 7860: 2, 10000: 2,
+}
+
+DEFAULT_PRIOR = 1
+
+# 全端口扫描先探测的高概率端口数上限(评分高于 DEFAULT_PRIOR 的端口)，其余为长尾
+HOT_SWEEP_PORTS = 512
+
+# 历史文件中保留的主机数上限(按命中次数保留)
+MAX_HISTORY_HOSTS = 10000
+
+
+class HitHistory:
+    """命中历史：各 (端口, 路径)、端口和主机的累计发现次数，保存为JSON文件
+
+    path 为 None 时只使用内置先验，不读写文件。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.probes = {}  # type: Dict[str, int]
+        self.ports = {}  # type: Dict[str, int]
+        self.hosts = {}  # type: Dict[str, int]
+        self.scans = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def probe_key(port: int, path: str) -> str:
+        return f"{port} {path}"
+
+    def load(self):
+        """读取历史文件，文件不存在时从空历史开始；格式错误时抛出 ValueError"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("历史文件格式错误")
+        self.probes = {str(k): int(v) for k, v in data.get("probes", {}).items()}
+        self.ports = {str(k): int(v) for k, v in data.get("ports", {}).items()}
+        self.hosts = {str(k): int(v) for k, v in data.get("hosts", {}).items()}
+        self.scans = int(data.get("scans", 0))
+
+    def save(self):
+        """写入历史文件(先写临时文件再替换)"""
+        if not self.path:
+            return
+        with self._lock:
+            hosts = sorted(self.hosts.items(), key=lambda item: -item[1])[:MAX_HISTORY_HOSTS]
+            data = {"scans": self.scans + 1, "probes": self.probes, "ports": self.ports, "hosts": dict(hosts)}
+        temp = f"{self.path}.tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp, self.path)
+
+    def record(self, result: Dict):
+        """登记一条发现"""
+        port = result.get("port")
+        path = urlsplit(result.get("url", "")).path or "/"
+        with self._lock:
+            key = self.probe_key(port, path)
+            self.probes[key] = self.probes.get(key, 0) + 1
+            self.ports[str(port)] = self.ports.get(str(port), 0) + 1
+            ip = result.get("ip", "")
+            self.hosts[ip] = self.hosts.get(ip, 0) + 1
+
+    def probe_score(self, port: int, path: str) -> int:
+        return BUILTIN_PROBE_PRIORS.get((port, path), DEFAULT_PRIOR) + self.probes.get(self.probe_key(port, path), 0)
+
+    def port_score(self, port: int) -> int:
+        return BUILTIN_SWEEP_PRIORS.get(port, DEFAULT_PRIOR) + self.ports.get(str(port), 0)
+
+    def order_probes(self, plan: List[Dict]) -> List[Dict]:
+        """探测计划按评分从高到低排列(同分保持原顺序)"""
+        return sorted(plan, key=lambda probe: -self.probe_score(probe["port"], probe["path"]))
+
+    def order_ports(self, ports: Iterable[int]) -> List[int]:
+        """全端口扫描的端口按评分从高到低排列(同分按端口号升序)"""
+        return sorted(ports, key=lambda port: (-self.port_score(port), port))
+
+    def hot_ports(self, ordered: List[int]) -> int:
+        """已排序的端口列表中高概率端口的个数"""
+        count = 0
+        for port in ordered[:HOT_SWEEP_PORTS]:
+            if self.port_score(port) <= DEFAULT_PRIOR:
+                break
+            count += 1
+        return count
+
+    def hot_hosts(self, contains) -> List[str]:
+        """历史上有发现且在目标范围内的主机，按命中次数从高到低
+
+        contains(ip) 判断主机是否在本次目标范围内。
+        """
+        with self._lock:
+            hosts = sorted(self.hosts.items(), key=lambda item: (-item[1], item[0]))
+        return [ip for ip, _ in hosts if contains(ip)]
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 速率限制模块
+令牌桶限制全局和单主机的探测速率(TCP连接、HTTP请求、ICMP回显)，
+并在连接超时比例突增(防火墙丢包、链路拥塞)时自动降速，恢复正常后逐步提速
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from connect_scan import OPEN, REFUSED, TIMEOUT
+
+# ============ 配置 ============
+
+# 默认不限速(None)，单位: 探测/秒
+RATE_LIMIT = None
+PER_HOST_RATE = None
+
+# 令牌桶容量(允许的突发量)，按每秒速率的比例计，至少1个
+BURST_SECONDS = 0.1
+
+# 自适应降速：每台主机每统计 ADAPT_WINDOW 个连接结果评估一次超时比例，
+# 比例超过基线的两倍且至少高出 CONGESTION_RATIO 时视为拥塞
+ADAPT_WINDOW = 200
+CONGESTION_RATIO = 0.2
+BASELINE_ALPHA = 0.2
+
+# 拥塞时速率降为当前实际速率的 BACKOFF_FACTOR 倍(不低于 MIN_RATE)，
+# 之后每个正常窗口提速 RECOVERY_FACTOR 倍，直到恢复到配置的速率(未配置时恢复为不限速)
+BACKOFF_FACTOR = 0.5
+RECOVERY_FACTOR = 1.25
+MIN_RATE = 10.0
+
+# 统计实际探测速率的采样周期(秒)
+RATE_SAMPLE_SECONDS = 1.0
+
+# record() 返回的速率变化事件
+EVENT_BACKOFF = "backoff"
+EVENT_RECOVERED = "recovered"
+
+
+class TokenBucket:
+    """令牌桶：平均速率 rate 个/秒，允许少量突发
+
+    reserve() 立即预占令牌并返回需要等待的秒数(令牌不足时余额为负，
+    后来者依次排在后面)，调用方自行决定阻塞等待还是异步等待。
+    """
+
+    def __init__(self, rate: float):
+        self._lock = threading.Lock()
+        self._last = time.monotonic()
+        self._set(rate)
+        self._tokens = self.burst
+
+    def _set(self, rate: float):
+        self.rate = max(rate, 1e-3)
+        self.burst = max(1.0, self.rate * BURST_SECONDS)
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            self._refill(time.monotonic())
+            self._set(rate)
+            # 旧速率下预占的欠额作废，等待中的调用方按新速率重新预占
+            self._tokens = min(max(self._tokens, 0.0), self.burst)
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class HostStats:
+    """单台主机的连接结果统计，用于发现超时比例突增"""
+
+    __slots__ = ("answered", "timeouts", "baseline")
+
+    def __init__(self):
+        self.answered = 0
+        self.timeouts = 0
+        self.baseline = None  # type: Optional[float]
+
+
+class RateLimiter:
+    """全局 + 单主机令牌桶，附带按超时比例自适应的全局降速
+
+    rate / per_host_rate 为 None 表示不限速。adaptive=True 时即使未配置全局速率，
+    拥塞时也会按当前实际速率建立限速，恢复后自动解除。
+    """
+
+    def __init__(self, rate: Optional[float] = RATE_LIMIT, per_host_rate: Optional[float] = PER_HOST_RATE,
+                 adaptive: bool = True):
+        self.ceiling = rate
+        self.per_host_rate = per_host_rate
+        self.adaptive = adaptive
+        self.backoffs = 0
+        self.generation = 0  # 全局速率每变化一次加1
+        self._global = TokenBucket(rate) if rate else None
+        self._hosts = {}  # type: Dict[str, TokenBucket]
+        self._stats = {}  # type: Dict[str, HostStats]
+        self._lock = threading.Lock()
+        self._sample_start = time.monotonic()
+        self._sample_count = 0
+        self.observed_rate = 0.0
+        self._peak_rate = 0.0
+
+    @property
+    def rate(self) -> Optional[float]:
+        """当前的全局速率上限，None表示不限速"""
+        bucket = self._global
+        return bucket.rate if bucket is not None else None
+
+    def _observe_attempt(self):
+        now = time.monotonic()
+        with self._lock:
+            self._sample_count += 1
+            elapsed = now - self._sample_start
+            if elapsed >= RATE_SAMPLE_SECONDS:
+                self.observed_rate = self._sample_count / elapsed
+                self._peak_rate = max(self._peak_rate, self.observed_rate)
+                self._sample_start = now
+                self._sample_count = 0
+
+    def reserve(self, ip: str) -> float:
+        """为一次探测预占全局和单主机令牌，返回需要等待的秒数"""
+        if self.adaptive:
+            self._observe_attempt()
+        delay = 0.0
+        bucket = self._global
+        if bucket is not None:
+            delay = bucket.reserve()
+        if self.per_host_rate:
+            with self._lock:
+                host = self._hosts.get(ip)
+                if host is None:
+                    host = self._hosts[ip] = TokenBucket(self.per_host_rate)
+            delay = max(delay, host.reserve())
+        return delay
+
+    def record(self, ip: str, state: str) -> Optional[Tuple[str, float, Optional[float]]]:
+        """登记一次连接结果；全局速率发生降速或恢复不限速时返回 (事件, 超时比例, 新速率)"""
+        if not self.adaptive or state not in (OPEN, REFUSED, TIMEOUT):
+            return None
+        with self._lock:
+            stats = self._stats.get(ip)
+            if stats is None:
+                stats = self._stats[ip] = HostStats()
+            if state == TIMEOUT:
+                stats.timeouts += 1
+            else:
+                stats.answered += 1
+            total = stats.answered + stats.timeouts
+            if total < ADAPT_WINDOW:
+                return None
+            ratio = stats.timeouts / total
+            stats.answered = stats.timeouts = 0
+            baseline = stats.baseline
+            # 基线持续跟随(也包括拥塞窗口)，整体被过滤的主机很快成为新基线，不会反复降速
+            stats.baseline = ratio if baseline is None else baseline + BASELINE_ALPHA * (ratio - baseline)
+            if baseline is not None and ratio > max(baseline * 2, baseline + CONGESTION_RATIO):
+                return self._backoff(ratio)
+            return self._recover(ratio)
+
+    def _backoff(self, ratio: float) -> Tuple[str, float, Optional[float]]:
+        current = self.rate
+        observed = self.observed_rate or current or MIN_RATE
+        rate = max(MIN_RATE, min(current or observed, observed) * BACKOFF_FACTOR)
+        if self._global is None:
+            self._global = TokenBucket(rate)
+        else:
+            self._global.set_rate(rate)
+        self.backoffs += 1
+        self.generation += 1
+        return EVENT_BACKOFF, ratio, rate
+
+    def _recover(self, ratio: float) -> Optional[Tuple[str, float, Optional[float]]]:
+        current = self.rate
+        if current is None or (self.ceiling is not None and current >= self.ceiling):
+            return None
+        rate = current * RECOVERY_FACTOR
+        self.generation += 1
+        if self.ceiling is not None:
+            self._global.set_rate(min(rate, self.ceiling))
+            return (EVENT_RECOVERED, ratio, self.ceiling) if rate >= self.ceiling else None
+        if rate >= 2 * self._peak_rate:
+            self._global = None
+            return EVENT_RECOVERED, ratio, None
+        self._global.set_rate(rate)
+        return None
+
+    def release_host(self, ip: str):
+        """主机扫描结束后释放其令牌桶和统计"""
+        with self._lock:
+            self._hosts.pop(ip, None)
+            self._stats.pop(ip, None)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 结果输出模块
+扫描结果逐条追加写入JSONL文件，扫描中断时已写入的结果依然完整可用
+"""
+
+import json
+import threading
+from typing import Dict, Iterable, Iterator, IO
+
+
+def to_json_line(record: Dict) -> str:
+    """单条结果序列化为一行JSON"""
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def dump_jsonl(records: Iterable[Dict], f: IO[str]) -> int:
+    """逐条写出结果，返回写出条数"""
+    count = 0
+    for record in records:
+        f.write(to_json_line(record))
+        count += 1
+    return count
+
+
+def read_jsonl(path: str) -> Iterator[Dict]:
+    """逐条读取JSONL结果文件，跳过空行和进程中断时写了一半的末行"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+class JsonlWriter:
+    """线程安全的JSONL追加写入器
+
+    每条结果写入后立即 flush，进程被终止时最多丢失正在写入的一行。
+    """
+
+    def __init__(self, path: str, mode: str = "a"):
+        self.path = path
+        self.count = 0
+        self._file = open(path, mode, encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict):
+        line = to_json_line(record)
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 结果库模块
+用SQLite持久保存每台主机各扫描阶段的开放端口和发现的服务，
+支持按有效期(TTL)增量复扫，并输出与上次扫描相比新增、消失和变化的暴露面
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+# ============ 配置 ============
+
+# 默认结果库文件
+STORE_FILE = "scan_results.db"
+
+# 变化类型
+CHANGE_NEW = "new"
+CHANGE_GONE = "gone"
+CHANGE_CHANGED = "changed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS findings (
+    ip TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    service TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (ip, port, service)
+);
+CREATE INDEX IF NOT EXISTS findings_host ON findings (ip, phase);
+CREATE TABLE IF NOT EXISTS host_phases (
+    ip TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    open_ports TEXT NOT NULL,
+    verified REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (ip, phase)
+);
+"""
+
+
+# 响应被截断无法解析为JSON时提取模型标识：OpenAI兼容的模型对象、Ollama的 name/model 字段
+OPENAI_MODEL_ID = re.compile(r'"id"\s*:\s*"([^"]*)"\s*,\s*"object"\s*:\s*"model"')
+OLLAMA_MODEL_NAME = re.compile(r'"(?:name|model)"\s*:\s*"([^"]*)"')
+
+
+def model_ids(response: str) -> List[str]:
+    """响应中暴露的模型标识(OpenAI兼容的 data[].id、Ollama的 models[].name)，排序去重"""
+    try:
+        data = json.loads(response)
+    except ValueError:
+        return sorted(set(OPENAI_MODEL_ID.findall(response)) | set(OLLAMA_MODEL_NAME.findall(response)))
+    ids = set()
+    entries = [entry for key in ("data", "models") for entry in
+               (data.get(key) if isinstance(data, dict) and isinstance(data.get(key), list) else [])]
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        for key in ("id", "name", "model"):
+            if isinstance(entry.get(key), str):
+                ids.add(entry[key])
+                break
+    return sorted(ids)
+
+
+def fingerprint(result: Dict) -> str:
+    """结果指纹：服务、端口、命中的探测路径和暴露的模型列表的哈希
+
+    只取稳定的字段，响应中每次请求都会变化的 created、id 等字段不参与比较。
+    """
+    normalized = [result.get("service", ""), result.get("port"), urlsplit(result.get("url", "")).path,
+                  model_ids(result.get("response", ""))]
+    return hashlib.sha1(json.dumps(normalized, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ResultStore:
+    """持久化结果库
+
+    findings 表以 (ip, port, service) 为键记录每个发现的首次/最近发现时间和指纹，
+    host_phases 表记录每台主机每个阶段的开放端口和最近一次完整验证的时间。
+    """
+
+    def __init__(self, path: str = STORE_FILE):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def fresh_phases(self, ip: str, ttl: float) -> Dict[str, Dict]:
+        """有效期内完整验证过的阶段: {阶段: {"ports": [...], "results": [...]}}"""
+        since = time.time() - ttl
+        with self._lock:
+            phases = self._conn.execute(
+                "SELECT phase, open_ports FROM host_phases WHERE ip = ? AND verified >= ?", (ip, since)).fetchall()
+            fresh = {}
+            for phase, ports in phases:
+                rows = self._conn.execute(
+                    "SELECT result FROM findings WHERE ip = ? AND phase = ?", (ip, phase)).fetchall()
+                fresh[phase] = {"ports": json.loads(ports), "results": [json.loads(row[0]) for row in rows]}
+            return fresh
+
+    def record_phase(self, ip: str, phase: str, results: List[Dict], ports: List[int],
+                     verified: bool = True) -> List[Dict]:
+        """保存主机某阶段的扫描结果，返回与库中上次结果相比的变化
+
+        verified=False 表示结果沿用自缓存(只确认了端口仍开放)，不刷新验证时间。
+        """
+        now = time.time()
+        changes = []
+        with self._lock, self._conn:
+            previous = {(row[0], row[1]): (row[2], json.loads(row[3])) for row in self._conn.execute(
+                "SELECT port, service, fingerprint, result FROM findings WHERE ip = ? AND phase = ?", (ip, phase))}
+            for result in results:
+                key = (result["port"], result["service"])
+                digest = fingerprint(result)
+                old = previous.pop(key, None)
+                if old is None:
+                    changes.append({"change": CHANGE_NEW, **result})
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO findings VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (ip, result["port"], result["service"], phase, digest, now, now,
+                         json.dumps(result, ensure_ascii=False)))
+                    continue
+                if old[0] != digest:
+                    changes.append({"change": CHANGE_CHANGED, "previous": old[1].get("response", ""), **result})
+                self._conn.execute(
+                    "UPDATE findings SET fingerprint = ?, last_seen = ?, result = ? WHERE ip = ? AND port = ? AND service = ?",
+                    (digest, now, json.dumps(result, ensure_ascii=False), ip, result["port"], result["service"]))
+            for (port, service), (_, old_result) in previous.items():
+                changes.append({"change": CHANGE_GONE, **old_result})
+                self._conn.execute("DELETE FROM findings WHERE ip = ? AND port = ? AND service = ?",
+                                   (ip, port, service))
+            row = self._conn.execute("SELECT verified FROM host_phases WHERE ip = ? AND phase = ?",
+                                     (ip, phase)).fetchone()
+            verified_at = now if verified or row is None else row[0]
+            self._conn.execute("INSERT OR REPLACE INTO host_phases VALUES (?, ?, ?, ?, ?)",
+                               (ip, phase, json.dumps(sorted(ports)), verified_at, now))
+        return changes
+
+    def mark_down(self, ip: str) -> List[Dict]:
+        """主机未响应存活探测：删除其全部发现并作为"消失"返回，各阶段的验证时间同时作废
+
+        保留的开放端口不再参与增量复用，主机重新上线后按完整扫描处理。
+        """
+        with self._lock, self._conn:
+            rows = self._conn.execute("SELECT result FROM findings WHERE ip = ?", (ip,)).fetchall()
+            self._conn.execute("DELETE FROM findings WHERE ip = ?", (ip,))
+            self._conn.execute("UPDATE host_phases SET verified = 0 WHERE ip = ?", (ip,))
+        return [{"change": CHANGE_GONE, **json.loads(row[0])} for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
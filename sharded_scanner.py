@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 多进程分片扫描模块
+将目标空间切分到多个工作进程，每个进程运行独立的扫描引擎，
+结果和进度汇总为一条与 LLMScanner 兼容的 msg_queue 消息流
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from llm_scanner import LLMScanner, MAX_RESULTS
+from message_bus import MessageBus, VERBOSITY_NORMAL
+from metrics import merge_snapshots
+from targets import TargetSpace
+
+# ============ 配置 ============
+
+# 默认工作进程数(不超过目标主机数)
+SHARD_PROCESSES = os.cpu_count() or 1
+
+# 工作进程检查停止信号的间隔(秒)
+STOP_POLL_INTERVAL = 0.2
+
+# 工作进程上报指标快照的间隔(秒)
+METRICS_REPORT_INTERVAL = 1.0
+
+
+class ShardQueue:
+    """工作进程内的消息出口，为每条消息附加分片序号后放入进程间队列"""
+
+    def __init__(self, index: int, out_queue):
+        self.index = index
+        self.out_queue = out_queue
+
+    def put(self, message):
+        self.out_queue.put((self.index, message))
+
+
+def create_engine(engine: str, options: Dict) -> LLMScanner:
+    """按名称创建扫描引擎"""
+    if engine == "async":
+        from async_scanner import AsyncLLMScanner
+        return AsyncLLMScanner(**options)
+    return LLMScanner(**options)
+
+
+def run_shard(index: int, ranges: List, enable_full_port_scan: bool, engine: str, options: Dict,
+              settings: Dict, out_queue, stop_event):
+    """工作进程入口：扫描一个分片，消息经 out_queue 发回主进程
+
+    结果只以 result 消息发回，不在工作进程内保留或写文件；
+    指标快照定期以 metrics 消息发回，结束前再发送一次。
+    """
+    options = dict(options, max_results=0, results_file=None)
+    scanner = create_engine(engine, options)
+    scanner.apply_settings(settings)
+    scanner.prepare_schedule()
+    scanner.bus = MessageBus(ShardQueue(index, out_queue), verbosity=scanner.bus.verbosity)
+    scanner.msg_queue = scanner.bus.queue
+
+    def watch_stop():
+        reported = time.monotonic()
+        while scanner.scanning:
+            if stop_event.wait(STOP_POLL_INTERVAL):
+                scanner.stop_flag = True
+                return
+            if time.monotonic() - reported >= METRICS_REPORT_INTERVAL:
+                reported = time.monotonic()
+                scanner.bus.put(("metrics", scanner.metrics.snapshot(), None))
+
+    scanner.scanning = True
+    scanner.bus.start()
+    threading.Thread(target=watch_stop, daemon=True).start()
+    try:
+        scanner.scan_targets(TargetSpace(ranges), enable_full_port_scan)
+    except Exception as e:
+        scanner.log(f"分片 {index + 1} 异常终止: {e}", "error")
+    finally:
+        scanner.scanning = False
+        scanner.bus.put(("metrics", scanner.metrics.snapshot(), None))
+        scanner.bus.put(("done", [], None))
+        scanner.bus.stop()
+
+
+class ShardedScanner(LLMScanner):
+    """多进程分片扫描器
+
+    目标空间按地址顺序切分为 processes 个连续分片，每个工作进程运行一个
+    LLMScanner(engine="thread")或 AsyncLLMScanner(engine="async")。
+    响应解析、指纹识别和序列化分散到多个CPU核心，不再受单进程GIL限制。
+    engine_options 中的并发参数按进程生效，总并发为其 processes 倍。
+    对外与 LLMScanner 相同：msg_queue 消息流、scan()/stop()、results。
+    """
+
+    def __init__(self, processes: int = SHARD_PROCESSES, engine: str = "thread",
+                 verbosity: int = VERBOSITY_NORMAL, results_file: Optional[str] = None,
+                 max_results: Optional[int] = MAX_RESULTS, **engine_options):
+        super().__init__(verbosity=verbosity, results_file=results_file, max_results=max_results)
+        self.processes = max(1, processes)
+        self.engine = engine
+        self.engine_options = engine_options
+        self._stop_event = None
+        self._shard_metrics = {}  # 分片序号 -> 最近一次上报的指标快照
+
+    def metrics_snapshot(self) -> Dict:
+        """汇总各工作进程的指标快照(结果数等由主进程统计)"""
+        snapshot = merge_snapshots(list(self._shard_metrics.values()))
+        snapshot["gauges"] = super().metrics_snapshot()["gauges"]
+        return snapshot
+
+    def scan_targets(self, ips: TargetSpace, enable_full_port_scan: bool = False):
+        """启动工作进程扫描各分片，并汇总其消息"""
+        shards = ips.split(self.processes)
+        self.log(f"分片扫描: {len(shards)} 个工作进程, 引擎 {self.engine}")
+        units = [self.host_units(enable_full_port_scan) * len(shard) for shard in shards]
+        total_units = max(1, sum(units))
+
+        ctx = multiprocessing.get_context()
+        out_queue = ctx.Queue()
+        self._stop_event = ctx.Event()
+        if self.stop_flag:
+            self._stop_event.set()
+        options = dict(self.engine_options, verbosity=self.bus.verbosity)
+        # 全局速率由各工作进程均分
+        settings = self.export_settings()
+        if settings["rate_limit"]:
+            settings["rate_limit"] = settings["rate_limit"] / len(shards)
+        workers = [ctx.Process(target=run_shard, daemon=True,
+                               args=(i, shard.ranges, enable_full_port_scan, self.engine, options,
+                                     settings, out_queue, self._stop_event))
+                   for i, shard in enumerate(shards)]
+        for worker in workers:
+            worker.start()
+
+        shard_progress = [0] * len(shards)
+        self._shard_metrics = {}
+        running = set(range(len(shards)))
+        while running:
+            try:
+                index, (msg_type, msg_data, msg_level) = out_queue.get(timeout=STOP_POLL_INTERVAL)
+            except queue.Empty:
+                # 工作进程意外退出(未发送 done)时不再等待该分片
+                for i in list(running):
+                    if not workers[i].is_alive() and workers[i].exitcode not in (None, 0):
+                        self.log(f"分片 {i + 1} 工作进程异常退出(退出码 {workers[i].exitcode})", "error")
+                        running.discard(i)
+                continue
+            if msg_type == "log_batch":
+                for text, level in msg_data:
+                    self.bus.log(text, level)
+            elif msg_type == "log":
+                self.bus.log(msg_data, msg_level)
+            elif msg_type == "result":
+                self.add_results([msg_data])
+            elif msg_type == "progress":
+                shard_progress[index] = msg_data
+                value = min(99, int(sum(p * u for p, u in zip(shard_progress, units)) / total_units))
+                if value != self.progress:
+                    self.progress = value
+                    self.bus.progress(value)
+            elif msg_type == "metrics":
+                self._shard_metrics[index] = msg_data
+            elif msg_type == "done":
+                shard_progress[index] = 100
+                running.discard(index)
+
+        for worker in workers:
+            worker.join()
+        self._stop_event = None
+
+    def stop(self):
+        """停止扫描，通知所有工作进程"""
+        super().stop()
+        if self._stop_event is not None:
+            self._stop_event.set()
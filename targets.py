@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 扫描目标模块
+将目标描述解析为有序、去重的IPv4区间集合，按需逐个产出地址
+"""
+
+import ipaddress
+import re
+import socket
+from typing import List, Tuple, Iterator, Iterable, Optional
+
+
+def int_to_ip(value: int) -> str:
+    """整数转点分十进制IP"""
+    return socket.inet_ntoa(value.to_bytes(4, "big"))
+
+
+def merge_ranges(ranges: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """合并重叠或相邻的闭区间"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_ranges(ranges: List[Tuple[int, int]], excluded: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """从有序区间中扣除排除区间(两者均为合并后的有序区间)"""
+    result = []
+    i = 0
+    for start, end in ranges:
+        while i < len(excluded) and excluded[i][1] < start:
+            i += 1
+        j = i
+        current = start
+        while j < len(excluded) and excluded[j][0] <= end:
+            ex_start, ex_end = excluded[j]
+            if ex_start > current:
+                result.append((current, ex_start - 1))
+            current = max(current, ex_end + 1)
+            j += 1
+        if current <= end:
+            result.append((current, end))
+    return result
+
+
+def is_ipv4(text: str) -> bool:
+    try:
+        ipaddress.IPv4Address(text)
+    except ValueError:
+        return False
+    return True
+
+
+def parse_item(item: str, target_type: str = "auto") -> Tuple[int, int]:
+    """解析单个目标项为闭区间
+
+    支持: 单个IP/主机名、IP范围(1.1.1.1-1.1.1.9 或 1.1.1.1-9)、CIDR(1.1.1.0/24)
+    """
+    item = item.strip()
+    if "/" in item and target_type in ("auto", "cidr"):
+        network = ipaddress.IPv4Network(item, strict=False)
+        start, end = int(network.network_address), int(network.broadcast_address)
+        # 与 network.hosts() 一致，/31 及 /32 以外排除网络地址和广播地址
+        if network.prefixlen < 31:
+            start, end = start + 1, end - 1
+        return start, end
+    left, _, right = (part.strip() for part in item.partition("-"))
+    # 连字符左侧是IP时才是范围，其余带连字符的按主机名解析(如 my-host)
+    if "-" in item and (target_type == "range" or (target_type == "auto" and is_ipv4(left))):
+        start = int(ipaddress.IPv4Address(left))
+        if right.isdigit():
+            # 简写形式: 192.168.1.1-254
+            end = (start & 0xFFFFFF00) | int(right)
+            if int(right) > 255:
+                raise ValueError(f"无效的IP范围: {item}")
+        else:
+            end = int(ipaddress.IPv4Address(right))
+        if end < start:
+            raise ValueError(f"无效的IP范围: {item}")
+        return start, end
+    try:
+        value = int(ipaddress.IPv4Address(item))
+    except ipaddress.AddressValueError:
+        # 主机名在解析目标时一次性解析为IP
+        try:
+            value = int(ipaddress.IPv4Address(socket.gethostbyname(item)))
+        except (OSError, UnicodeError):
+            raise ValueError(f"无法解析的目标: {item}")
+    return value, value
+
+
+# 范围连字符两侧的空白(192.168.1.1 - 192.168.1.10)
+RANGE_SPACES = re.compile(r"\s*-\s*")
+
+
+def split_items(text: str) -> Iterator[str]:
+    """拆分逗号、空白分隔的目标描述，忽略 # 注释；连字符两侧的空白不作为分隔"""
+    for line in text.splitlines():
+        line = RANGE_SPACES.sub("-", line.split("#", 1)[0])
+        for item in line.replace(",", " ").split():
+            yield item
+
+
+class TargetSpace:
+    """扫描目标空间
+
+    内部只保存合并后的IPv4区间，迭代时按需产出整数地址，
+    内存占用与目标规模无关，/8 网段也不会生成千万级字符串列表。
+    """
+
+    def __init__(self, ranges: Iterable[Tuple[int, int]], excluded: Iterable[Tuple[int, int]] = ()):
+        self.ranges = subtract_ranges(merge_ranges(ranges), merge_ranges(excluded))
+
+    @classmethod
+    def parse(cls, target: str, target_type: str = "auto", exclude: str = "",
+              target_file: Optional[str] = None) -> "TargetSpace":
+        """解析目标描述，支持逗号分隔的多个目标、排除列表和目标文件
+
+        target_type 为 single/range/cidr 时只按该格式解析，
+        为 file 时 target 本身即目标文件路径。
+        """
+        if target_type == "file":
+            target_file, target, target_type = target, "", "auto"
+        if target_type == "single":
+            # 单个IP模式下也允许逗号分隔多个地址
+            target_type = "auto" if "," in target else "single"
+        ranges = [parse_item(item, target_type) for item in split_items(target)]
+        if target_file:
+            with open(target_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    ranges.extend(parse_item(item) for item in split_items(line))
+        excluded = [parse_item(item) for item in split_items(exclude or "")]
+        return cls(ranges, excluded)
+
+    def __len__(self) -> int:
+        return sum(end - start + 1 for start, end in self.ranges)
+
+    def __bool__(self) -> bool:
+        return bool(self.ranges)
+
+    def __iter__(self) -> Iterator[int]:
+        for start, end in self.ranges:
+            yield from range(start, end + 1)
+
+    def __contains__(self, value: int) -> bool:
+        return any(start <= value <= end for start, end in self.ranges)
+
+    def contains_ip(self, ip: str) -> bool:
+        """点分十进制IP是否在目标空间内"""
+        try:
+            return int(ipaddress.IPv4Address(ip)) in self
+        except ValueError:
+            return False
+
+    def hosts(self) -> Iterator[str]:
+        """按顺序产出点分十进制IP"""
+        for value in self:
+            yield int_to_ip(value)
+
+    def describe(self) -> str:
+        """以 起始-结束 形式描述目标区间"""
+        return ",".join(int_to_ip(s) if s == e else f"{int_to_ip(s)}-{int_to_ip(e)}" for s, e in self.ranges)
+
+    __str__ = describe
+
+    def split(self, parts: int) -> List["TargetSpace"]:
+        """按地址顺序切分为最多 parts 个大小相近的连续子空间"""
+        total = len(self)
+        parts = max(1, min(parts, total))
+        shards = []
+        ranges = list(self.ranges)
+        for i in range(parts):
+            # 前 total % parts 个分片多分一个地址
+            size = total // parts + (1 if i < total % parts else 0)
+            shard = []
+            while size > 0:
+                start, end = ranges[0]
+                take = min(size, end - start + 1)
+                shard.append((start, start + take - 1))
+                size -= take
+                if start + take > end:
+                    ranges.pop(0)
+                else:
+                    ranges[0] = (start + take, end)
+            shards.append(TargetSpace(shard))
+        return shards
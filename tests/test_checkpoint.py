@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""断点续扫测试：断点记录的写入、恢复、续写，中断时写了一半的末行和扫描器的续扫"""
+
+import os
+import tempfile
+import unittest
+
+from checkpoint import PHASE_SERVICES, PHASE_SWEEP, CheckpointWriter, job_signature, load_checkpoint
+from llm_scanner import LLMScanner
+
+JOB = job_signature("10.0.0.0/24", "auto", True)
+
+
+def finding(ip: str, port: int) -> dict:
+    return {"ip": ip, "port": port, "service": "vLLM", "url": f"http://{ip}:{port}/v1/models"}
+
+
+class CheckpointTestCase(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "scan_checkpoint.jsonl")
+
+
+class CheckpointTest(CheckpointTestCase):
+
+    def test_write_and_load(self):
+        writer = CheckpointWriter(self.path, JOB)
+        writer.mark_done("10.0.0.1", PHASE_SERVICES, [finding("10.0.0.1", 8000)])
+        writer.mark_done("10.0.0.1", PHASE_SWEEP, [])
+        writer.mark_done("10.0.0.2", PHASE_SERVICES, [])
+        writer.close()
+        state = load_checkpoint(self.path)
+        self.assertEqual(state.job, JOB)
+        self.assertTrue(state.is_done("10.0.0.1", PHASE_SWEEP))
+        self.assertFalse(state.is_done("10.0.0.2", PHASE_SWEEP))
+        self.assertEqual(state.hosts_done(), 2)
+        self.assertEqual(state.completed_results(), [finding("10.0.0.1", 8000)])
+        self.assertFalse(state.finished)
+
+    def test_buffered_records_are_flushed_on_close(self):
+        writer = CheckpointWriter(self.path, JOB)
+        writer.mark_done("10.0.0.1", PHASE_SERVICES, [])
+        # 未到落盘间隔时记录只在缓冲区中
+        self.assertFalse(load_checkpoint(self.path).is_done("10.0.0.1", PHASE_SERVICES))
+        writer.close()
+        self.assertTrue(load_checkpoint(self.path).is_done("10.0.0.1", PHASE_SERVICES))
+
+    def test_resume_appends(self):
+        writer = CheckpointWriter(self.path, JOB)
+        writer.mark_done("10.0.0.1", PHASE_SERVICES, [])
+        writer.close()
+        writer = CheckpointWriter(self.path, JOB, resume=True)
+        writer.mark_done("10.0.0.2", PHASE_SERVICES, [])
+        writer.finish()
+        writer.close()
+        state = load_checkpoint(self.path)
+        self.assertEqual(state.hosts_done(), 2)
+        self.assertTrue(state.finished)
+
+    def test_results_of_unfinished_phase_are_dropped(self):
+        writer = CheckpointWriter(self.path, JOB)
+        writer.mark_done("10.0.0.1", PHASE_SERVICES, [finding("10.0.0.1", 8000)])
+        writer.close()
+        # 模拟中断：结果已写入但阶段完成标记写了一半
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"result": {"ip": "10.0.0.2", "port": 8000}, "ip": "10.0.0.2", "phase": "services"}\n')
+            f.write('{"done": "10.0.0.2", "pha')
+        state = load_checkpoint(self.path)
+        self.assertFalse(state.is_done("10.0.0.2", PHASE_SERVICES))
+        self.assertEqual(state.completed_results(), [finding("10.0.0.1", 8000)])
+
+    def test_missing_or_foreign_file(self):
+        self.assertIsNone(load_checkpoint(self.path))
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write('{"done": "10.0.0.1", "phase": "services"}\n')
+        self.assertIsNone(load_checkpoint(self.path))
+
+
+class ScannerResumeTest(CheckpointTestCase):
+
+    def scanner(self, resume: bool) -> LLMScanner:
+        scanner = LLMScanner(checkpoint_file=self.path, resume=resume)
+        self.assertTrue(scanner.open_checkpoint("10.0.0.0/24", "auto", True))
+        return scanner
+
+    def test_resume_skips_done_phases(self):
+        scanner = self.scanner(False)
+        scanner.complete_phase("10.0.0.1", PHASE_SERVICES, [finding("10.0.0.1", 8000)])
+        scanner.complete_phase("10.0.0.1", PHASE_SWEEP, [])
+        scanner.complete_phase("10.0.0.2", PHASE_SERVICES, [])
+        # 被停止时阶段不记入断点
+        scanner.stop_flag = True
+        scanner.complete_phase("10.0.0.2", PHASE_SWEEP, [finding("10.0.0.2", 31000)])
+        scanner.close_checkpoint()
+
+        scanner = self.scanner(True)
+        self.assertTrue(scanner.host_done("10.0.0.1", True))
+        self.assertFalse(scanner.host_done("10.0.0.2", True))
+        self.assertTrue(scanner.host_done("10.0.0.2", False))
+        self.assertEqual(scanner.result_count, 1)
+        # 恢复的结果不计入命中历史
+        self.assertEqual(scanner.history.ports, {})
+        scanner.close_checkpoint()
+        self.assertTrue(load_checkpoint(self.path).finished)
+
+    def test_other_job_starts_over(self):
+        writer = CheckpointWriter(self.path, job_signature("10.0.1.0/24", "auto", True))
+        writer.mark_done("10.0.0.1", PHASE_SERVICES, [])
+        writer.close()
+        scanner = self.scanner(True)
+        self.assertFalse(scanner.phase_done("10.0.0.1", PHASE_SERVICES))
+        scanner.close_checkpoint()
+        self.assertEqual(load_checkpoint(self.path).job, job_signature("10.0.0.0/24", "auto", True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""多节点协同测试：监听地址与口令，只有完整扫描的单元才报告完成，未完成的单元交还后重新分配"""
+
+import unittest
+from unittest import mock
+
+from distributed import DONE, PENDING, Coordinator, is_loopback, parse_listen, run_unit
+from llm_scanner import LLMScanner
+from targets import TargetSpace
+
+
+class LocalClient:
+    """直接调用协调节点处理函数的客户端，记录请求路径"""
+
+    def __init__(self, coordinator: Coordinator):
+        self.coordinator = coordinator
+        self.paths = []
+
+    def call(self, path: str, payload: dict) -> dict:
+        self.paths.append(path)
+        return self.coordinator.handle(path, payload)
+
+
+class ListenTest(unittest.TestCase):
+
+    def test_parse_listen(self):
+        self.assertEqual(parse_listen(":8765"), ("127.0.0.1", 8765))
+        self.assertEqual(parse_listen("0.0.0.0:9000"), ("0.0.0.0", 9000))
+        self.assertEqual(parse_listen("[::1]:9000"), ("::1", 9000))
+        with self.assertRaises(ValueError):
+            parse_listen("localhost")
+
+    def test_is_loopback(self):
+        for host in ("127.0.0.1", "127.5.0.1", "::1", "localhost"):
+            self.assertTrue(is_loopback(host), host)
+        for host in ("0.0.0.0", "10.0.0.1", "::", "scanner.local"):
+            self.assertFalse(is_loopback(host), host)
+
+    def test_public_listen_requires_token(self):
+        self.assertEqual(Coordinator().listen, ("127.0.0.1", 8765))
+        with self.assertRaises(ValueError):
+            Coordinator("0.0.0.0:8765")
+        self.assertEqual(Coordinator("0.0.0.0:8765", token="secret").listen, ("0.0.0.0", 8765))
+
+
+class RunUnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.coordinator = Coordinator("127.0.0.1:0", unit_hosts=2)
+        self.coordinator.prepare_units(TargetSpace.parse("10.0.0.1-4"))
+        self.client = LocalClient(self.coordinator)
+
+    def run_unit(self, scan_targets, should_stop=None) -> bool:
+        lease = self.client.call("/lease", {"worker": "test"})
+        with mock.patch.object(LLMScanner, "scan_targets", scan_targets):
+            return run_unit(self.client, lease, "thread", {}, lambda text, level: None, should_stop)
+
+    def test_clean_run_completes(self):
+        self.assertTrue(self.run_unit(lambda scanner, ips, full: None))
+        self.assertEqual(self.client.paths[-1], "/complete")
+        self.assertEqual(self.coordinator.units[0].state, DONE)
+        self.assertEqual(self.coordinator._remaining, 1)
+
+    def test_failed_scan_releases_unit(self):
+        def fail(scanner, ips, full):
+            raise OSError("too many open files")
+
+        with self.assertRaises(RuntimeError):
+            self.run_unit(fail)
+        self.assertNotIn("/complete", self.client.paths)
+        self.assertEqual(self.client.paths[-1], "/release")
+        unit = self.coordinator.units[0]
+        self.assertEqual((unit.state, unit.lease), (PENDING, None))
+        self.assertEqual(self.coordinator._remaining, 2)
+        # 交还的单元优先重新分配
+        self.assertEqual(self.client.call("/lease", {"worker": "other"})["unit"], 0)
+
+    def test_stopped_scan_releases_unit(self):
+        def stopped(scanner, ips, full):
+            scanner.stop_flag = True
+
+        self.assertTrue(self.run_unit(stopped))
+        self.assertEqual(self.client.paths[-1], "/release")
+        self.assertEqual(self.coordinator.units[0].state, PENDING)
+
+    def test_worker_stop_releases_unit(self):
+        def wait_for_stop(scanner, ips, full):
+            while not scanner.stop_flag:
+                pass
+
+        self.assertFalse(self.run_unit(wait_for_stop, should_stop=lambda: True))
+        self.assertEqual(self.client.paths[-1], "/release")
+        self.assertEqual(self.coordinator.units[0].state, PENDING)
+
+    def test_release_with_lost_lease(self):
+        lease = self.client.call("/lease", {"worker": "test"})
+        self.coordinator.units[0].expires = 0
+        with self.coordinator._lock:
+            self.coordinator._expire_leases()
+        self.assertEqual(self.coordinator.handle("/release", {"unit": 0, "lease": lease["lease"]}), {"lost": True})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""指纹签名库测试：字典树正则、重叠关键字和规则组合"""
+
+import json
+import os
+import re
+import tempfile
+import unittest
+
+from fingerprints import DEFAULT_SIGNATURES, SignatureDB, load_signature_db, trie_regex
+
+SAMPLES = [
+    '{"models":[{"name":"qwen2.5:7b","digest":"845dbda0"}]}',
+    '{"object":"list","data":[{"id":"meta-llama/Llama-3.1-8B","object":"model","owned_by":"vllm"}]}',
+    '{"object":"list","data":[{"id":"gpt-4o","object":"model","owned_by":"litellm"}]}',
+    '<html><head><title>llama.cpp - chat</title></head><body>llamafile by Mozilla</body></html>',
+    '{"status":"healthy"}',
+    "Ollama is running",
+    "<h1>Welcome to nginx!</h1>",
+    "LM Studio local LLM server, models loaded: 0",
+    "",
+]
+
+
+def naive_match(text: str):
+    """不经过字典树正则的逐规则匹配，作为对照"""
+    lowered = text.lower()
+    db = SignatureDB(DEFAULT_SIGNATURES)
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    matches = {}
+    for sig_id, words, checks, confidence in db._rules:
+        if not all(word in lowered for word in words):
+            continue
+        if checks and (data is None or not all(check(data) for check in checks)):
+            continue
+        matches[sig_id] = max(confidence, matches.get(sig_id, 0.0))
+    return matches
+
+
+class TrieRegexTest(unittest.TestCase):
+
+    def test_matches_every_word(self):
+        words = ["model", "models", "mod", "llama", "llamafile", "ggml"]
+        pattern = re.compile(trie_regex(words))
+        for word in words:
+            self.assertTrue(pattern.fullmatch(word), word)
+        self.assertIsNone(pattern.fullmatch("mode"))
+        self.assertIsNone(pattern.fullmatch("llam"))
+
+    def test_prefers_longest_word_at_position(self):
+        pattern = re.compile(trie_regex(["model", "models", "mod"]))
+        self.assertEqual(pattern.match("models list").group(), "models")
+        self.assertEqual(pattern.match("modem").group(), "mod")
+
+    def test_escapes_metacharacters(self):
+        pattern = re.compile(trie_regex(['"data"', "llama.cpp"]))
+        self.assertTrue(pattern.fullmatch('"data"'))
+        self.assertTrue(pattern.fullmatch("llama.cpp"))
+        self.assertIsNone(pattern.fullmatch("llamaxcpp"))
+
+
+class SignatureDBTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = SignatureDB(DEFAULT_SIGNATURES)
+
+    def test_finds_overlapping_keywords(self):
+        # models 包含 model，litellm 包含 llm，同一位置只匹配最长的关键字
+        found = self.db.keywords_in("LiteLLM models")
+        self.assertTrue({"litellm", "llm", "models", "model"} <= found)
+
+    def test_keywords_are_case_insensitive(self):
+        self.assertIn("ollama", self.db.keywords_in("OLLAMA is running"))
+
+    def test_no_keywords(self):
+        self.assertEqual(self.db.keywords_in("<h1>Welcome to nginx!</h1>"), set())
+        self.assertEqual(SignatureDB([]).keywords_in("ollama"), set())
+
+    def test_matches_agree_with_naive_scan(self):
+        for text in SAMPLES:
+            self.assertEqual(self.db.match(text), naive_match(text), text)
+
+    def test_json_checks(self):
+        vllm = self.db.match('{"object":"list","data":[{"id":"m","object":"model","owned_by":"vllm"}]}')
+        self.assertEqual(vllm["vllm"], 0.95)
+        self.assertEqual(vllm["openai"], 0.9)
+        # 关键字相同但不是JSON时结构化规则不成立
+        self.assertEqual(self.db.match('owned_by vllm "data" "id" "object"')["vllm"], 0.9)
+        self.assertNotIn("openai", self.db.match("object list"))
+
+    def test_confidence_is_highest_matching_rule(self):
+        self.assertEqual(self.db.match("ollama models")["ollama"], 0.9)
+        self.assertEqual(self.db.match('{"models":[]}')["ollama"], 0.5)
+
+
+class LoadSignatureDBTest(unittest.TestCase):
+
+    def test_user_file_overrides_and_extends(self):
+        signatures = {"signatures": [
+            {"id": "ollama", "rules": [{"all": ["custom-ollama"], "confidence": 0.7}]},
+            {"id": "tgi", "rules": [{"all": ["text-generation-inference"], "confidence": 0.9}],
+             "service": {"name": "TGI", "ports": [8080], "paths": ["/info"]}},
+        ]}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "signatures.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(signatures, f)
+            db = load_signature_db(path)
+        self.assertNotIn("ollama", db.match("Ollama is running"))
+        self.assertEqual(db.match("custom-ollama")["ollama"], 0.7)
+        self.assertEqual(db.match("text-generation-inference")["tgi"], 0.9)
+        self.assertEqual([s["name"] for s in db.extra_services([])], ["TGI"])
+
+    def test_invalid_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "signatures.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump([{"id": "broken", "rules": []}], f)
+            with self.assertRaises(ValueError):
+                load_signature_db(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""轻量HTTP探测测试：chunked 分帧、响应解析和同一连接上的流水线响应"""
+
+import asyncio
+import socket
+import threading
+import time
+import unittest
+
+from http_probe import (AsyncProbeConnection, ProbeConnection, ProbeResponse, build_request, decode_chunked,
+                        parse_head, parse_http_response, scan_chunked)
+
+BODY = b'{"object":"list","data":[{"id":"m","owned_by":"vllm"}]}'
+
+
+def response(status: str = "200 OK", headers: str = "", body: bytes = BODY, length: bool = True,
+             version: str = "HTTP/1.1") -> bytes:
+    head = f"{version} {status}\r\nContent-Type: application/json\r\n{headers}"
+    if length:
+        head += f"Content-Length: {len(body)}\r\n"
+    return (head + "\r\n").encode("latin-1") + body
+
+
+def chunked(body: bytes, size: int = 10, trailer: bytes = b"") -> bytes:
+    parts = [b"%x\r\n%s\r\n" % (len(body[i:i + size]), body[i:i + size]) for i in range(0, len(body), size)]
+    return b"".join(parts) + b"0\r\n" + trailer + b"\r\n"
+
+
+class OneShotServer:
+    """接受一个连接，读取请求后写出预置的响应数据，close 为 True 时随后关闭连接"""
+
+    def __init__(self, payload: bytes, close: bool = False):
+        self.payload = payload
+        self.close = close
+        self.request = b""
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(1)
+        self.port = self.listener.getsockname()[1]
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        conn, _ = self.listener.accept()
+        with conn:
+            conn.settimeout(2)
+            while b"\r\n\r\n" not in self.request:
+                self.request += conn.recv(4096)
+            conn.sendall(self.payload)
+            if not self.close:
+                self.done.wait(5)
+
+    def stop(self):
+        self.done.set()
+        self.thread.join(5)
+        self.listener.close()
+
+
+class ChunkedTest(unittest.TestCase):
+
+    def test_complete_message(self):
+        data = chunked(BODY) + b"HTTP/1.1 200 OK"
+        body, end = scan_chunked(data)
+        self.assertEqual(body, BODY)
+        self.assertEqual(data[end:], b"HTTP/1.1 200 OK")
+
+    def test_extensions_and_trailers(self):
+        data = b"5;ext=1\r\nhello\r\n0\r\nX-Trailer: 1\r\n\r\nnext"
+        body, end = scan_chunked(data)
+        self.assertEqual(body, b"hello")
+        self.assertEqual(data[end:], b"next")
+
+    def test_incomplete_message(self):
+        data = chunked(BODY)
+        for cut in (3, 15, len(data) - 1):
+            body, end = scan_chunked(data[:cut])
+            self.assertEqual(end, -1, cut)
+            self.assertTrue(BODY.startswith(body), cut)
+
+    def test_malformed_size(self):
+        self.assertEqual(scan_chunked(b"zz\r\nhello\r\n"), (b"", -1))
+
+    def test_decode_chunked(self):
+        self.assertEqual(decode_chunked(chunked(BODY, 7)), BODY)
+
+
+class ParseTest(unittest.TestCase):
+
+    def test_parse_head(self):
+        version, status, headers = parse_head(b"HTTP/1.0 302 Found\r\nLocation: /x\r\nX-A:  b ")
+        self.assertEqual((version, status), (b"HTTP/1.0", 302))
+        self.assertEqual(headers, {b"location": b"/x", b"x-a": b"b"})
+        with self.assertRaises(ValueError):
+            parse_head(b"SSH-2.0-OpenSSH_9.6")
+
+    def test_parse_http_response(self):
+        self.assertEqual(parse_http_response(response(), 1024), (200, BODY.decode()))
+        self.assertEqual(parse_http_response(response(body=b"x" * 100), 10), (200, "x" * 10))
+        self.assertEqual(parse_http_response(b"HTTP/1.1 200 OK\r\nContent-Le", 1024), (0, ""))
+        self.assertEqual(parse_http_response(b"garbage\r\n\r\n", 1024), (0, ""))
+
+    def test_parse_chunked_and_charset(self):
+        raw = response(headers="Transfer-Encoding: chunked\r\n", body=chunked(BODY), length=False)
+        self.assertEqual(parse_http_response(raw, 1024), (200, BODY.decode()))
+        raw = (b"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=gbk\r\n\r\n"
+               + "模型".encode("gbk"))
+        self.assertEqual(parse_http_response(raw, 1024), (200, "模型"))
+
+    def test_needs_full_client(self):
+        self.assertTrue(ProbeResponse(302, {}).needs_full_client())
+        self.assertTrue(ProbeResponse(200, {b"content-encoding": b"gzip"}).needs_full_client())
+        self.assertFalse(ProbeResponse(200, {b"content-encoding": b"identity"}).needs_full_client())
+        self.assertFalse(ProbeResponse(404, {}).needs_full_client())
+
+    def test_build_request(self):
+        request = build_request("127.0.0.1:8000", "/v1/models", keep_alive=False)
+        self.assertTrue(request.startswith(b"GET /v1/models HTTP/1.1\r\nHost: 127.0.0.1:8000\r\n"))
+        self.assertIn(b"Connection: close\r\n", request)
+        self.assertTrue(request.endswith(b"\r\n\r\n"))
+
+
+class ProbeConnectionTest(unittest.TestCase):
+
+    def connect(self, payload: bytes, close: bool = False) -> ProbeConnection:
+        server = OneShotServer(payload, close)
+        self.addCleanup(server.stop)
+        connection = ProbeConnection("127.0.0.1", server.port, 2)
+        self.addCleanup(connection.close)
+        connection.send(build_request(f"127.0.0.1:{server.port}", "/"))
+        return connection
+
+    def read(self, connection: ProbeConnection, max_body: int = 1024, until=None) -> ProbeResponse:
+        return connection.read_response(max_body, time.monotonic() + 2, until)
+
+    def test_pipelined_responses(self):
+        payload = (response()
+                   + response(headers="Transfer-Encoding: chunked\r\n", body=chunked(BODY, 4), length=False)
+                   + response("404 Not Found", body=b"404 page not found")
+                   + response(headers="Connection: close\r\n", body=b"{}"))
+        connection = self.connect(payload)
+        for status, body in ((200, BODY), (200, BODY), (404, b"404 page not found")):
+            result = self.read(connection)
+            self.assertEqual((result.status, result.body), (status, body))
+            self.assertTrue(connection.reusable)
+        result = self.read(connection)
+        self.assertEqual(result.body, b"{}")
+        self.assertFalse(connection.reusable)
+        self.assertEqual(connection.bytes_read, len(payload))
+
+    def test_skips_interim_and_empty_responses(self):
+        payload = (b"HTTP/1.1 100 Continue\r\n\r\n" + response()
+                   + b"HTTP/1.1 204 No Content\r\n\r\n" + response(body=b"ok"))
+        connection = self.connect(payload)
+        self.assertEqual(self.read(connection).body, BODY)
+        self.assertEqual(self.read(connection).status, 204)
+        self.assertEqual(self.read(connection).body, b"ok")
+        self.assertTrue(connection.reusable)
+
+    def test_http10_without_keep_alive(self):
+        connection = self.connect(response(version="HTTP/1.0"), close=True)
+        self.assertEqual(self.read(connection).body, BODY)
+        self.assertFalse(connection.reusable)
+
+    def test_body_over_limit(self):
+        connection = self.connect(response(body=b"x" * 5000) + response())
+        result = self.read(connection, max_body=100)
+        self.assertEqual(result.body, b"x" * 100)
+        self.assertFalse(connection.reusable)
+
+    def test_chunked_body_over_limit(self):
+        # 整个消息已在缓冲区中时照常分帧，连接仍可复用
+        head = "Transfer-Encoding: chunked\r\n"
+        connection = self.connect(response(headers=head, body=chunked(b"x" * 5000, 1000), length=False)
+                                  + response())
+        self.assertEqual(self.read(connection, max_body=100).body, b"x" * 100)
+        self.assertTrue(connection.reusable)
+        self.assertEqual(self.read(connection).body, BODY)
+
+    def test_unfinished_chunked_body_over_limit(self):
+        # 消息未结束但已读到上限时停止读取，连接不能再复用
+        connection = self.connect(response(headers="Transfer-Encoding: chunked\r\n", body=b"1388\r\n" + b"x" * 5000,
+                                           length=False))
+        self.assertEqual(self.read(connection, max_body=100).body, b"x" * 100)
+        self.assertFalse(connection.reusable)
+
+    def test_body_until_close(self):
+        connection = self.connect(response(length=False), close=True)
+        self.assertEqual(self.read(connection).body, BODY)
+        self.assertFalse(connection.reusable)
+
+    def test_until_stops_unbounded_body(self):
+        # 未声明长度且连接不关闭时，until 命中即停止读取，不必等到超时
+        connection = self.connect(response(length=False))
+        started = time.monotonic()
+        result = self.read(connection, until=lambda text: "vllm" in text)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(result.body, BODY)
+
+    def test_closed_before_response(self):
+        connection = self.connect(b"", close=True)
+        with self.assertRaises(ConnectionError):
+            self.read(connection)
+
+    def test_invalid_status_line(self):
+        connection = self.connect(b"SSH-2.0-OpenSSH_9.6\r\n\r\n")
+        with self.assertRaises(ValueError):
+            self.read(connection)
+
+
+class AsyncProbeConnectionTest(unittest.TestCase):
+
+    def exchange(self, payload: bytes, reads: int, close: bool = False, max_body: int = 1024, timeout: float = 2):
+        """发送一个请求并读取 reads 个响应，返回 (响应列表, 连接)"""
+        server = OneShotServer(payload, close)
+        self.addCleanup(server.stop)
+
+        async def run():
+            connection = await AsyncProbeConnection.open("127.0.0.1", server.port, 2)
+            try:
+                await connection.send(build_request(f"127.0.0.1:{server.port}", "/"))
+                results = [await connection.read_response(max_body, time.monotonic() + timeout)
+                           for _ in range(reads)]
+            finally:
+                connection.close()
+            return results, connection
+
+        return asyncio.run(run())
+
+    def test_pipelined_responses(self):
+        payload = (response()
+                   + response(headers="Transfer-Encoding: chunked\r\n", body=chunked(BODY, 4), length=False)
+                   + b"HTTP/1.1 100 Continue\r\n\r\n" + response("404 Not Found", body=b"nope"))
+        results, connection = self.exchange(payload, 3)
+        self.assertEqual([(r.status, r.body) for r in results], [(200, BODY), (200, BODY), (404, b"nope")])
+        self.assertTrue(connection.reusable)
+        self.assertEqual(connection.bytes_read, len(payload))
+
+    def test_body_until_close(self):
+        results, connection = self.exchange(response(length=False), 1, close=True)
+        self.assertEqual(results[0].body, BODY)
+        self.assertFalse(connection.reusable)
+
+    def test_read_timeout(self):
+        with self.assertRaises(asyncio.TimeoutError):
+            self.exchange(response(length=False), 1, timeout=0.2)
+
+    def test_closed_before_response(self):
+        with self.assertRaises(ConnectionError):
+            self.exchange(b"", 1, close=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
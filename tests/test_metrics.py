@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""指标端点测试：默认只监听本机，非本机地址必须设置口令"""
+
+import json
+import unittest
+import urllib.error
+import urllib.request
+
+from metrics import MetricsServer
+
+
+def snapshot() -> dict:
+    return {"counters": {}, "histograms": {}, "gauges": {"results": 3}}
+
+
+class MetricsServerTest(unittest.TestCase):
+
+    def start(self, token=None) -> str:
+        server = MetricsServer(":0", snapshot, token)
+        server.start()
+        self.addCleanup(server.stop)
+        host, port = server._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def get(self, url: str, token=None) -> bytes:
+        request = urllib.request.Request(url)
+        if token:
+            request.add_header("Authorization", f"Bearer {token}")
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.read()
+
+    def test_defaults_to_loopback(self):
+        self.assertEqual(MetricsServer(":9100", snapshot).listen, ("127.0.0.1", 9100))
+        base = self.start()
+        self.assertTrue(base.startswith("http://127.0.0.1:"))
+        self.assertEqual(json.loads(self.get(base + "/stats"))["gauges"]["results"], 3)
+
+    def test_public_listen_requires_token(self):
+        with self.assertRaises(ValueError):
+            MetricsServer("0.0.0.0:9100", snapshot)
+        self.assertEqual(MetricsServer("0.0.0.0:9100", snapshot, "secret").listen, ("0.0.0.0", 9100))
+
+    def test_token_is_checked(self):
+        base = self.start("secret")
+        for token in (None, "wrong"):
+            with self.assertRaises(urllib.error.HTTPError) as caught:
+                self.get(base + "/stats", token)
+            self.assertEqual(caught.exception.code, 401)
+        self.assertEqual(json.loads(self.get(base + "/stats", "secret"))["gauges"]["results"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
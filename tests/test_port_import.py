@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""端口导入测试：格式识别、masscan/nmap/列表解析、去重、排除和按主机分组"""
+
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from port_import import (PortImport, detect_format, parse_masscan_json, parse_masscan_list, parse_nmap_grep,
+                         parse_nmap_xml, parse_port_list)
+
+MASSCAN_JSON = b"""[
+{   "ip": "10.0.0.1",   "timestamp": "1700000000", "ports": [ {"port": 8000, "proto": "tcp", "status": "open"} ] },
+{   "ip": "10.0.0.1",   "ports": [ {"port": 53, "proto": "udp", "status": "open"} ] },
+{   "ip": "10.0.0.2",   "ports": [ {"port": 11434, "proto": "tcp", "service": {"name": "http"}} ] }
+]
+"""
+
+MASSCAN_LIST = b"""#masscan
+open tcp 8000 10.0.0.1 1700000000
+open tcp 70000 10.0.0.1 1700000000
+open udp 53 10.0.0.1 1700000000
+# end
+"""
+
+NMAP_GREP = (b"# Nmap 7.94 scan initiated\n"
+             b"Host: 10.0.0.1 ()\tStatus: Up\n"
+             b"Host: 10.0.0.1 ()\tPorts: 22/closed/tcp//ssh///, 8000/open/tcp//http-alt///, "
+             b"53/open/udp//domain///\tIgnored State: filtered (997)\n")
+
+NMAP_XML = b"""<?xml version="1.0"?>
+<nmaprun>
+<host><address addr="10.0.0.1" addrtype="ipv4"/><ports>
+<port protocol="tcp" portid="8000"><state state="open"/></port>
+<port protocol="tcp" portid="22"><state state="closed"/></port>
+</ports></host>
+<host><address addr="10.0.0.2" addrtype="ipv4"/><ports>
+<port protocol="tcp" portid="11434"><state state="open"/></port>
+"""
+
+
+class ParseTest(unittest.TestCase):
+
+    def test_detect_format(self):
+        self.assertEqual(detect_format(b"\xef\xbb\xbf<?xml"), "nmap-xml")
+        self.assertEqual(detect_format(MASSCAN_JSON), "masscan-json")
+        self.assertEqual(detect_format(b"open tcp 80 10.0.0.1 1700000000"), "masscan-list")
+        self.assertEqual(detect_format(NMAP_GREP), "nmap-grep")
+        self.assertEqual(detect_format(b"10.0.0.1:8000\n"), "list")
+
+    def test_masscan_json(self):
+        records = list(parse_masscan_json(io.BytesIO(MASSCAN_JSON)))
+        self.assertEqual(records, [("10.0.0.1", 8000), ("10.0.0.2", 11434)])
+
+    def test_masscan_list(self):
+        self.assertEqual(list(parse_masscan_list(io.BytesIO(MASSCAN_LIST))), [("10.0.0.1", 8000)])
+
+    def test_nmap_grep(self):
+        self.assertEqual(list(parse_nmap_grep(io.BytesIO(NMAP_GREP))), [("10.0.0.1", 8000)])
+
+    def test_truncated_nmap_xml(self):
+        # nmap 被中断时XML不完整，已结束的主机照常产出
+        self.assertEqual(list(parse_nmap_xml(io.BytesIO(NMAP_XML))), [("10.0.0.1", 8000)])
+
+    def test_port_list(self):
+        data = b"10.0.0.1:8000, 10.0.0.2:11434\n10.0.0.3 8080 # comment\nbad:port\n10.0.0.4:0\n"
+        self.assertEqual(list(parse_port_list(io.BytesIO(data))),
+                         [("10.0.0.1", 8000), ("10.0.0.2", 11434), ("10.0.0.3", 8080)])
+
+
+class PortImportTest(unittest.TestCase):
+
+    def write(self, data: bytes) -> str:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "ports.txt")
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_dedup_and_exclude(self):
+        path = self.write(b"10.0.0.1:8000\n10.0.0.1:8000\n10.0.0.2:8000\n10.0.0.1:11434\n")
+        source = PortImport(path, exclude="10.0.0.2")
+        self.assertEqual(list(source.iter_records()), [("10.0.0.1", 8000), ("10.0.0.1", 11434)])
+        self.assertEqual(source.records, 2)
+
+    def test_hosts_groups_consecutive_ports(self):
+        path = self.write(b"10.0.0.1:8000\n10.0.0.1:8080\n10.0.0.2:8000\n10.0.0.1:11434\n")
+        groups = list(PortImport(path).hosts())
+        self.assertEqual(groups, [("10.0.0.1", [8000, 8080]), ("10.0.0.2", [8000]), ("10.0.0.1", [11434])])
+
+    def test_group_size_limit(self):
+        path = self.write(b"".join(b"10.0.0.1:%d\n" % port for port in range(1, 8)))
+        with mock.patch("port_import.MAX_GROUP_PORTS", 3):
+            groups = list(PortImport(path).hosts())
+        self.assertEqual([len(ports) for _, ports in groups], [3, 3, 1])
+
+    def test_format_detected_from_file(self):
+        self.assertEqual(PortImport(self.write(NMAP_GREP)).format, "nmap-grep")
+        self.assertEqual(PortImport(self.write(NMAP_GREP), "list").format, "list")
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            PortImport(self.write(b""), "zmap")
+        with self.assertRaises(OSError):
+            PortImport("/nonexistent/ports.txt")
+
+
+if __name__ == "__main__":
+    unittest.main()
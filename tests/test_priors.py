@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""探测排序测试：命中历史的累计、保存和排序，缓存结果不计入历史"""
+
+import os
+import tempfile
+import unittest
+
+from checkpoint import PHASE_SWEEP
+from llm_scanner import LLMScanner
+from priors import DEFAULT_PRIOR, HitHistory
+
+IP = "10.0.0.5"
+
+
+def finding(port: int = 31000, path: str = "/v1/models") -> dict:
+    return {"ip": IP, "port": port, "service": "vLLM", "url": f"http://{IP}:{port}{path}", "response": "{}"}
+
+
+class HitHistoryTest(unittest.TestCase):
+
+    def test_record_and_scores(self):
+        history = HitHistory()
+        base = history.port_score(31000)
+        history.record(finding())
+        history.record(finding())
+        self.assertEqual(history.port_score(31000), base + 2)
+        self.assertEqual(history.probe_score(31000, "/v1/models"), DEFAULT_PRIOR + 2)
+        self.assertEqual(history.hosts, {IP: 2})
+
+    def test_order_and_hot_ports(self):
+        history = HitHistory()
+        history.record(finding(45000))
+        ordered = history.order_ports([45001, 45000, 45002])
+        self.assertEqual(ordered, [45000, 45001, 45002])
+        self.assertEqual(history.hot_ports(ordered), 1)
+        plan = [{"port": 45001, "path": "/"}, {"port": 45000, "path": "/v1/models"}]
+        self.assertEqual([p["port"] for p in history.order_probes(plan)], [45000, 45001])
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "history.json")
+            history = HitHistory(path)
+            history.record(finding())
+            history.save()
+            loaded = HitHistory(path)
+            loaded.load()
+        self.assertEqual(loaded.scans, 1)
+        self.assertEqual(loaded.ports, {"31000": 1})
+        self.assertEqual(loaded.probes, {"31000 /v1/models": 1})
+
+    def test_invalid_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "history.json")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("[]")
+            with self.assertRaises(ValueError):
+                HitHistory(path).load()
+
+
+class CachedResultsTest(unittest.TestCase):
+    """增量复扫沿用的缓存结果本次没有探测，不应让命中计数逐次增长"""
+
+    def test_cached_results_not_recorded(self):
+        scanner = LLMScanner()
+        scanner.complete_phase(IP, PHASE_SWEEP, [finding()], verified=False)
+        self.assertEqual(scanner.history.ports, {})
+        self.assertEqual(scanner.result_count, 1)
+        scanner.complete_phase(IP, PHASE_SWEEP, [finding()])
+        self.assertEqual(scanner.history.ports, {"31000": 1})
+
+    def test_restored_results_not_recorded(self):
+        scanner = LLMScanner()
+        scanner.add_results([finding()], spill=False)
+        self.assertEqual(scanner.history.ports, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""速率限制测试：令牌桶预占、单主机限速、超时比例突增时降速和恢复后提速"""
+
+import unittest
+from unittest import mock
+
+from connect_scan import OPEN, TIMEOUT
+from rate_limit import (ADAPT_WINDOW, BACKOFF_FACTOR, EVENT_BACKOFF, EVENT_RECOVERED, MIN_RATE, RateLimiter,
+                        TokenBucket)
+
+IP = "10.0.0.5"
+
+
+class FakeClock:
+    """可手动推进的 time.monotonic"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class ClockTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("rate_limit.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TokenBucketTest(ClockTestCase):
+
+    def test_burst_then_queue(self):
+        bucket = TokenBucket(100)
+        for _ in range(10):
+            self.assertEqual(bucket.reserve(), 0.0)
+        # 突发用完后依次排队，每个令牌间隔 1/rate 秒
+        self.assertAlmostEqual(bucket.reserve(), 0.01)
+        self.assertAlmostEqual(bucket.reserve(), 0.02)
+        self.clock.now += 1
+        self.assertEqual(bucket.reserve(), 0.0)
+
+    def test_set_rate_forgives_debt(self):
+        bucket = TokenBucket(10)
+        for _ in range(10):
+            bucket.reserve()
+        self.assertAlmostEqual(bucket.reserve(), 1.0)
+        # 提速后旧速率下的欠额作废，只需按新速率等待一个令牌
+        bucket.set_rate(1000)
+        self.assertAlmostEqual(bucket.reserve(), 0.001)
+
+
+class RateLimiterTest(ClockTestCase):
+
+    def window(self, limiter: RateLimiter, timeouts: int):
+        """登记一个统计窗口的连接结果，返回最后一次 record 的事件"""
+        event = None
+        for i in range(ADAPT_WINDOW):
+            event = limiter.record(IP, TIMEOUT if i < timeouts else OPEN)
+        return event
+
+    def test_unlimited_by_default(self):
+        limiter = RateLimiter(adaptive=False)
+        self.assertIsNone(limiter.rate)
+        self.assertEqual(max(limiter.reserve(IP) for _ in range(1000)), 0.0)
+
+    def test_per_host_rate(self):
+        limiter = RateLimiter(per_host_rate=10, adaptive=False)
+        self.assertEqual(limiter.reserve(IP), 0.0)
+        self.assertAlmostEqual(limiter.reserve(IP), 0.1)
+        self.assertEqual(limiter.reserve("10.0.0.6"), 0.0)
+        limiter.release_host(IP)
+        self.assertEqual(limiter.reserve(IP), 0.0)
+
+    def test_backoff_on_timeout_spike(self):
+        limiter = RateLimiter(rate=1000)
+        self.assertIsNone(self.window(limiter, 0))
+        event, ratio, rate = self.window(limiter, ADAPT_WINDOW // 2)
+        self.assertEqual((event, ratio), (EVENT_BACKOFF, 0.5))
+        self.assertEqual(rate, 1000 * BACKOFF_FACTOR)
+        self.assertEqual(limiter.rate, rate)
+        self.assertEqual(limiter.backoffs, 1)
+
+    def test_filtered_host_is_not_a_spike(self):
+        # 一开始就大量超时的主机(整体被防火墙过滤)成为基线，不会降速
+        limiter = RateLimiter(rate=1000)
+        self.assertIsNone(self.window(limiter, ADAPT_WINDOW))
+        self.assertIsNone(self.window(limiter, ADAPT_WINDOW))
+        self.assertEqual(limiter.rate, 1000)
+
+    def test_recovers_to_ceiling(self):
+        limiter = RateLimiter(rate=1000)
+        self.window(limiter, 0)
+        self.window(limiter, ADAPT_WINDOW // 2)
+        events = [self.window(limiter, 0) for _ in range(5)]
+        self.assertEqual(events[-1], None)
+        self.assertEqual(limiter.rate, 1000)
+        self.assertIn((EVENT_RECOVERED, 0.0, 1000), events)
+
+    def test_adaptive_limit_without_ceiling(self):
+        limiter = RateLimiter()
+        self.window(limiter, 0)
+        event, _, rate = self.window(limiter, ADAPT_WINDOW // 2)
+        self.assertEqual(event, EVENT_BACKOFF)
+        self.assertEqual(rate, MIN_RATE)
+        events = [self.window(limiter, 0) for _ in range(10)]
+        # 恢复到观测峰值的两倍后解除限速
+        self.assertIn((EVENT_RECOVERED, 0.0, None), events)
+        self.assertIsNone(limiter.rate)
+
+
+if __name__ == "__main__":
+    unittest.main()
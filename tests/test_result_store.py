@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""结果库测试：变化对比、指纹、有效期内的增量复用和下线主机"""
+
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from checkpoint import PHASE_SERVICES, PHASE_SWEEP
+from llm_scanner import LLMScanner
+from result_store import CHANGE_CHANGED, CHANGE_GONE, CHANGE_NEW, ResultStore, fingerprint
+
+IP = "10.0.0.5"
+
+
+def models_body(*ids: str, created: int = 1700000000) -> str:
+    return json.dumps({"object": "list", "data": [{"id": i, "object": "model", "created": created,
+                                                   "owned_by": "vllm"} for i in ids]})
+
+
+def finding(port: int = 31000, service: str = "vLLM", body: str = None) -> dict:
+    return {"ip": IP, "port": port, "service": service, "status": "Vulnerable",
+            "url": f"http://{IP}:{port}/v1/models", "response": body or models_body("m1")}
+
+
+class StoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "results.db")
+        self.store = ResultStore(self.path)
+        self.addCleanup(self.store.close)
+
+
+class FingerprintTest(unittest.TestCase):
+
+    def test_ignores_per_request_fields(self):
+        self.assertEqual(fingerprint(finding(body=models_body("m1", created=1))),
+                         fingerprint(finding(body=models_body("m1", created=2))))
+
+    def test_model_list_and_port_matter(self):
+        base = fingerprint(finding())
+        self.assertNotEqual(base, fingerprint(finding(body=models_body("m1", "m2"))))
+        self.assertNotEqual(base, fingerprint(finding(port=8000)))
+
+    def test_truncated_body(self):
+        body = models_body("m1", "m2")
+        self.assertEqual(fingerprint(finding(body=body[:-3])), fingerprint(finding(body=body)))
+
+
+class ResultStoreTest(StoreTestCase):
+
+    def test_changes(self):
+        changes = self.store.record_phase(IP, PHASE_SWEEP, [finding()], [31000])
+        self.assertEqual([c["change"] for c in changes], [CHANGE_NEW])
+        self.assertEqual(self.store.record_phase(IP, PHASE_SWEEP, [finding(body=models_body("m1", created=5))],
+                                                 [31000]), [])
+        changes = self.store.record_phase(IP, PHASE_SWEEP, [finding(body=models_body("m2"))], [31000])
+        self.assertEqual([c["change"] for c in changes], [CHANGE_CHANGED])
+        changes = self.store.record_phase(IP, PHASE_SWEEP, [], [])
+        self.assertEqual([(c["change"], c["port"]) for c in changes], [(CHANGE_GONE, 31000)])
+
+    def test_fresh_phases_ttl(self):
+        self.store.record_phase(IP, PHASE_SWEEP, [finding()], [31000])
+        fresh = self.store.fresh_phases(IP, 3600)
+        self.assertEqual(fresh[PHASE_SWEEP]["ports"], [31000])
+        self.assertEqual(fresh[PHASE_SWEEP]["results"][0]["port"], 31000)
+        with mock.patch("result_store.time.time", return_value=time.time() + 7200):
+            self.assertEqual(self.store.fresh_phases(IP, 3600), {})
+
+    def test_cached_reuse_keeps_verified_time(self):
+        with mock.patch("result_store.time.time", return_value=time.time() - 3000):
+            self.store.record_phase(IP, PHASE_SWEEP, [finding()], [31000])
+        self.store.record_phase(IP, PHASE_SWEEP, [finding()], [31000], verified=False)
+        # 沿用缓存不刷新验证时间，一小时的有效期从首次验证算起
+        with mock.patch("result_store.time.time", return_value=time.time() + 1000):
+            self.assertEqual(self.store.fresh_phases(IP, 3600), {})
+
+    def test_mark_down(self):
+        self.store.record_phase(IP, PHASE_SERVICES, [finding(8000)], [8000])
+        self.store.record_phase(IP, PHASE_SWEEP, [finding()], [31000])
+        changes = self.store.mark_down(IP)
+        self.assertEqual(sorted((c["change"], c["port"]) for c in changes),
+                         [(CHANGE_GONE, 8000), (CHANGE_GONE, 31000)])
+        self.assertEqual(self.store.fresh_phases(IP, 3600), {})
+        self.assertEqual(self.store.mark_down(IP), [])
+
+
+class DownHostTest(StoreTestCase):
+    """有记录的主机未响应存活探测，随后在有效期内重新上线"""
+
+    def scanner(self) -> LLMScanner:
+        scanner = LLMScanner(store_file=self.path, incremental_ttl=3600)
+        self.assertTrue(scanner.open_store())
+        self.addCleanup(scanner.close_store)
+        return scanner
+
+    def scan(self, scanner: LLMScanner, sweep_results):
+        scanner._phase_ports[(IP, PHASE_SERVICES)] = []
+        scanner.complete_phase(IP, PHASE_SERVICES, [])
+        scanner._phase_ports[(IP, PHASE_SWEEP)] = [r["port"] for r in sweep_results]
+        scanner.complete_phase(IP, PHASE_SWEEP, sweep_results)
+
+    def test_host_down_then_back(self):
+        self.scan(self.scanner(), [finding()])
+
+        scanner = self.scanner()
+        with mock.patch("llm_scanner.discover_hosts", return_value=iter(())):
+            self.assertEqual(list(scanner.discover_live([(0, IP)], True)), [])
+        self.assertEqual([(c["change"], c["port"]) for c in scanner.changes], [(CHANGE_GONE, 31000)])
+
+        # 重新上线：缓存已作废，不能以空结果复用，必须完整扫描并再次报告为新增
+        scanner = self.scanner()
+        cached = scanner.cached_phases(IP)
+        self.assertEqual(scanner.reusable_phases(IP, cached, {31000}), {})
+        self.scan(scanner, [finding()])
+        self.assertEqual([(c["change"], c["port"]) for c in scanner.changes], [(CHANGE_NEW, 31000)])
+
+    def test_unknown_host_down(self):
+        scanner = self.scanner()
+        with mock.patch("llm_scanner.discover_hosts", return_value=iter(())):
+            list(scanner.discover_live([(0, IP)], True))
+        self.assertEqual(scanner.changes, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""扫描目标解析测试：IP范围、CIDR、主机名和排除列表"""
+
+import socket
+import unittest
+from unittest import mock
+
+from targets import TargetSpace, parse_item
+
+HOSTS = {"my-host": "10.0.0.7", "ip6-localhost": "127.0.0.1", "db": "10.0.0.8"}
+
+
+def fake_gethostbyname(name: str) -> str:
+    try:
+        return HOSTS[name]
+    except KeyError:
+        raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+
+
+def ip(text: str) -> int:
+    return int.from_bytes(socket.inet_aton(text), "big")
+
+
+class ParseItemTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch("targets.socket.gethostbyname", side_effect=fake_gethostbyname)
+        self.resolve = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_single_ip(self):
+        self.assertEqual(parse_item(" 192.168.1.5 "), (ip("192.168.1.5"), ip("192.168.1.5")))
+
+    def test_full_range(self):
+        self.assertEqual(parse_item("10.0.0.250-10.0.1.2"), (ip("10.0.0.250"), ip("10.0.1.2")))
+
+    def test_short_range(self):
+        self.assertEqual(parse_item("192.168.1.10-20"), (ip("192.168.1.10"), ip("192.168.1.20")))
+        self.assertEqual(parse_item("192.168.1.10 - 20"), (ip("192.168.1.10"), ip("192.168.1.20")))
+
+    def test_invalid_ranges(self):
+        for item in ("192.168.1.10-5", "192.168.1.1-256", "10.0.0.9-10.0.0.1"):
+            with self.assertRaises(ValueError, msg=item):
+                parse_item(item)
+
+    def test_cidr_excludes_network_and_broadcast(self):
+        self.assertEqual(parse_item("10.1.2.0/24"), (ip("10.1.2.1"), ip("10.1.2.254")))
+        self.assertEqual(parse_item("10.1.2.3/24"), (ip("10.1.2.1"), ip("10.1.2.254")))
+        self.assertEqual(parse_item("10.1.2.0/31"), (ip("10.1.2.0"), ip("10.1.2.1")))
+        self.assertEqual(parse_item("10.1.2.3/32"), (ip("10.1.2.3"), ip("10.1.2.3")))
+
+    def test_hostname(self):
+        self.assertEqual(parse_item("db"), (ip("10.0.0.8"), ip("10.0.0.8")))
+
+    def test_hyphenated_hostname_is_resolved(self):
+        self.assertEqual(parse_item("my-host"), (ip("10.0.0.7"), ip("10.0.0.7")))
+        self.resolve.assert_called_once_with("my-host")
+
+    def test_ip6_localhost_is_not_a_range(self):
+        self.assertEqual(parse_item("ip6-localhost"), (ip("127.0.0.1"), ip("127.0.0.1")))
+
+    def test_unresolvable(self):
+        with self.assertRaises(ValueError):
+            parse_item("no-such-host")
+
+    def test_explicit_type(self):
+        with self.assertRaises(ValueError):
+            parse_item("10.0.0.0/24", "single")
+        with self.assertRaises(ValueError):
+            parse_item("my-host", "range")
+        self.assertEqual(parse_item("my-host", "single"), (ip("10.0.0.7"), ip("10.0.0.7")))
+
+
+class TargetSpaceTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch("targets.socket.gethostbyname", side_effect=fake_gethostbyname)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_mixed_list_with_hyphenated_hostname(self):
+        space = TargetSpace.parse("10.0.0.1,my-host 10.0.0.2-3")
+        self.assertEqual(list(space.hosts()), ["10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.7"])
+
+    def test_range_with_spaces_around_hyphen(self):
+        for target_type in ("range", "auto"):
+            space = TargetSpace.parse("192.168.1.1 - 192.168.1.10", target_type)
+            self.assertEqual(len(space), 10, target_type)
+        space = TargetSpace.parse("10.0.0.1 -3, my-host")
+        self.assertEqual(list(space.hosts()), ["10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.7"])
+
+    def test_merges_overlaps(self):
+        space = TargetSpace.parse("10.0.0.1-10, 10.0.0.5-20, 10.0.0.21")
+        self.assertEqual(space.ranges, [(ip("10.0.0.1"), ip("10.0.0.21"))])
+        self.assertEqual(len(space), 21)
+
+    def test_exclude(self):
+        space = TargetSpace.parse("10.0.0.0/29", exclude="10.0.0.3, 10.0.0.5-6, my-host")
+        self.assertEqual(list(space.hosts()), ["10.0.0.1", "10.0.0.2", "10.0.0.4"])
+        self.assertTrue(space.contains_ip("10.0.0.4"))
+        self.assertFalse(space.contains_ip("10.0.0.5"))
+        self.assertFalse(space.contains_ip("not-an-ip"))
+
+    def test_comments_and_single_type_with_commas(self):
+        space = TargetSpace.parse("10.0.0.1, 10.0.0.9 # 注释", "single")
+        self.assertEqual(space.describe(), "10.0.0.1,10.0.0.9")
+
+    def test_large_network_is_lazy(self):
+        space = TargetSpace.parse("10.0.0.0/8")
+        self.assertEqual(len(space), (1 << 24) - 2)
+        self.assertEqual(next(space.hosts()), "10.0.0.1")
+
+    def test_split_keeps_order_and_size(self):
+        space = TargetSpace.parse("10.0.0.1-10,10.0.1.1-5")
+        shards = space.split(4)
+        self.assertEqual([len(shard) for shard in shards], [4, 4, 4, 3])
+        self.assertEqual([h for shard in shards for h in shard.hosts()], list(space.hosts()))
+
+
+if __name__ == "__main__":
+    unittest.main()
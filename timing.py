@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Scanner V1.0 - 自适应超时模块
+根据每台主机实测的TCP握手RTT推导连接超时和HTTP超时
+"""
+
+import threading
+
+# ============ 配置 ============
+
+# 尚无RTT样本时的超时(跨网段链路上0.2秒的连接超时会漏掉真实服务)
+INITIAL_CONNECT_TIMEOUT = 1.0
+INITIAL_HTTP_TIMEOUT = 3.0
+
+# 连接超时 = max(srtt * CONNECT_RTT_FACTOR, srtt + 4 * rttvar)，并限制在上下限内
+CONNECT_RTT_FACTOR = 3
+MIN_CONNECT_TIMEOUT = 0.05
+MAX_CONNECT_TIMEOUT = 3.0
+
+# HTTP超时 = HTTP_PROCESSING_TIME + srtt * HTTP_RTT_FACTOR，不超过上限
+# RTT只反映传输耗时，服务端生成响应(如查询模型列表)的时间与RTT无关，需单独留出余量
+HTTP_PROCESSING_TIME = 2.0
+HTTP_RTT_FACTOR = 20
+MAX_HTTP_TIMEOUT = 10.0
+
+# 平滑系数(RFC 6298)
+RTT_ALPHA = 0.125
+RTT_BETA = 0.25
+
+
+def clamp(value: float, low: float, high: float) -> float:
+    return max(low, min(high, value))
+
+
+class HostTiming:
+    """单台主机的RTT估计与超时推导
+
+    握手成功和被拒绝(RST)的连接都提供一次往返样本，
+    按 RFC 6298 维护平滑RTT(srtt)和RTT偏差(rttvar)。
+    """
+
+    def __init__(self, initial_connect_timeout: float = INITIAL_CONNECT_TIMEOUT,
+                 initial_http_timeout: float = INITIAL_HTTP_TIMEOUT):
+        self.initial_connect_timeout = initial_connect_timeout
+        self.initial_http_timeout = initial_http_timeout
+        self.srtt = None
+        self.rttvar = None
+        self.samples = 0
+        self._lock = threading.Lock()
+
+    def observe(self, rtt: float):
+        """记录一次握手RTT样本"""
+        with self._lock:
+            if self.srtt is None:
+                self.srtt = rtt
+                self.rttvar = rtt / 2
+            else:
+                self.rttvar = (1 - RTT_BETA) * self.rttvar + RTT_BETA * abs(self.srtt - rtt)
+                self.srtt = (1 - RTT_ALPHA) * self.srtt + RTT_ALPHA * rtt
+            self.samples += 1
+
+    @property
+    def connect_timeout(self) -> float:
+        """当前连接超时"""
+        if self.srtt is None:
+            return self.initial_connect_timeout
+        value = max(self.srtt * CONNECT_RTT_FACTOR, self.srtt + 4 * self.rttvar)
+        return clamp(value, MIN_CONNECT_TIMEOUT, MAX_CONNECT_TIMEOUT)
+
+    @property
+    def http_timeout(self) -> float:
+        """当前HTTP读取超时"""
+        if self.srtt is None:
+            return self.initial_http_timeout
+        return min(HTTP_PROCESSING_TIME + self.srtt * HTTP_RTT_FACTOR, MAX_HTTP_TIMEOUT)
+
+    def describe(self) -> str:
+        """用于日志的超时描述"""
+        if self.srtt is None:
+            return f"无RTT样本, 连接超时 {self.connect_timeout:.2f}s"
+        return (f"RTT {self.srtt * 1000:.1f}ms, 连接超时 {self.connect_timeout:.2f}s, "
+                f"HTTP超时 {self.http_timeout:.1f}s")